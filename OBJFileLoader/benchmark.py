@@ -0,0 +1,178 @@
+"""Compara o parser vetorizado de OBJ com o carregador linha a linha anterior.
+
+Uso: python -m OBJFileLoader.benchmark [arquivo.obj] [--size N] [--workers N]
+
+Sem arquivo, gera em um diretório temporário uma grade N x N com todas as
+formas de face (v, v/vt, v//vn, v/vt/vn e polígonos) e trocas de usemtl.
+Mede a leitura mais a expansão dos cantos (o trabalho de CPU feito antes do
+upload) e confere que os dois caminhos produzem os mesmos dados e que a
+tabela de vértices únicos reproduz todos os cantos. Com --workers, mede
+também a leitura paralela com N processos e confere que ela produz os
+mesmos arrays que a leitura em um só processo.
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from OBJFileLoader.parser import parse_obj, parse_obj_parallel
+
+
+def legacy_parse(filename, swapyz=False, material=None):
+    # Laço do OBJ.__init__ anterior, sem carregar materiais
+    vertices, normals, texcoords, faces = [], [], [], []
+    for line in open(filename, "r"):
+        if line.startswith('#'): continue
+        values = line.split()
+        if not values: continue
+        if values[0] == 'v':
+            v = list(map(float, values[1:4]))
+            if swapyz:
+                v = v[0], v[2], v[1]
+            vertices.append(v)
+        elif values[0] == 'vn':
+            v = list(map(float, values[1:4]))
+            if swapyz:
+                v = v[0], v[2], v[1]
+            normals.append(v)
+        elif values[0] == 'vt':
+            texcoords.append(list(map(float, values[1:3])))
+        elif values[0] in ('usemtl', 'usemat'):
+            material = values[1]
+        elif values[0] == 'f':
+            face = []
+            face_texcoords = []
+            norms = []
+            for v in values[1:]:
+                w = v.split('/')
+                face.append(int(w[0]))
+                if len(w) >= 2 and len(w[1]) > 0:
+                    face_texcoords.append(int(w[1]))
+                else:
+                    face_texcoords.append(0)
+                if len(w) >= 3 and len(w[2]) > 0:
+                    norms.append(int(w[2]))
+                else:
+                    norms.append(0)
+            faces.append((face, norms, face_texcoords, material))
+    return vertices, normals, texcoords, faces
+
+
+def legacy_corners(vertices, normals, texcoords, faces):
+    # Expansão por canto feita pelo OBJ.generate anterior
+    data_vertices, data_normals, data_texcoords, materials = [], [], [], []
+    for face_vertices, face_normals, face_texcoords, material in faces:
+        for i in range(len(face_vertices)):
+            data_vertices.append(vertices[face_vertices[i] - 1])
+            data_normals.append(normals[face_normals[i] - 1] if face_normals[i] > 0 else (0, 0, 0))
+            data_texcoords.append(texcoords[face_texcoords[i] - 1] if face_texcoords[i] > 0 else (0, 0))
+        materials.append(material)
+    return data_vertices, data_normals, data_texcoords, materials
+
+
+def write_test_obj(path, size):
+    rng = np.random.default_rng(0)
+    with open(path, 'w') as f:
+        f.write('# grade de teste gerada por OBJFileLoader.benchmark\nmtllib teste.mtl\no grade\n')
+        for x in range(size):
+            for z in range(size):
+                f.write(f'v {x:.6f} {rng.random():.6f} {z:.6f}\n')
+        for x in range(size):
+            for z in range(size):
+                f.write(f'vt {x / size:.6f} {z / size:.6f}\n')
+        f.write('vn 0.000000 1.000000 0.000000\nvn 0.000000 -1.000000 0.000000\n')
+
+        forms = ('{v}', '{v}/{v}', '{v}//{n}', '{v}/{v}/{n}')
+        for x in range(size - 1):
+            f.write(f'usemtl material_{x % 3}\ns off\n')
+            for z in range(size - 1):
+                a = x * size + z + 1
+                b, c, d = a + 1, a + size + 1, a + size
+                form = forms[(x + z) % len(forms)]
+                corner = lambda v: form.format(v=v, n=1 + (z % 2))
+                if z % 5 == 4:
+                    # Pentágono com um vértice repetido para exercitar o caminho de polígonos
+                    f.write(f'f {corner(a)} {corner(b)} {corner(c)} {corner(d)} {corner(a)}\n')
+                elif z % 2:
+                    f.write(f'f {corner(a)} {corner(b)} {corner(c)} {corner(d)}\n')
+                else:
+                    f.write(f'f {corner(a)} {corner(b)} {corner(c)}\nf {corner(a)} {corner(c)} {corner(d)}\n')
+
+
+def compare_parsed(expected, actual):
+    for name in ('vertices', 'normals', 'texcoords', 'corner_vertices', 'corner_texcoords', 'corner_normals',
+                 'face_sizes'):
+        if not np.array_equal(getattr(expected, name), getattr(actual, name)):
+            raise AssertionError(f"A leitura paralela divergiu em {name}")
+    # Compara o nome do material de cada face; a divisão em intervalos pode mudar na costura
+    names = [[materials[i] for i in face_material] for materials, face_material in
+             (expected.face_materials(), actual.face_materials())]
+    if names[0] != names[1]:
+        raise AssertionError("Os materiais por face da leitura paralela divergiram")
+
+
+def run_parallel(filename, parsed, serial_time, workers):
+    start = time.perf_counter()
+    parallel = parse_obj_parallel(filename, workers=workers)
+    parallel_time = time.perf_counter() - start
+    compare_parsed(parsed, parallel)
+    print(f"  paralelo ({workers} processos): {parallel_time:.3f} s  ({serial_time / parallel_time:.1f}x)")
+
+
+def run(filename, workers=None):
+    start = time.perf_counter()
+    legacy = legacy_corners(*legacy_parse(filename))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = parse_obj(filename)
+    serial_time = time.perf_counter() - start
+    corners = parsed.corner_arrays()
+    vectorized_time = time.perf_counter() - start
+
+    materials, face_material = parsed.face_materials()
+    for expected, actual in zip(legacy[:3], corners):
+        if not np.allclose(np.asarray(expected, dtype=np.float32).reshape(actual.shape), actual):
+            raise AssertionError("O parser vetorizado divergiu do carregador anterior")
+    if legacy[3] != [materials[i] for i in face_material]:
+        raise AssertionError("Os materiais por face divergiram do carregador anterior")
+
+    start = time.perf_counter()
+    unique, indices = parsed.weld()
+    weld_time = time.perf_counter() - start
+    for table, expected in zip(unique, corners):
+        if not np.array_equal(table[indices], expected):
+            raise AssertionError("A tabela de vértices únicos não reproduz os cantos")
+
+    size = os.path.getsize(filename) / (1024 * 1024)
+    print(f"{filename}: {size:.1f} MB, {len(parsed.vertices)} vértices, {len(parsed.face_sizes)} faces")
+    print(f"  linha a linha: {legacy_time:.3f} s")
+    print(f"  vetorizado:    {vectorized_time:.3f} s  ({legacy_time / vectorized_time:.1f}x)")
+    print(f"  solda:         {weld_time:.3f} s  ({len(indices)} cantos -> {len(unique[0])} vértices únicos)")
+    if workers:
+        run_parallel(filename, parsed, serial_time, workers)
+
+
+def main(args):
+    size = 500
+    if '--size' in args:
+        i = args.index('--size')
+        size = int(args[i + 1])
+        del args[i:i + 2]
+    workers = None
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if args:
+        run(args[0], workers)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'grade.obj')
+        write_test_obj(path, size)
+        run(path, workers)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
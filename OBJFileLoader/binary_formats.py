@@ -0,0 +1,263 @@
+import numpy as np
+from OBJFileLoader.normals import distinct_rows
+from OBJFileLoader.parser import NO_GROUP, OBJData
+
+# STL binário: cabeçalho livre de 80 bytes, número de triângulos e um registro fixo por triângulo
+STL_HEADER = 80
+STL_FACET = np.dtype([('normal', '<f4', 3), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+
+PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+             'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+             'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+             'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+PLY_BYTE_ORDERS = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+PLY_TEXCOORDS = (('s', 't'), ('u', 'v'), ('texture_u', 'texture_v'), ('texture_s', 'texture_t'))
+# Faces de tamanhos misturados: bytes do arquivo percorridos por vez na busca dos inícios dos registros
+PLY_FACE_CHUNK = 4 * 1024 * 1024
+
+
+def parse_stl(filename, swapyz=False, material=None, progress=None):
+    """Lê um .stl binário mapeado do disco e o converte em OBJData.
+
+    Os triângulos vêm de uma única visão com dtype estruturado. Os cantos
+    na mesma posição viram um só vértice, para que generate_normals suavize
+    entre triângulos vizinhos; as normais das facetas são ignoradas, já que
+    muitos exportadores as gravam zeradas.
+    """
+    raw = np.memmap(filename, dtype=np.uint8, mode='r')
+    if len(raw) < STL_HEADER + 4:
+        raise ValueError(f"{filename}: arquivo STL truncado")
+    count = int(raw[STL_HEADER:STL_HEADER + 4].view('<u4')[0])
+    end = STL_HEADER + 4 + count * STL_FACET.itemsize
+    if len(raw) != end and bytes(raw[:5]) == b'solid':
+        raise ValueError(f"{filename}: STL em texto não é suportado; exporte em binário")
+    if len(raw) < end:
+        raise ValueError(f"{filename}: arquivo STL truncado ({count} triângulos declarados)")
+
+    # Somar zero troca -0.0 por 0.0, senão o mesmo ponto teria dois padrões de bits
+    positions = raw[STL_HEADER + 4:end].view(STL_FACET)['corners'].reshape(-1, 3).astype(np.float32) + np.float32(0)
+    if progress:
+        progress(0.5)
+    first, inverse = distinct_rows(positions)
+    # As entradas saem na ordem do hash; a ordem de primeira ocorrência mantém vizinhos perto na memória
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    inverse = rank[inverse]
+
+    parsed = OBJData()
+    parsed.vertices = positions[first[order]]
+    if swapyz:
+        parsed.vertices = parsed.vertices[:, [0, 2, 1]]
+    parsed.corner_vertices = inverse + 1
+    parsed.corner_texcoords = np.zeros(len(inverse), dtype=np.int64)
+    parsed.corner_normals = np.zeros(len(inverse), dtype=np.int64)
+    _finish(parsed, np.full(count, 3, dtype=np.int64), material)
+    if progress:
+        progress(1.0)
+    return parsed
+
+
+def parse_ply(filename, swapyz=False, material=None, progress=None):
+    """Lê um .ply binário (little ou big endian) mapeado do disco e o converte em OBJData.
+
+    Cada elemento do cabeçalho vira um dtype estruturado lido sem cópia do
+    arquivo. Usa x, y, z e, quando existirem, nx, ny, nz e as coordenadas de
+    textura (s/t, u/v ou texture_u/texture_v) dos vértices, e a lista
+    vertex_indices (ou vertex_index) das faces; as demais propriedades e os
+    elementos depois das faces são ignorados.
+    """
+    byte_order, elements, offset = _read_ply_header(filename)
+    raw = np.memmap(filename, dtype=np.uint8, mode='r')
+    vertices = faces = None
+
+    for name, count, properties in elements:
+        if name == 'vertex' and vertices is None:
+            vertices, offset = _read_records(raw, offset, count, _scalar_dtype(properties, byte_order), filename)
+            if progress:
+                progress(0.5)
+        elif name == 'face' and faces is None:
+            faces, offset = _read_faces(raw, offset, count, properties, byte_order, filename)
+        elif any(prop[0] == 'list' for prop in properties):
+            # Um elemento com listas tem registros de tamanho variável; só dá para pular os que vêm depois
+            if vertices is not None and faces is not None:
+                break
+            raise ValueError(f"{filename}: elemento PLY '{name}' com listas antes das faces não é suportado")
+        else:
+            _, offset = _read_records(raw, offset, count, _scalar_dtype(properties, byte_order), filename)
+        if vertices is not None and faces is not None:
+            break
+    if vertices is None:
+        raise ValueError(f"{filename}: PLY sem elemento 'vertex'")
+
+    names = vertices.dtype.names
+    parsed = OBJData()
+    parsed.vertices = np.stack([vertices['x'], vertices['y'], vertices['z']], axis=1).astype(np.float32)
+    if {'nx', 'ny', 'nz'} <= set(names):
+        parsed.normals = np.stack([vertices['nx'], vertices['ny'], vertices['nz']], axis=1).astype(np.float32)
+    for u, v in PLY_TEXCOORDS:
+        if u in names and v in names:
+            parsed.texcoords = np.stack([vertices[u], vertices[v]], axis=1).astype(np.float32)
+            break
+    if swapyz:
+        parsed.vertices = parsed.vertices[:, [0, 2, 1]]
+        parsed.normals = parsed.normals[:, [0, 2, 1]]
+
+    sizes, corners = faces if faces is not None else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    if len(corners) and (corners.min() < 0 or corners.max() >= len(parsed.vertices)):
+        raise ValueError(f"{filename}: face PLY com índice de vértice fora do intervalo")
+    # Na convenção do OBJData os índices começam em 1 e 0 é componente ausente
+    parsed.corner_vertices = corners + 1
+    parsed.corner_normals = corners + 1 if len(parsed.normals) else np.zeros(len(corners), dtype=np.int64)
+    parsed.corner_texcoords = corners + 1 if len(parsed.texcoords) else np.zeros(len(corners), dtype=np.int64)
+    _finish(parsed, sizes, material)
+    if progress:
+        progress(1.0)
+    return parsed
+
+
+def _finish(parsed, face_sizes, material):
+    # Formatos sem materiais nem grupos: todas as faces usam o material padrão e são suavizadas
+    parsed.face_sizes = face_sizes
+    parsed.face_groups = np.full(len(face_sizes), NO_GROUP, dtype=np.int64)
+    parsed.material_ranges = [(0, material)] if len(face_sizes) else []
+    parsed.final_material = material
+
+
+def _read_ply_header(filename):
+    # Retorna (ordem dos bytes, [(elemento, quantidade, propriedades)], início dos dados)
+    with open(filename, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            raise ValueError(f"{filename}: não é um arquivo PLY")
+        byte_order, elements = None, []
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{filename}: cabeçalho PLY sem end_header")
+            values = line.decode('ascii', 'replace').split()
+            if not values or values[0] in ('comment', 'obj_info'):
+                continue
+            if values[0] == 'end_header':
+                break
+            if values[0] == 'format':
+                if values[1] not in PLY_BYTE_ORDERS:
+                    raise ValueError(f"{filename}: PLY em formato '{values[1]}' não é suportado; exporte em binário")
+                byte_order = PLY_BYTE_ORDERS[values[1]]
+            elif values[0] == 'element':
+                elements.append((values[1], int(values[2]), []))
+            elif values[0] == 'property' and elements:
+                elements[-1][2].append(values[1:])
+        if byte_order is None:
+            raise ValueError(f"{filename}: cabeçalho PLY sem linha format")
+        return byte_order, elements, f.tell()
+
+
+def _ply_type(name, byte_order):
+    if name not in PLY_TYPES:
+        raise ValueError(f"tipo PLY desconhecido: {name}")
+    return np.dtype(byte_order + PLY_TYPES[name])
+
+
+def _scalar_dtype(properties, byte_order):
+    return np.dtype([(prop[-1], _ply_type(prop[0], byte_order)) for prop in properties])
+
+
+def _read_records(raw, offset, count, dtype, filename):
+    end = offset + count * dtype.itemsize
+    if end > len(raw):
+        raise ValueError(f"{filename}: arquivo PLY truncado")
+    return raw[offset:end].view(dtype), end
+
+
+def _read_faces(raw, offset, count, properties, byte_order, filename):
+    """Lê as faces e retorna ((cantos por face, índices dos cantos), fim dos dados).
+
+    Quando todas as faces têm o número de cantos da primeira, elas são lidas
+    numa única visão de registros de tamanho fixo. Com tamanhos misturados,
+    _face_offsets encontra o início de todos os registros sem laço por face,
+    e os índices são lidos de uma vez para cada número de cantos distinto.
+    """
+    lists = [i for i, prop in enumerate(properties) if prop[0] == 'list']
+    if len(lists) != 1 or properties[lists[0]][-1] not in ('vertex_indices', 'vertex_index'):
+        raise ValueError(f"{filename}: faces PLY precisam de uma única lista vertex_indices")
+    _, count_type, index_type, _ = properties[lists[0]]
+    count_type, index_type = _ply_type(count_type, byte_order), _ply_type(index_type, byte_order)
+    before = _scalar_dtype(properties[:lists[0]], byte_order).itemsize
+    after = _scalar_dtype(properties[lists[0] + 1:], byte_order).itemsize
+    if count == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)), offset
+    if offset + before + count_type.itemsize > len(raw):
+        raise ValueError(f"{filename}: arquivo PLY truncado")
+
+    size = int(raw[offset + before:offset + before + count_type.itemsize].view(count_type)[0])
+    record = np.dtype({'names': ['size', 'indices'], 'formats': [count_type, (index_type, (max(size, 0),))],
+                       'offsets': [before, before + count_type.itemsize],
+                       'itemsize': before + count_type.itemsize + max(size, 0) * index_type.itemsize + after})
+    end = offset + count * record.itemsize
+    if end <= len(raw):
+        records = raw[offset:end].view(record)
+        if np.all(records['size'] == size):
+            return (np.full(count, size, dtype=np.int64), records['indices'].reshape(-1).astype(np.int64)), end
+
+    starts, end = _face_offsets(raw, offset, count, before, count_type, index_type.itemsize, after, filename)
+    sizes = _gather(raw, starts + before, count_type).astype(np.int64)
+    first_corner = np.cumsum(sizes) - sizes
+    corners = np.empty(int(sizes.sum()), dtype=np.int64)
+    data_start = starts + before + count_type.itemsize
+    for size in np.unique(sizes):
+        faces = np.flatnonzero(sizes == size)
+        # Todas as faces com esse número de cantos de uma vez: (faces, cantos) índices lidos do arquivo
+        values = _gather(raw, data_start[faces, None] + np.arange(size) * index_type.itemsize, index_type)
+        corners[first_corner[faces, None] + np.arange(size)] = values
+    return (sizes, corners), end
+
+
+def _gather(raw, positions, dtype):
+    # Valores de dtype que começam em cada posição (array de qualquer forma) do arquivo
+    columns = np.asarray(positions)[..., None] + np.arange(dtype.itemsize)
+    return np.ascontiguousarray(raw[columns]).view(dtype)[..., 0]
+
+
+def _face_offsets(raw, offset, count, before, count_type, index_size, after, filename):
+    """Início de cada registro de face com tamanhos misturados e o fim dos dados, sem laço por face.
+
+    Cada registro diz onde começa o próximo, então a cadeia é achada por
+    saltos dobrados: para cada byte de um trecho do arquivo calcula-se onde
+    começaria o registro seguinte e, dobrando o salto a cada passo, a cadeia
+    a partir do primeiro registro também dobra. São log2(faces) passos
+    vetorizados por trecho de PLY_FACE_CHUNK bytes.
+    """
+    fixed = before + count_type.itemsize + after
+    starts, found, chunk = [], 0, PLY_FACE_CHUNK
+    while found < count:
+        size = min(chunk, len(raw) - offset)
+        # Salto de cada posição até o registro seguinte; size é o fim exato do trecho e size + 1 um
+        # registro que não cabe nele (ou com contagem negativa). As duas sentinelas apontam para si mesmas
+        positions = np.arange(max(0, size - before - count_type.itemsize + 1), dtype=np.int64)
+        counts = _gather(raw, offset + before + positions, count_type).astype(np.int64)
+        following = positions + fixed + counts * index_size
+        following[(counts < 0) | (following > size)] = size + 1
+        jump = np.full(size + 2, size + 1, dtype=np.int64)
+        jump[:len(following)] = following
+        jump[size] = size
+        step = jump
+
+        chain = np.zeros(1, dtype=np.int64)
+        while len(chain) < count - found and chain[-1] < size:
+            chain = np.concatenate([chain, step[chain]])
+            step = step[step]
+        chain = chain[(chain < size) & (jump[np.minimum(chain, size)] <= size)][:count - found]
+
+        if not len(chain):
+            if offset + size >= len(raw):
+                raise ValueError(f"{filename}: arquivo PLY truncado")
+            chunk *= 2  # um registro maior que o trecho
+            continue
+        starts.append(offset + chain)
+        found += len(chain)
+        offset += int(jump[chain[-1]])
+    return np.concatenate(starts), offset
+
+
+# Extensões lidas por este módulo; as demais seguem para parse_obj
+BINARY_PARSERS = {'.stl': parse_stl, '.ply': parse_ply}
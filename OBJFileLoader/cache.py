@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import numpy as np
+
+MAGIC = b'OBJCACHE'
+FORMAT_VERSION = 3
+ALIGNMENT = 64
+HEADER = struct.Struct('<8sII')  # magic, versão, tamanho do cabeçalho JSON
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.mesh_cache')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CachedMesh:
+    """Arrays prontos para a GPU de uma malha, mapeados do arquivo de cache quando vêm de um acerto."""
+
+    def __init__(self, arrays, materials, material_libs):
+        self.arrays = arrays
+        self.materials = materials
+        self.material_libs = material_libs
+
+
+class MeshCache:
+    """Cache binário em disco das malhas importadas.
+
+    Cada entrada guarda os arrays finais (vértices intercalados, índices,
+    intervalos de desenho) em um arquivo com cabeçalho JSON e dados
+    alinhados, lidos com np.memmap sem nenhuma conversão. O nome da entrada
+    vem do caminho absoluto e das opções de importação; dentro dela ficam
+    tamanho, mtime e hash do conteúdo do .obj. Tamanho e mtime iguais bastam
+    para um acerto; se só o mtime mudou, o hash decide. O diretório é
+    limitado a max_bytes e as entradas usadas há mais tempo são removidas
+    primeiro.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, filename, options):
+        key = json.dumps([os.path.abspath(filename), options, FORMAT_VERSION])
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.meshcache')
+
+    @staticmethod
+    def content_hash(filename):
+        digest = hashlib.blake2b(digest_size=20)
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, filename, options=None):
+        if not self.enabled:
+            return None
+        path = self.entry_path(filename, options)
+        try:
+            header, data_offset = self.read_header(path)
+            stat = os.stat(filename)
+            source = header['source']
+            if source['size'] != stat.st_size:
+                raise ValueError("arquivo de origem mudou")
+            if source['mtime_ns'] != stat.st_mtime_ns:
+                if source['hash'] != self.content_hash(filename):
+                    raise ValueError("arquivo de origem mudou")
+                # Mesmo conteúdo com outro mtime (ex.: checkout); atualiza a chave rápida
+                source['mtime_ns'] = stat.st_mtime_ns
+                self.rewrite_header(path, header, data_offset)
+
+            arrays = {}
+            for name, (dtype, shape, offset) in header['arrays'].items():
+                if np.prod(shape) == 0:
+                    arrays[name] = np.zeros(shape, dtype=dtype)
+                else:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_offset + offset,
+                                             shape=tuple(shape))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, KeyError, OSError, struct.error) as e:
+            # Entrada inválida, corrompida ou de outra versão: descarta e reimporta
+            print(f"Cache de malha descartado para {filename}: {e}")
+            self.remove(path)
+            self.misses += 1
+            return None
+
+        # Acessos atualizam o mtime da entrada, que ordena a remoção por LRU
+        os.utime(path)
+        self.hits += 1
+        return CachedMesh(arrays, header['materials'], header['material_libs'])
+
+    @staticmethod
+    def read_header(path):
+        with open(path, 'rb') as f:
+            magic, version, length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError("formato de cache desconhecido")
+            header = json.loads(f.read(length).decode('utf-8'))
+        return header, header['data_offset']
+
+    @staticmethod
+    def rewrite_header(path, header, data_offset):
+        encoded = json.dumps(header).encode('utf-8')
+        if HEADER.size + len(encoded) > data_offset:
+            return  # Não cabe no espaço reservado; a verificação pelo hash se repete no próximo acesso
+        with open(path, 'r+b') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            f.write(encoded)
+
+    def store(self, filename, options, arrays, materials, material_libs):
+        if not self.enabled:
+            return
+        stat = os.stat(filename)
+        header = {
+            'source': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': self.content_hash(filename)},
+            'materials': materials,
+            'material_libs': material_libs,
+            'arrays': {},
+        }
+
+        offset = 0
+        blobs = []
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            header['arrays'][name] = (array.dtype.str, list(array.shape), offset)
+            blobs.append((offset, array))
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        # Espaço de sobra no cabeçalho para reescrevê-lo no lugar quando o mtime mudar
+        header['data_offset'] = 0
+        length = len(json.dumps(header).encode('utf-8')) + 64
+        header['data_offset'] = -(-(HEADER.size + length) // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header).encode('utf-8')
+
+        path = self.entry_path(filename, options)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+                f.write(encoded)
+                for array_offset, array in blobs:
+                    f.seek(header['data_offset'] + array_offset)
+                    f.write(array.tobytes())
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Não foi possível gravar o cache de malha de {filename}: {e}")
+            self.remove(temporary)
+            return
+        self.evict()
+
+    def evict(self):
+        try:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                       if name.endswith('.meshcache')]
+            entries = [(os.stat(path), path) for path in entries]
+        except OSError:
+            return
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= stat.st_size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.meshcache') or name.endswith('.tmp'):
+                self.remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+mesh_cache = MeshCache()
@@ -0,0 +1,574 @@
+import base64
+import io
+import json
+import os
+import struct
+from collections import namedtuple
+import numpy as np
+from OBJFileLoader.cache import CachedMesh
+from OBJFileLoader.parser import OBJData
+from utils.textures import file_key
+from utils.transform import model_matrices
+from utils.vertex_format import VERTEX_FLOATS, VERTEX_STRIDE, interleave
+
+GLB_MAGIC = b'glTF'
+GLB_VERSION = 2
+GLB_HEADER = struct.Struct('<4sII')  # magic, versão, tamanho total
+CHUNK_HEADER = struct.Struct('<II')  # tamanho, tipo
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+FLOAT, UNSIGNED_SHORT, UNSIGNED_INT = 5126, 5123, 5125
+COMPONENT_TYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, UNSIGNED_SHORT: np.uint16,
+                   UNSIGNED_INT: np.uint32, FLOAT: np.float32}
+TYPE_COLUMNS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4, 'MAT4': 16}
+INDEX_COMPONENTS = {2: UNSIGNED_SHORT, 4: UNSIGNED_INT}
+TRIANGLES = 4
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+VERTEX_ATTRIBUTES = ('POSITION', 'NORMAL', 'TEXCOORD_0')
+IMAGE_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg'}
+
+# Uma malha de um .glb é referenciada como 'arquivo.glb#índice'; sem o índice, o arquivo inteiro
+MESH_SEPARATOR = '#'
+
+
+def split_reference(filename):
+    path, separator, index = filename.rpartition(MESH_SEPARATOR)
+    if separator and index.isdigit() and path.lower().endswith('.glb'):
+        return path, int(index)
+    return filename, None
+
+
+def mesh_reference(filename, index):
+    return f"{filename}{MESH_SEPARATOR}{index}"
+
+
+class EmbeddedImage(namedtuple('EmbeddedImage', 'filename index')):
+    """Imagem de um .glb, aceita pelo texture_manager no lugar de um caminho."""
+
+    def key(self):
+        return file_key(self.filename) + (self.index,)
+
+    def open(self):
+        return io.BytesIO(GLBFile(self.filename).image_bytes(self.index)[0])
+
+
+def is_glb(filename):
+    return split_reference(filename)[0].lower().endswith('.glb')
+
+
+class GLBFile:
+    """Um .glb mapeado do disco: o JSON do glTF e o bloco binário, lido sem cópia."""
+
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        raw = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(raw) < GLB_HEADER.size:
+            raise ValueError(f"{filename}: arquivo GLB truncado")
+        magic, version, length = GLB_HEADER.unpack(bytes(raw[:GLB_HEADER.size]))
+        if magic != GLB_MAGIC or version != GLB_VERSION:
+            raise ValueError(f"{filename}: não é um arquivo glTF 2.0 binário")
+
+        self.json, self.binary = None, raw[:0]
+        offset = GLB_HEADER.size
+        while offset + CHUNK_HEADER.size <= min(length, len(raw)):
+            size, kind = CHUNK_HEADER.unpack(bytes(raw[offset:offset + CHUNK_HEADER.size]))
+            chunk = raw[offset + CHUNK_HEADER.size:offset + CHUNK_HEADER.size + size]
+            if kind == CHUNK_JSON and self.json is None:
+                self.json = json.loads(bytes(chunk).decode('utf-8'))
+            elif kind == CHUNK_BIN and not len(self.binary):
+                self.binary = chunk
+            offset += CHUNK_HEADER.size + size
+        if self.json is None:
+            raise ValueError(f"{filename}: GLB sem bloco JSON")
+
+    def accessor(self, index):
+        """Visão NumPy (n, colunas) do accessor sobre o arquivo mapeado, sem cópia.
+
+        Atributos intercalados (byteStride) viram uma visão com passo; só
+        accessors esparsos ou sem bufferView não são suportados.
+        """
+        accessor = self.json['accessors'][index]
+        dtype = np.dtype(COMPONENT_TYPES[accessor['componentType']]).newbyteorder('<')
+        columns = TYPE_COLUMNS[accessor['type']]
+        count = accessor['count']
+        if 'bufferView' not in accessor or 'sparse' in accessor:
+            raise ValueError(f"{self.filename}: accessor {index} esparso ou sem bufferView não é suportado")
+        view = self.json['bufferViews'][accessor['bufferView']]
+        if view.get('buffer', 0) != 0:
+            raise ValueError(f"{self.filename}: buffers externos não são suportados")
+
+        element = dtype.itemsize * columns
+        stride = view.get('byteStride', element)
+        start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+        if count == 0:
+            return np.zeros((0, columns), dtype=dtype)
+        end = start + stride * (count - 1) + element
+        if end > len(self.binary):
+            raise ValueError(f"{self.filename}: accessor {index} passa do fim do bloco binário")
+        return np.ndarray((count, columns), dtype=dtype, buffer=self.binary[start:end], strides=(stride, dtype.itemsize))
+
+    def image_bytes(self, index):
+        """(bytes, tipo MIME) da imagem: embutida no bloco binário, em data URI ou em arquivo ao lado do .glb."""
+        image = self.json['images'][index]
+        if 'bufferView' in image:
+            view = self.json['bufferViews'][image['bufferView']]
+            start = view.get('byteOffset', 0)
+            return bytes(self.binary[start:start + view['byteLength']]), image.get('mimeType', 'image/png')
+        uri = image['uri']
+        if uri.startswith('data:'):
+            header, _, payload = uri.partition(',')
+            return base64.b64decode(payload), header[5:].split(';')[0]
+        path = os.path.join(os.path.dirname(self.filename), uri)
+        with open(path, 'rb') as f:
+            return f.read(), IMAGE_TYPES.get(os.path.splitext(path)[1].lower(), 'image/png')
+
+    def base_color_image(self, material):
+        """EmbeddedImage da baseColorTexture do material (índice), ou None."""
+        pbr = self.json.get('materials', [])[material].get('pbrMetallicRoughness', {})
+        texture = pbr.get('baseColorTexture')
+        if texture is None:
+            return None
+        source = self.json.get('textures', [])[texture['index']].get('source')
+        return EmbeddedImage(self.filename, source) if source is not None else None
+
+    def material_names(self):
+        # Nomes únicos: os intervalos de desenho e o dicionário de materiais do OBJ são indexados por nome
+        names = []
+        for index, material in enumerate(self.json.get('materials', [])):
+            name = material.get('name') or f"material{index}"
+            names.append(name if name not in names else f"{name}.{index}")
+        return names
+
+    def mesh_nodes(self):
+        # (nó, malha, matriz de mundo) de cada nó com malha da cena padrão, descendo pela hierarquia
+        nodes = self.json.get('nodes', [])
+        scenes = self.json.get('scenes', [])
+        roots = scenes[self.json.get('scene', 0)]['nodes'] if scenes else range(len(nodes))
+        found, pending = [], [(root, np.eye(4)) for root in roots]
+        while pending:
+            index, parent = pending.pop()
+            node = nodes[index]
+            world = parent @ node_matrix(node)
+            if 'mesh' in node:
+                found.append((index, node['mesh'], world))
+            pending.extend((child, world) for child in node.get('children', []))
+        return sorted(found, key=lambda item: item[0])
+
+
+def node_matrix(node):
+    if 'matrix' in node:
+        return np.asarray(node['matrix'], dtype=np.float64).reshape(4, 4).T  # glTF guarda por colunas
+    x, y, z, w = node.get('rotation', (0, 0, 0, 1))
+    rotation = np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                         [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                         [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.asarray(node.get('scale', (1, 1, 1)), dtype=np.float64)
+    matrix[:3, 3] = node.get('translation', (0, 0, 0))
+    return matrix
+
+
+def decompose(matrix):
+    """(posição, rotação em graus, escala) no formato de Transform: M = T * Rx * Ry * Rz * S.
+
+    Cisalhamentos vindos de escalas não uniformes na hierarquia são descartados.
+    """
+    scale = np.linalg.norm(matrix[:3, :3], axis=0)
+    scale = np.where(scale == 0, 1, scale)
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        scale[0] = -scale[0]
+    rotation = matrix[:3, :3] / scale
+    angles = np.degrees([np.arctan2(-rotation[1, 2], rotation[2, 2]),
+                         np.arcsin(np.clip(rotation[0, 2], -1, 1)),
+                         np.arctan2(-rotation[0, 1], rotation[0, 0])])
+    return matrix[:3, 3].tolist(), angles.tolist(), scale.tolist()
+
+
+def quaternion(rotation):
+    # Quaternion [x, y, z, w] de uma matriz de rotação 3x3
+    trace = np.trace(rotation)
+    if trace > 0:
+        s = 2 * np.sqrt(trace + 1)
+        q = [(rotation[2, 1] - rotation[1, 2]) / s, (rotation[0, 2] - rotation[2, 0]) / s,
+             (rotation[1, 0] - rotation[0, 1]) / s, s / 4]
+    else:
+        axis = int(np.argmax(np.diag(rotation)))
+        j, k = (axis + 1) % 3, (axis + 2) % 3
+        s = 2 * np.sqrt(1 + rotation[axis, axis] - rotation[j, j] - rotation[k, k])
+        q = [0.0, 0.0, 0.0, (rotation[k, j] - rotation[j, k]) / s]
+        q[axis] = s / 4
+        q[j] = (rotation[j, axis] + rotation[axis, j]) / s
+        q[k] = (rotation[k, axis] + rotation[axis, k]) / s
+    return [float(value) for value in q]
+
+
+def load_glb_mesh(filename, swapyz=False, material=None):
+    """Malha de 'arquivo.glb#índice' (ou do arquivo inteiro) para o OBJ.
+
+    Quando a malha já está no formato da arena (posição, normal e UV float32
+    intercalados com passo VERTEX_STRIDE, como gravado por export_glb, e
+    índices de 16 ou 32 bits de um mesmo bufferView), retorna um CachedMesh
+    cujos arrays são visões do arquivo mapeado, enviadas à GPU sem cópia.
+    Nos demais casos retorna um OBJData com os triângulos, para OBJ.build
+    soldar os vértices e calcular as normais que faltarem. Primitivas sem
+    material usam o material passado.
+    """
+    path, index = split_reference(filename)
+    glb = GLBFile(path)
+    if index is not None:
+        nodes = [(index, np.eye(4))]
+    else:
+        nodes = [(mesh, world) for _, mesh, world in glb.mesh_nodes()]
+    if len(nodes) == 1 and not swapyz and np.allclose(nodes[0][1], np.eye(4)):
+        mesh = _mapped_mesh(glb, nodes[0][0], material)
+        if mesh is not None:
+            return mesh
+    return _mesh_data(glb, nodes, swapyz, material)
+
+
+def _mapped_mesh(glb, index, material):
+    # Todas as primitivas precisam ser triângulos indexados sobre os mesmos vértices
+    primitives = glb.json['meshes'][index]['primitives']
+    accessors = glb.json['accessors']
+    names = glb.material_names()
+    if not primitives or any(p.get('mode', TRIANGLES) != TRIANGLES or 'indices' not in p for p in primitives):
+        return None
+    shared = [primitives[0]['attributes'].get(name) for name in VERTEX_ATTRIBUTES]
+    if None in shared or any([p['attributes'].get(name) for name in VERTEX_ATTRIBUTES] != shared for p in primitives):
+        return None
+
+    # Os três atributos precisam ser as colunas do vértice intercalado do formato da arena
+    attributes = [accessors[accessor] for accessor in shared]
+    view_index = attributes[0].get('bufferView')
+    view = glb.json['bufferViews'][view_index] if view_index is not None else {}
+    base = attributes[0].get('byteOffset', 0)
+    if view.get('byteStride') != VERTEX_STRIDE or any(
+            a.get('bufferView') != view_index or a['componentType'] != FLOAT or a.get('normalized')
+            or a['count'] != attributes[0]['count'] or a.get('byteOffset', 0) != base + offset or 'sparse' in a
+            for a, offset in zip(attributes, (0, 12, 24))):
+        return None
+
+    index_accessors = [accessors[p['indices']] for p in primitives]
+    index_view = index_accessors[0].get('bufferView')
+    if index_view is None or 'byteStride' in glb.json['bufferViews'][index_view]:
+        return None
+    if any(a.get('bufferView') != index_view or a['componentType'] != index_accessors[0]['componentType']
+           or a['componentType'] not in (UNSIGNED_SHORT, UNSIGNED_INT) or 'sparse' in a for a in index_accessors):
+        return None
+
+    count = attributes[0]['count']
+    start = view.get('byteOffset', 0) + base
+    vertex_data = glb.binary[start:start + count * VERTEX_STRIDE].view('<f4').reshape(count, VERTEX_FLOATS)
+
+    # Um único array de índices cobre as primitivas; cada uma vira um intervalo de desenho
+    index_dtype = np.dtype(COMPONENT_TYPES[index_accessors[0]['componentType']]).newbyteorder('<')
+    itemsize = index_dtype.itemsize
+    offsets = [a.get('byteOffset', 0) for a in index_accessors]
+    first_offset = min(offsets)
+    last_offset = max(offset + a['count'] * itemsize for offset, a in zip(offsets, index_accessors))
+    index_start = glb.json['bufferViews'][index_view].get('byteOffset', 0) + first_offset
+    indices = glb.binary[index_start:index_start + last_offset - first_offset].view(index_dtype)
+
+    materials, draw_runs = [], []
+    for primitive, offset, accessor in zip(primitives, offsets, index_accessors):
+        name = names[primitive['material']] if 'material' in primitive else material
+        if name not in materials:
+            materials.append(name)
+        draw_runs.append(((offset - first_offset) // itemsize, accessor['count'], materials.index(name)))
+    return CachedMesh({'vertex_data': vertex_data, 'indices': indices,
+                       'draw_runs': np.asarray(draw_runs, dtype=np.int64).reshape(-1, 3)},
+                      materials, [os.path.basename(glb.filename)] if names else [])
+
+
+def _mesh_data(glb, nodes, swapyz, material):
+    # Junta as primitivas em triângulos de um OBJData, com as transformações dos nós aplicadas
+    names = glb.material_names()
+    vertices, normals, texcoords = [], [], []
+    corner_vertices, corner_normals, corner_texcoords, groups, material_ranges = [], [], [], [], []
+    counts = np.zeros(3, dtype=np.int64)
+    faces = 0
+    for mesh, world in nodes:
+        normal_matrix = np.linalg.inv(world[:3, :3]).T
+        for primitive in glb.json['meshes'][mesh]['primitives']:
+            attributes = primitive['attributes']
+            if primitive.get('mode', TRIANGLES) != TRIANGLES or 'POSITION' not in attributes:
+                print(f"{glb.filename}: primitiva que não é de triângulos ignorada")
+                continue
+            positions = glb.accessor(attributes['POSITION']).astype(np.float64)
+            indices = glb.accessor(primitive['indices']).ravel().astype(np.int64) if 'indices' in primitive \
+                else np.arange(len(positions))
+            indices = indices[:len(indices) // 3 * 3]
+            vertices.append((positions @ world[:3, :3].T + world[:3, 3]).astype(np.float32))
+            corner_vertices.append(indices + counts[0] + 1)
+            counts[0] += len(positions)
+
+            if 'NORMAL' in attributes:
+                transformed = glb.accessor(attributes['NORMAL']).astype(np.float64) @ normal_matrix.T
+                lengths = np.linalg.norm(transformed, axis=1, keepdims=True)
+                normals.append((transformed / np.where(lengths == 0, 1, lengths)).astype(np.float32))
+                corner_normals.append(indices + counts[1] + 1)
+                counts[1] += len(transformed)
+            else:
+                corner_normals.append(np.zeros(len(indices), dtype=np.int64))
+            if 'TEXCOORD_0' in attributes:
+                uv = glb.accessor(attributes['TEXCOORD_0'])
+                if uv.dtype != np.float32:
+                    uv = uv / np.iinfo(uv.dtype).max  # Componentes inteiros normalizados
+                texcoords.append(uv.astype(np.float32))
+                corner_texcoords.append(indices + counts[2] + 1)
+                counts[2] += len(uv)
+            else:
+                corner_texcoords.append(np.zeros(len(indices), dtype=np.int64))
+
+            # Pela especificação, primitivas sem normais usam as normais planas das faces ('s off')
+            groups.append(np.full(len(indices) // 3, 1 if 'NORMAL' in attributes else 0, dtype=np.int64))
+            material_ranges.append((faces, names[primitive['material']] if 'material' in primitive else material))
+            faces += len(indices) // 3
+
+    data = OBJData()
+    if vertices:
+        data.vertices = np.concatenate(vertices)
+        data.corner_vertices = np.concatenate(corner_vertices)
+        data.corner_normals = np.concatenate(corner_normals)
+        data.corner_texcoords = np.concatenate(corner_texcoords)
+        data.face_groups = np.concatenate(groups)
+    if normals:
+        data.normals = np.concatenate(normals)
+    if texcoords:
+        data.texcoords = np.concatenate(texcoords)
+    if swapyz:
+        data.vertices = data.vertices[:, [0, 2, 1]]
+        data.normals = data.normals[:, [0, 2, 1]]
+    data.face_sizes = np.full(faces, 3, dtype=np.int64)
+    data.material_ranges = material_ranges
+    data.material_libs = [os.path.basename(glb.filename)] if names else []
+    return data
+
+
+def parse_glb_materials(filename):
+    """Materiais do .glb no formato de parse_mtl; map_Kd é um EmbeddedImage."""
+    glb = GLBFile(filename)
+    contents = {}
+    for index, (name, material) in enumerate(zip(glb.material_names(), glb.json.get('materials', []))):
+        pbr = material.get('pbrMetallicRoughness', {})
+        mtl = contents[name] = {'Kd': list(pbr.get('baseColorFactor', (1, 1, 1, 1)))[:3]}
+        image = glb.base_color_image(index)
+        if image is not None:
+            mtl['map_Kd'] = image
+    return contents
+
+
+def read_glb_scene(filename):
+    """Cena gravada por export_glb (ou qualquer .glb) no formato de Scene.save_scene.
+
+    Nós com 'extras' de export_glb voltam como o objeto original; as malhas
+    apontam para a cópia binária dentro do .glb em vez do arquivo de origem,
+    e a textura das primitivas, para a imagem embutida no material.
+    Nós com malha de outros programas viram objetos 'mesh' com a
+    transformação de mundo do nó.
+    """
+    glb = GLBFile(filename)
+    objects = []
+    mesh_nodes = {node: (mesh, world) for node, mesh, world in glb.mesh_nodes()}
+    for index, node in enumerate(glb.json.get('nodes', [])):
+        extras = node.get('extras', {})
+        if 'type' in extras:
+            data = dict(extras)
+            if data['type'] == 'mesh' and 'mesh' in node:
+                data['filename'] = mesh_reference(filename, node['mesh'])
+            elif 'mesh' in node:
+                # export_glb grava uma primitiva com um único material, com a textura do objeto
+                material = glb.json['meshes'][node['mesh']]['primitives'][0].get('material')
+                image = glb.base_color_image(material) if material is not None else None
+                if image is not None:
+                    data['texture'] = image
+            objects.append(data)
+        elif index in mesh_nodes:
+            mesh, world = mesh_nodes[index]
+            position, rotation, scale = decompose(world)
+            objects.append({'type': 'mesh', 'position': position, 'rotation': rotation, 'scale': scale,
+                            'texture': None, 'filename': mesh_reference(filename, mesh)})
+    scene_data = {'objects': objects}
+    camera = glb.json.get('extras', {}).get('camera')
+    if camera is not None:
+        scene_data['camera'] = camera
+    return scene_data
+
+
+class GLBWriter:
+    """Monta um .glb: o JSON do glTF e um único bloco binário com todos os buffers."""
+
+    def __init__(self):
+        self.json = {'asset': {'version': '2.0', 'generator': 'OBJFileLoader.gltf'},
+                     'buffers': [], 'bufferViews': [], 'accessors': [], 'meshes': [], 'materials': [],
+                     'textures': [], 'images': [], 'samplers': [{}], 'nodes': [], 'scenes': [{'nodes': []}],
+                     'scene': 0}
+        self.chunks = []
+        self.size = 0
+        self.images = {}  # chave da imagem -> índice da textura
+        self.materials = {}  # (cor, textura) -> índice do material
+        self.meshes = {}  # chave do objeto -> índice da malha
+
+    def add_view(self, data, target=None, stride=None):
+        data = bytes(data)
+        view = {'buffer': 0, 'byteOffset': self.size, 'byteLength': len(data)}
+        if target is not None:
+            view['target'] = target
+        if stride is not None:
+            view['byteStride'] = stride
+        padding = -len(data) % 4
+        self.chunks.append(data + b'\0' * padding)
+        self.size += len(data) + padding
+        self.json['bufferViews'].append(view)
+        return len(self.json['bufferViews']) - 1
+
+    def add_accessor(self, view, component, count, kind, offset=0, bounds=None):
+        accessor = {'bufferView': view, 'byteOffset': offset, 'componentType': component, 'count': count, 'type': kind}
+        if bounds is not None:
+            accessor['min'], accessor['max'] = bounds
+        self.json['accessors'].append(accessor)
+        return len(self.json['accessors']) - 1
+
+    def add_texture(self, image):
+        # image: caminho de arquivo ou EmbeddedImage, como o map_Kd dos materiais
+        key = image if isinstance(image, EmbeddedImage) else os.path.abspath(image)
+        if key not in self.images:
+            if isinstance(key, EmbeddedImage):
+                data, mime = GLBFile(key.filename).image_bytes(key.index)
+            else:
+                data, mime = _image_file_bytes(key)
+            view = self.add_view(data)
+            self.json['images'].append({'bufferView': view, 'mimeType': mime})
+            self.json['textures'].append({'source': len(self.json['images']) - 1, 'sampler': 0})
+            self.images[key] = len(self.json['textures']) - 1
+        return self.images[key]
+
+    def add_material(self, name, color, image=None):
+        color = [float(c) for c in color[:3]]
+        texture = self.add_texture(image) if image else None
+        key = (tuple(color), texture)
+        if key not in self.materials:
+            pbr = {'baseColorFactor': color + [1.0], 'metallicFactor': 0.0, 'roughnessFactor': 1.0}
+            if texture is not None:
+                pbr['baseColorTexture'] = {'index': texture}
+            self.json['materials'].append({'name': name or f"material{len(self.json['materials'])}",
+                                           'pbrMetallicRoughness': pbr})
+            self.materials[key] = len(self.json['materials']) - 1
+        return self.materials[key]
+
+    def add_mesh(self, name, vertex_data, indices, runs):
+        """Grava vértices intercalados no formato da arena e uma primitiva por (primeiro, quantidade, material)."""
+        vertex_data = np.ascontiguousarray(vertex_data, dtype=np.float32)
+        vertex_view = self.add_view(vertex_data, ARRAY_BUFFER, VERTEX_STRIDE)
+        count = len(vertex_data)
+        positions = vertex_data[:, :3]
+        bounds = (positions.min(axis=0).tolist(), positions.max(axis=0).tolist()) if count else None
+        attributes = {'POSITION': self.add_accessor(vertex_view, FLOAT, count, 'VEC3', 0, bounds),
+                      'NORMAL': self.add_accessor(vertex_view, FLOAT, count, 'VEC3', 12),
+                      'TEXCOORD_0': self.add_accessor(vertex_view, FLOAT, count, 'VEC2', 24)}
+
+        index_dtype = np.uint16 if count <= 1 << 16 else np.uint32
+        indices = np.ascontiguousarray(indices, dtype=index_dtype)
+        index_view = self.add_view(indices, ELEMENT_ARRAY_BUFFER)
+        component = INDEX_COMPONENTS[indices.itemsize]
+        primitives = []
+        for first, run_count, material in runs:
+            primitive = {'attributes': attributes, 'mode': TRIANGLES,
+                         'indices': self.add_accessor(index_view, component, int(run_count), 'SCALAR',
+                                                      int(first) * indices.itemsize)}
+            if material is not None:
+                primitive['material'] = material
+            primitives.append(primitive)
+        self.json['meshes'].append({'name': name, 'primitives': primitives})
+        return len(self.json['meshes']) - 1
+
+    def add_node(self, name, transform, mesh=None, extras=None):
+        position, rotation, scale = transform
+        matrix = model_matrices([position], [rotation], [[1, 1, 1]])[0]
+        node = {'name': name, 'translation': [float(v) for v in position],
+                'rotation': quaternion(matrix[:3, :3].astype(np.float64)), 'scale': [float(v) for v in scale]}
+        if mesh is not None:
+            node['mesh'] = mesh
+        if extras is not None:
+            node['extras'] = extras
+        self.json['nodes'].append(node)
+        self.json['scenes'][0]['nodes'].append(len(self.json['nodes']) - 1)
+
+    def save(self, filename, extras=None):
+        if extras is not None:
+            self.json['extras'] = extras
+        if self.size:
+            self.json['buffers'] = [{'byteLength': self.size}]
+        else:
+            del self.json['buffers']
+        # Listas vazias não são válidas no glTF
+        if not self.json['scenes'][0]['nodes']:
+            del self.json['scenes'][0]['nodes']
+        document = {key: value for key, value in self.json.items() if value != []}
+        encoded = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        encoded += b' ' * (-len(encoded) % 4)
+        length = GLB_HEADER.size + CHUNK_HEADER.size + len(encoded) + (CHUNK_HEADER.size + self.size if self.size else 0)
+        with open(filename, 'wb') as f:
+            f.write(GLB_HEADER.pack(GLB_MAGIC, GLB_VERSION, length))
+            f.write(CHUNK_HEADER.pack(len(encoded), CHUNK_JSON))
+            f.write(encoded)
+            if self.size:
+                f.write(CHUNK_HEADER.pack(self.size, CHUNK_BIN))
+                for chunk in self.chunks:
+                    f.write(chunk)
+
+
+def _image_file_bytes(path):
+    mime = IMAGE_TYPES.get(os.path.splitext(path)[1].lower())
+    if mime is not None:
+        with open(path, 'rb') as f:
+            return f.read(), mime
+    # Formatos fora do núcleo do glTF (bmp, tga...) são convertidos para PNG
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.open(path).save(buffer, 'PNG')
+    return buffer.getvalue(), 'image/png'
+
+
+def export_glb(objects, filename, camera=None):
+    """Grava os objetos da cena em um único .glb.
+
+    Cada objeto vira um nó com a sua transformação e, em 'extras', o
+    to_dict() usado por Scene.save_scene, para que read_glb_scene recrie o
+    mesmo tipo de objeto. Malhas .obj/.stl/.ply/.glb carregadas e as
+    geometrias das primitivas (cubo, esfera...) são gravadas com os vértices
+    no formato da arena, para que a importação as mapeie sem cópia, e um
+    material por cor e textura, com as imagens embutidas. Objetos que ainda
+    estão sendo importados são gravados só com o nó.
+    """
+    writer = GLBWriter()
+    for obj in objects:
+        extras = obj.to_dict()
+        name = extras.get('type', type(obj).__name__)
+        model = getattr(obj, 'model', None)
+        mesh = None
+        if model is not None:
+            key = ('model', getattr(obj, 'filename', None), getattr(obj, 'swapyz', False), str(getattr(obj, 'default_mtl', None)))
+            if key not in writer.meshes:
+                vertex_data = np.array(model.vertex_data, dtype=np.float32)
+                if not is_glb(obj.filename):
+                    # UVs do .obj têm origem embaixo; no glTF, no canto superior esquerdo
+                    vertex_data[:, 7] = 1 - vertex_data[:, 7]
+                runs = []
+                for first, count, material in model.draw_runs:
+                    mtl = model.mtl.get(material, {})
+                    runs.append((first, count, writer.add_material(material, mtl.get('Kd', obj.color), mtl.get('map_Kd'))))
+                writer.meshes[key] = writer.add_mesh(os.path.basename(obj.filename), vertex_data, model.indices, runs)
+            mesh = writer.meshes[key]
+        elif getattr(obj, 'geometry', None) is not None:
+            geometry = obj.geometry
+            texture = getattr(obj, 'texture', None) if getattr(obj, 'texture_handle', None) else None
+            key = ('geometry', id(geometry), tuple(obj.color), texture)
+            if key not in writer.meshes:
+                material = writer.add_material(None, obj.color, texture)
+                writer.meshes[key] = writer.add_mesh(name, interleave(geometry.vertices, geometry.normals, geometry.uvs),
+                                                     geometry.indices, [(0, len(geometry.indices), material)])
+            mesh = writer.meshes[key]
+        writer.add_node(name, obj.model_transform(), mesh, extras)
+    writer.save(filename, {'camera': camera} if camera is not None else None)
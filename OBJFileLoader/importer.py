@@ -0,0 +1,166 @@
+import atexit
+import multiprocessing
+import os
+import numpy as np
+from OBJFileLoader.cache import mesh_cache
+from OBJFileLoader.gltf import is_glb
+from OBJFileLoader.objloader import OBJ
+
+# Fração do progresso reservada ao trabalho do processo; o restante é o upload na thread principal
+WORKER_SHARE = 0.9
+
+
+def import_worker(filename, swapyz, material, cache_directory, cache_enabled, smoothing_angle, progress, connection):
+    """Roda num processo separado: lê e monta a malha sem disputar o GIL com a thread de desenho.
+
+    O resultado vai para o cache em disco; a thread principal só mapeia o
+    arquivo. Os arrays só atravessam o pipe quando o cache está desligado ou
+    não pôde ser gravado.
+    """
+    try:
+        mesh_cache.directory = cache_directory
+        mesh_cache.enabled = cache_enabled
+        OBJ.smoothing_angle = smoothing_angle
+        mesh = OBJ.load_data(filename, swapyz, material, lambda fraction: setattr(progress, 'value', fraction))
+
+        bounds = None
+        positions = mesh.arrays['vertex_data'][:, :3]
+        if len(positions):
+            lower, upper = positions.min(axis=0), positions.max(axis=0)
+            bounds = (lower + upper) / 2, float(np.linalg.norm(upper - lower) / 2)
+
+        # Um .glb no formato da arena também é só mapeado de novo pela thread principal
+        cached = cache_enabled and os.path.exists(mesh_cache.entry_path(filename, OBJ.cache_options(swapyz, material)))
+        mapped = is_glb(filename) and isinstance(mesh.arrays['vertex_data'], np.memmap)
+        connection.send(('ok', bounds, None if cached or mapped else mesh))
+    except Exception as e:
+        connection.send(('error', RuntimeError(str(e)), None))
+    finally:
+        connection.close()
+
+
+class ImportJob:
+    """Importação de um .obj em andamento, executada num processo próprio."""
+
+    def __init__(self, filename, swapyz, material, context):
+        self.filename = filename
+        self.swapyz = swapyz
+        self.material = material
+        self.mesh = None  # CachedMesh quando o processo termina
+        self.bounds = None  # (centro, raio) local calculado no processo
+        self.error = None
+        self.finished = False
+        self.process = None
+        self.shared_progress = context.Value('d', 0.0, lock=False)
+        self.connection, self.worker_connection = context.Pipe(duplex=False)
+
+    @property
+    def name(self):
+        return os.path.basename(self.filename)
+
+    @property
+    def progress(self):
+        return WORKER_SHARE if self.finished else WORKER_SHARE * self.shared_progress.value
+
+    def start(self, context):
+        # Não é daemon para poder abrir o pool da leitura paralela; MeshImporter.shutdown o encerra na saída
+        self.process = context.Process(target=import_worker, name=f'mesh-import {self.name}',
+                                       args=(self.filename, self.swapyz, self.material, mesh_cache.directory,
+                                             mesh_cache.enabled, OBJ.smoothing_angle, self.shared_progress,
+                                             self.worker_connection))
+        self.process.start()
+        self.worker_connection.close()
+
+    def poll(self):
+        if self.finished or self.process is None:
+            return
+        if self.connection.poll():
+            self.receive()
+        elif not self.process.is_alive():
+            # O processo pode ter enviado o resultado e saído entre as duas verificações
+            if self.connection.poll():
+                self.receive()
+                return
+            if self.process.exitcode == 0:
+                self.error = RuntimeError("o processo de importação terminou sem enviar o resultado")
+            else:
+                self.error = RuntimeError(f"o processo de importação terminou com código {self.process.exitcode}")
+            self.finish_process()
+
+    def receive(self):
+        try:
+            status, payload, mesh = self.connection.recv()
+        except EOFError:
+            status, payload, mesh = 'error', RuntimeError("o processo de importação terminou sem resposta"), None
+        if status == 'error':
+            self.error = payload
+        else:
+            # Normalmente o processo deixou a malha no cache: aqui ela só é mapeada do disco
+            self.bounds = payload
+            self.mesh = mesh or mesh_cache.load(self.filename, OBJ.cache_options(self.swapyz, self.material))
+            if self.mesh is None:
+                self.mesh = OBJ.load_data(self.filename, self.swapyz, self.material)
+        self.finish_process()
+
+    def finish_process(self):
+        self.finished = True
+        self.process.join()
+        self.connection.close()
+
+    def cancel(self):
+        if self.process is not None and not self.finished:
+            self.process.terminate()
+            self.finish_process()
+        self.finished = True
+
+
+class MeshImporter:
+    """Importa arquivos .obj em processos separados, até max_workers ao mesmo tempo.
+
+    O processo faz tudo que não toca no OpenGL (cache em disco, parsing e
+    montagem dos vértices); a thread principal cria o OBJ com o resultado e
+    envia vértices e índices para a arena respeitando upload_budget elementos
+    por quadro, somados entre todas as importações em andamento.
+    """
+
+    def __init__(self, max_workers=None, upload_budget=1 << 18):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.upload_budget = upload_budget
+        # spawn: o processo filho não herda o contexto OpenGL nem as threads do pygame
+        self.context = multiprocessing.get_context('spawn')
+        self.jobs = []
+        atexit.register(self.shutdown)
+
+    def submit(self, filename, swapyz=False, material=None):
+        job = ImportJob(filename, swapyz, material, self.context)
+        self.jobs.append(job)
+        self.poll()
+        return job
+
+    def poll(self):
+        # Inicia os pendentes enquanto houver vaga e coleta os resultados dos que terminaram
+        running = sum(1 for job in self.jobs if job.process is not None and not job.finished)
+        for job in self.jobs:
+            if job.process is None and running < self.max_workers:
+                job.start(self.context)
+                running += 1
+            job.poll()
+
+    def finish(self, job):
+        job.cancel()
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def shutdown(self):
+        # Registrado depois do atexit do multiprocessing, roda antes dele: os processos
+        # em andamento são interrompidos em vez de aguardados
+        for job in self.jobs:
+            job.cancel()
+        self.jobs.clear()
+
+    @property
+    def busy(self):
+        return bool(self.jobs)
+
+
+mesh_importer = MeshImporter()
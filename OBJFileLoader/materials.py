@@ -0,0 +1,70 @@
+import os
+from utils.textures import file_key, texture_manager
+from OBJFileLoader.gltf import EmbeddedImage, is_glb, parse_glb_materials
+
+
+def parse_mtl(filename):
+    """Lê um arquivo .mtl; map_Kd fica como caminho absoluto da imagem, sem carregar a textura."""
+    contents = {}
+    mtl = None
+    dirname = os.path.dirname(filename)
+
+    for line in open(filename, "r"):
+        if line.startswith('#'): continue
+        values = line.split()
+        if not values: continue
+        if values[0] == 'newmtl':
+            mtl = contents[values[1]] = {}
+        elif mtl is None:
+            raise ValueError("mtl file doesn't start with newmtl stmt")
+        elif values[0] == 'map_Kd':
+            mtl[values[0]] = os.path.abspath(os.path.join(dirname, values[1]))
+        else:
+            mtl[values[0]] = list(map(float, values[1:]))
+    return contents
+
+
+class MaterialRegistry:
+    """Materiais .mtl (ou os de um .glb) compartilhados por todos os modelos do processo.
+
+    Os arquivos são indexados pelo caminho absoluto, com o carimbo (tamanho,
+    mtime) guardado junto: o mesmo arquivo é lido uma vez, por mais modelos
+    que o usem, e um arquivo editado substitui a entrada anterior. As
+    texturas dos map_Kd vêm do texture_manager, com um handle por modelo.
+    """
+
+    def __init__(self):
+        self.materials = {}  # caminho absoluto do .mtl -> (carimbo, conteúdo lido por parse_mtl)
+        self.hits = 0
+        self.misses = 0
+
+    def load_material(self, filename):
+        """Retorna (materiais, handles de textura); os handles devem voltar por release().
+
+        Cada material com map_Kd ganha 'texture_Kd' com o TextureHandle da
+        textura compartilhada. Os dicionários retornados são cópias rasas e
+        podem ser guardados pelo modelo.
+        """
+        key = file_key(filename)
+        path, stamp = key[0], key[1:]
+        cached_stamp, materials = self.materials.get(path, (None, None))
+        if cached_stamp != stamp:
+            materials = parse_glb_materials(filename) if is_glb(filename) else parse_mtl(filename)
+            self.materials[path] = stamp, materials
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        contents, handles = {}, []
+        for name, values in materials.items():
+            mtl = contents[name] = dict(values)
+            if 'map_Kd' in values:
+                # As UVs do glTF têm origem no canto superior esquerdo: só as imagens do .obj têm as linhas invertidas
+                image = values['map_Kd']
+                handle = texture_manager.acquire(image, flip=not isinstance(image, EmbeddedImage), mipmaps=True)
+                handles.append(handle)
+                mtl['texture_Kd'] = handle
+        return contents, handles
+
+
+material_registry = MaterialRegistry()
@@ -0,0 +1,148 @@
+import numpy as np
+
+# Faces vizinhas com ângulo maior que este formam uma aresta viva mesmo dentro de um grupo suavizado
+DEFAULT_SMOOTHING_ANGLE = 60.0
+# Limite de pares (canto, face vizinha) avaliados de uma vez; controla a memória do passo suavizado
+PAIR_BATCH = 1 << 22
+
+
+def face_normals(data):
+    """Normal de cada face pelo método de Newell, com módulo igual ao dobro da área.
+
+    Funciona para polígonos de qualquer número de cantos, mesmo um pouco
+    fora do plano, e dá peso maior às faces maiores na média suavizada.
+    """
+    positions = np.vstack([np.zeros((1, 3), dtype=np.float32), data.vertices]).astype(np.float64)
+    corners = positions[data.corner_vertices]
+    sizes = data.face_sizes
+    face_starts = np.cumsum(sizes) - sizes
+    # Próximo canto de cada canto dentro da sua face, voltando ao primeiro no fim
+    following = np.arange(len(corners)) + 1
+    following[face_starts + sizes - 1] = face_starts
+    return np.add.reduceat(np.cross(corners, corners[following]), face_starts, axis=0)
+
+
+def generate_normals(data, smoothing_angle=DEFAULT_SMOOTHING_ANGLE):
+    """Calcula normais para os cantos sem 'vn' e as acrescenta a data.normals.
+
+    Faces com 's off' (grupo 0) recebem a normal da face. As demais, inclusive
+    as de arquivos sem nenhum 's', são suavizadas: cada canto soma as normais
+    das faces do mesmo grupo que compartilham o vértice, desde que o ângulo
+    com a sua face não passe de smoothing_angle. Os cantos passam a apontar
+    para as normais novas, então a solda de vértices separa corretamente os
+    cantos com normais diferentes.
+    """
+    missing = data.corner_normals == 0
+    if not missing.any():
+        return
+
+    normals = face_normals(data)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    unit = normals / np.where(lengths == 0, 1, lengths)
+
+    corner_face = np.repeat(np.arange(len(data.face_sizes)), data.face_sizes)
+    corner_group = data.face_groups[corner_face]
+    flat = np.flatnonzero(missing & (corner_group == 0))
+    smooth = np.flatnonzero(missing & (corner_group != 0))
+
+    generated = [data.normals]
+    next_index = len(data.normals) + 1
+
+    if len(flat):
+        faces, face_rank = np.unique(corner_face[flat], return_inverse=True)
+        generated.append(unit[faces])
+        data.corner_normals[flat] = next_index + face_rank.ravel()
+        next_index += len(faces)
+
+    if len(smooth):
+        values, cluster = _smooth_normals(data.corner_vertices[smooth], corner_group[smooth], corner_face[smooth],
+                                          normals, unit, np.cos(np.radians(smoothing_angle)))
+        first, inverse = distinct_rows(values, cluster)
+        generated.append(values[first])
+        data.corner_normals[smooth] = next_index + inverse
+
+    data.normals = np.concatenate(generated).astype(np.float32)
+
+
+def _smooth_normals(vertices, groups, faces, normals, unit, min_cosine):
+    # Agrupa os cantos por (vértice, grupo de suavização); cada canto é
+    # comparado com todas as faces do seu agrupamento, em lotes de pares
+    group_values, group_rank = np.unique(groups, return_inverse=True)
+    key = vertices * len(group_values) + group_rank.ravel()
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    sorted_cluster = np.concatenate([[0], np.cumsum(sorted_key[1:] != sorted_key[:-1])])
+    sorted_faces = faces[order]
+    cluster_sizes = np.bincount(sorted_cluster)
+    cluster_starts = np.cumsum(cluster_sizes) - cluster_sizes
+    degenerate = ~unit.any(axis=1)
+
+    # Atalho: se todas as faces do agrupamento estão a menos de metade do
+    # ângulo da média, quaisquer duas estão a menos do ângulo inteiro e todos
+    # os cantos recebem a própria média; só os demais comparam faces par a par
+    result = np.stack([np.bincount(sorted_cluster, weights=normals[sorted_faces, axis]) for axis in range(3)], axis=1)
+    mean = result / np.maximum(np.linalg.norm(result, axis=1, keepdims=True), 1e-300)
+    close = np.einsum('ij,ij->i', unit[sorted_faces], mean[sorted_cluster]) >= np.cos(np.arccos(min_cosine) / 2)
+    uniform = np.bincount(sorted_cluster, weights=~close, minlength=len(cluster_sizes)) == 0
+    result = result[sorted_cluster]
+
+    # Para cada canto que precisa dos pares (na ordem agrupada): onde começa e quantos membros tem o seu agrupamento
+    pending = np.flatnonzero(~uniform[sorted_cluster])
+    member_starts = cluster_starts[sorted_cluster[pending]]
+    member_counts = cluster_sizes[sorted_cluster[pending]]
+    pair_ends = np.cumsum(member_counts)
+
+    first = 0
+    while first < len(pending):
+        limit = (pair_ends[first - 1] if first else 0) + PAIR_BATCH
+        last = max(first + 1, int(np.searchsorted(pair_ends, limit, side='right')))
+        counts = member_counts[first:last]
+        owner = np.repeat(np.arange(first, last), counts)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        neighbor = sorted_faces[member_starts[owner] + offset]
+        own = sorted_faces[pending[owner]]
+
+        # Faces degeneradas (área zero) não têm direção própria e aceitam todas as vizinhas
+        accepted = (np.einsum('ij,ij->i', unit[own], unit[neighbor]) >= min_cosine) | degenerate[own]
+        owner, neighbor = owner[accepted] - first, neighbor[accepted]
+        for axis in range(3):
+            result[pending[first:last], axis] = np.bincount(owner, weights=normals[neighbor, axis],
+                                                            minlength=last - first)
+        first = last
+
+    lengths = np.linalg.norm(result, axis=1, keepdims=True)
+    result = np.where(lengths == 0, unit[sorted_faces], result / np.where(lengths == 0, 1, lengths))
+    values = np.empty_like(result)
+    values[order] = result
+    cluster = np.empty_like(sorted_cluster)
+    cluster[order] = sorted_cluster
+    return values.astype(np.float32), cluster
+
+
+def distinct_rows(values, cluster=None):
+    """Uma entrada por linha float32 distinta em cada agrupamento: (primeira linha de cada entrada, entrada de cada linha).
+
+    Ordena por um hash de 64 bits do agrupamento e dos bits da linha e
+    compara os vizinhos; uma colisão de hash só deixaria de juntar duas
+    entradas iguais. Sem cluster, todas as linhas estão no mesmo agrupamento.
+    """
+    if cluster is None:
+        cluster = np.zeros(len(values), dtype=np.int64)
+    bits = values.view(np.uint32).astype(np.uint64)
+    key = cluster.astype(np.uint64)
+    for column in range(bits.shape[1]):
+        key = key * np.uint64(0x9E3779B97F4A7C15) + bits[:, column]
+    # Finalizador do splitmix64: espalha os bits altos do produto pelos baixos
+    key ^= key >> np.uint64(31)
+    key *= np.uint64(0xBF58476D1CE4E5B9)
+    key ^= key >> np.uint64(29)
+
+    order = np.argsort(key)
+    sorted_key, sorted_values, sorted_cluster = key[order], values[order], cluster[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = ((sorted_key[1:] != sorted_key[:-1]) | (sorted_cluster[1:] != sorted_cluster[:-1])
+                  | (sorted_values[1:] != sorted_values[:-1]).any(axis=1))
+    entry = np.cumsum(starts) - 1
+    inverse = np.empty_like(entry)
+    inverse[order] = entry
+    return order[starts], inverse
@@ -1,58 +1,51 @@
 import os
-import pygame
 import numpy as np
 from OpenGL.GL import *
-from OpenGL.arrays import vbo
+from utils.gl_state import gl_state
+from utils.geometry_arena import geometry_arena
+from utils.textures import texture_manager
+from utils.vertex_format import VERTEX_FLOATS, VERTEX_STRIDE, interleave
+from OBJFileLoader.binary_formats import BINARY_PARSERS
+from OBJFileLoader.cache import CachedMesh, mesh_cache
+from OBJFileLoader.gltf import is_glb, load_glb_mesh
+from OBJFileLoader.materials import material_registry
+from OBJFileLoader.normals import DEFAULT_SMOOTHING_ANGLE, generate_normals
+from OBJFileLoader.parser import parse_obj
+
+
+def format_size(size):
+    return f"{size / 2 ** 20:.1f} MB" if size >= 2 ** 20 else f"{size / 1024:.1f} KB"
+
 
 class OBJ:
     generate_on_init = True
+    # Processos usados para ler arquivos grandes (ver parser.PARALLEL_MIN_BYTES); 1 desliga o modo paralelo
+    parse_workers = os.cpu_count() or 1
+    # Ângulo máximo entre faces suavizadas nas normais calculadas para cantos sem 'vn'
+    smoothing_angle = DEFAULT_SMOOTHING_ANGLE
+    # Imprime weld_report() a cada modelo carregado; desligado para não poluir o console nas importações
+    verbose = False
     
-    @classmethod
-    def loadTexture(cls, imagefile):
-        surf = pygame.image.load(imagefile)
-        image = pygame.image.tostring(surf, 'RGBA', 1)
-        ix, iy = surf.get_rect().size
-        texid = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texid)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ix, iy, 0, GL_RGBA, GL_UNSIGNED_BYTE, image)
-        glGenerateMipmap(GL_TEXTURE_2D)  # Generate mipmaps
-        return texid
-
-    @classmethod
-    def loadMaterial(cls, filename):
-        contents = {}
-        mtl = None
-        dirname = os.path.dirname(filename)
-
-        for line in open(filename, "r"):
-            if line.startswith('#'): continue
-            values = line.split()
-            if not values: continue
-            if values[0] == 'newmtl':
-                mtl = contents[values[1]] = {}
-            elif mtl is None:
-                raise ValueError("mtl file doesn't start with newmtl stmt")
-            elif values[0] == 'map_Kd':
-                # Load the texture referred to by this declaration
-                mtl[values[0]] = values[1]
-                imagefile = os.path.join(dirname, mtl['map_Kd'])
-                mtl['texture_Kd'] = cls.loadTexture(imagefile)
-            else:
-                mtl[values[0]] = list(map(float, values[1:]))
+    def loadMaterial(self, filename):
+        # O .mtl vem do registro compartilhado e as texturas do texture_manager; os handles são devolvidos em delete()
+        contents, textures = material_registry.load_material(filename)
+        self.textures.extend(textures)
         return contents
 
-    def __init__(self, filename, swapyz=False, default_mtl: tuple[str, str]=None):
-        """Loads a Wavefront OBJ file."""
-        self.vertices = []
-        self.normals = []
-        self.texcoords = []
-        self.faces = []
-        self.vbo_vertices = None
-        self.vbo_texcoords = None
-        self.vbo_normals = None
-        self.gl_list = 0
+    def __init__(self, filename, swapyz=False, default_mtl: tuple[str, str]=None, mesh=None):
+        """Loads a Wavefront OBJ file (or a binary STL/PLY or a .glb, see binary_formats and gltf).
+
+        mesh recebe os arrays já preparados por load_data (ex.: numa thread de
+        importação) e, nesse caso, o envio para a GPU fica a cargo de quem
+        chamou, via upload(); sem ele, o arquivo é lido aqui mesmo.
+        """
+        self.mtl = {}
+        self.textures = []  # handles do texture_manager usados pelos materiais deste modelo
+        self.draw_runs = []
+        self.allocation = None
+        self.uploaded = 0
+        self.uploaded_indices = 0
+        self.name = os.path.basename(filename)
         dirname = os.path.dirname(filename)
 
         material = None
@@ -61,137 +54,186 @@ class OBJ:
             self.mtl = self.loadMaterial(path)
             material = mtl
 
-        for line in open(filename, "r"):
-            if line.startswith('#'): continue
-            values = line.split()
-            if not values: continue
-            if values[0] == 'v':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.vertices.append(v)
-            elif values[0] == 'vn':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.normals.append(v)
-            elif values[0] == 'vt':
-                self.texcoords.append(list(map(float, values[1:3])))
-            elif values[0] in ('usemtl', 'usemat'):
-                material = values[1]
-            elif values[0] == 'mtllib':
-                self.mtl = self.loadMaterial(os.path.join(dirname, values[1]))
-            elif values[0] == 'f':
-                face = []
-                texcoords = []
-                norms = []
-                for v in values[1:]:
-                    w = v.split('/')
-                    face.append(int(w[0]))
-                    if len(w) >= 2 and len(w[1]) > 0:
-                        texcoords.append(int(w[1]))
-                    else:
-                        texcoords.append(0)
-                    if len(w) >= 3 and len(w[2]) > 0:
-                        norms.append(int(w[2]))
-                    else:
-                        norms.append(0)
-                self.faces.append((face, norms, texcoords, material))
-
-        if self.generate_on_init:
+        generate = self.generate_on_init and mesh is None
+        if mesh is None:
+            mesh = self.load_data(filename, swapyz, material)
+
+        self.vertex_data = mesh.arrays['vertex_data']
+        self.indices = mesh.arrays['indices']
+        self.vertices = self.vertex_data[:, :3]
+        self.draw_runs = [[first, count, mesh.materials[material_index]]
+                          for first, count, material_index in mesh.arrays['draw_runs'].tolist()]
+        for library in mesh.material_libs:
+            self.mtl = self.loadMaterial(os.path.join(dirname, library))
+
+        if self.verbose and len(self.indices):
+            print(self.weld_report())
+        if generate:
             self.generate()
 
-    def generate(self):
-        self.gl_list = glGenLists(1)
-        glNewList(self.gl_list, GL_COMPILE)
-        glEnable(GL_TEXTURE_2D)
-        glFrontFace(GL_CCW)
+    @classmethod
+    def load_data(cls, filename, swapyz=False, material=None, progress=None):
+        """Arrays prontos para a GPU do arquivo, sem nenhuma chamada ao OpenGL; pode rodar fora da thread principal."""
+        if is_glb(filename):
+            # O .glb já é binário: no formato da arena os arrays são visões do próprio arquivo,
+            # então não passa pelo cache em disco
+            mesh = load_glb_mesh(filename, swapyz, material)
+            return mesh if isinstance(mesh, CachedMesh) else cls.build(mesh, cls.smoothing_angle)
+        # Um acerto no cache em disco traz os arrays mapeados do arquivo, sem parsing
+        # nem cálculo de normais
+        options = cls.cache_options(swapyz, material)
+        mesh = mesh_cache.load(filename, options)
+        if mesh is None:
+            parse = BINARY_PARSERS.get(os.path.splitext(filename)[1].lower())
+            if parse is not None:
+                data = parse(filename, swapyz, material, progress)
+            else:
+                data = parse_obj(filename, swapyz, material, progress, cls.parse_workers)
+            mesh = cls.build(data, cls.smoothing_angle)
+            mesh_cache.store(filename, options, mesh.arrays, mesh.materials, mesh.material_libs)
+        return mesh
 
-        # Data buffers
-        data_vertices = []
-        data_normals = []
-        data_texcoords = []
+    @classmethod
+    def cache_options(cls, swapyz=False, material=None):
+        # Tudo que muda os arrays gerados entra na chave do cache
+        return {'swapyz': swapyz, 'material': material, 'smoothing_angle': cls.smoothing_angle}
+
+    @staticmethod
+    def build(data, smoothing_angle=DEFAULT_SMOOTHING_ANGLE):
+        """Converte o .obj lido em vértices únicos intercalados, índices de triângulos e intervalos de desenho.
+
+        Cantos com o mesmo trio (v, vt, vn) viram um só vértice; os índices
+        ficam em uint16 quando o modelo tem até 65536 vértices únicos. Os
+        polígonos viram leques de triângulos e os triângulos são agrupados
+        por material, então cada material é um único intervalo contíguo:
+        [primeiro índice, quantidade, índice do material]. Cantos sem normal
+        recebem normais calculadas por generate_normals.
+        """
+        sizes = data.face_sizes
+        names, range_material = data.face_materials()
+        # O mesmo material pode aparecer em vários usemtl; cada nome vira um grupo só
+        materials = list(dict.fromkeys(names))
+        face_material = np.asarray([materials.index(name) for name in names], dtype=np.int64)[range_material]
+
+        # Leque a partir do primeiro canto: a face de n cantos gera n - 2 triângulos (0, k + 1, k + 2)
+        triangle_counts = np.maximum(sizes - 2, 0)
+        triangle_face = np.repeat(np.arange(len(sizes)), triangle_counts)
+        fan = np.arange(len(triangle_face)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+        first_corner = (np.cumsum(sizes) - sizes)[triangle_face]
+        triangles = np.stack([first_corner, first_corner + fan + 1, first_corner + fan + 2], axis=1)
+
+        # Ordenação estável: dentro de cada material, os triângulos mantêm a ordem do arquivo
+        triangle_material = face_material[triangle_face]
+        order = np.argsort(triangle_material, kind='stable')
+        triangles = triangles[order]
+        run_materials, run_starts, run_counts = np.unique(triangle_material[order], return_index=True,
+                                                          return_counts=True)
+        draw_runs = np.stack([run_starts * 3, run_counts * 3, run_materials], axis=1).astype(np.int64).reshape(-1, 3)
+
+        generate_normals(data, smoothing_angle)
+        unique, corner_vertex = data.weld()
+        index_dtype = np.uint16 if len(unique[0]) <= 1 << 16 else np.uint32
+        return CachedMesh({'vertex_data': interleave(*unique),
+                           'indices': corner_vertex[triangles.ravel()].astype(index_dtype),
+                           'draw_runs': draw_runs}, materials, data.material_libs)
+
+    def weld_report(self):
+        """Resumo do que a tabela de vértices únicos economiza em relação a um vértice por canto de triângulo."""
+        corners, unique = len(self.indices), len(self.vertex_data)
+        expanded = corners * VERTEX_STRIDE
+        indexed = unique * VERTEX_STRIDE + self.indices.nbytes
+        # Com índices, o cache pós-transformação da GPU evita sombrear de novo um vértice
+        # repetido; no melhor caso cada vértice único passa uma vez pelo vertex shader
+        return (f"{self.name}: {corners} cantos de triângulo -> {unique} vértices únicos "
+                f"(índices de {self.indices.itemsize * 8} bits); memória na GPU "
+                f"{format_size(expanded)} -> {format_size(indexed)} ({indexed / expanded - 1:+.0%}), "
+                f"execuções do vertex shader {corners} -> até {unique} ({unique / corners - 1:+.0%})")
 
-        for face in self.faces:
-            vertices, normals, texture_coords, material = face
+    def generate(self):
+        self.free_geometry()
+        self.upload(len(self.vertex_data) + len(self.indices))
+
+    def upload(self, budget):
+        """Envia até budget vértices e índices para a arena e retorna quantos foram enviados.
+
+        Chamado a cada quadro, espalha o upload de uma malha grande por vários
+        quadros: primeiro os vértices, depois os índices. A malha só é
+        desenhada quando ready fica verdadeiro.
+        """
+        if self.allocation is None:
+            # Vértices intercalados com posição, normal e UV em uma faixa da arena de geometria;
+            # num acerto do cache o upload lê direto das páginas mapeadas
+            self.allocation = geometry_arena.reserve(len(self.vertex_data), len(self.indices),
+                                                     self.indices.itemsize)
+            self.uploaded = self.uploaded_indices = 0
+        count = min(budget, len(self.vertex_data) - self.uploaded)
+        geometry_arena.write_vertices(self.allocation, self.vertex_data[self.uploaded:self.uploaded + count],
+                                      self.uploaded)
+        self.uploaded += count
+
+        index_count = min(budget - count, len(self.indices) - self.uploaded_indices)
+        geometry_arena.write_indices(self.allocation,
+                                     self.indices[self.uploaded_indices:self.uploaded_indices + index_count],
+                                     self.uploaded_indices)
+        self.uploaded_indices += index_count
+        return count + index_count
+
+    @property
+    def upload_progress(self):
+        total = len(self.vertex_data) + len(self.indices)
+        return (self.uploaded + self.uploaded_indices) / total if total else 1.0
+
+    @property
+    def ready(self):
+        return (self.allocation is not None and self.uploaded == len(self.vertex_data)
+                and self.uploaded_indices == len(self.indices))
+
+    def apply_material(self, material, color=True):
+        mtl = self.mtl.get(material, {})
+        texture = mtl.get('texture_Kd')
+        if texture is not None and texture.texture_id:
+            # Use diffuse texmap
+            gl_state.enable(GL_TEXTURE_2D)
+            texture_manager.bind(texture.texture_id)
+        else:
+            # Just use diffuse color (também enquanto a textura é decodificada)
+            gl_state.disable(GL_TEXTURE_2D)
+            if color and 'Kd' in mtl:
+                gl_state.color(*mtl['Kd'][:3])
+
+    def render(self, materials=True, color=True):
+        """Desenha o modelo, um intervalo por material.
+
+        Com materials=False a textura e a cor já aplicadas por quem chamou
+        (ex.: a textura escolhida para o Mesh ou a cor da sombra) valem para
+        o modelo inteiro; com color=False os materiais trocam só a textura,
+        mantendo a cor atual (ex.: a de seleção).
+        """
+        if self.allocation is None:
+            return
 
-            mtl = self.mtl[material]
-            if 'texture_Kd' in mtl:
-                # Use diffuse texmap
-                glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
-            else:
-                # Just use diffuse color
-                glColor(*mtl['Kd'])
-
-            for i in range(len(vertices)):
-                data_vertices.append(self.vertices[vertices[i] - 1])
-
-                if normals[i] > 0:
-                    data_normals.append(self.normals[normals[i] - 1])
-                else:
-                    data_normals.append((0, 0, 0))  # Default normal
-
-                if texture_coords[i] > 0:
-                    data_texcoords.append(self.texcoords[texture_coords[i] - 1])
-                else:
-                    data_texcoords.append((0, 0))  # Default texcoord
-
-        # Convert lists to numpy arrays for VBO
-        data_vertices = np.array(data_vertices, dtype='f')
-        data_normals = np.array(data_normals, dtype='f')
-        data_texcoords = np.array(data_texcoords, dtype='f')
-
-        # Create VBOs
-        self.vbo_vertices = vbo.VBO(data_vertices)
-        self.vbo_normals = vbo.VBO(data_normals)
-        self.vbo_texcoords = vbo.VBO(data_texcoords)
-
-        # Bind and draw VBOs
-        self.vbo_vertices.bind()
-        glEnableClientState(GL_VERTEX_ARRAY)
-        glVertexPointer(3, GL_FLOAT, 0, self.vbo_vertices)
-
-        self.vbo_normals.bind()
-        glEnableClientState(GL_NORMAL_ARRAY)
-        glNormalPointer(GL_FLOAT, 0, self.vbo_normals)
-
-        self.vbo_texcoords.bind()
-        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
-        glTexCoordPointer(2, GL_FLOAT, 0, self.vbo_texcoords)
-
-        # Use GL_POLYGON for each face
-        face_start = 0
-        for face in self.faces:
-            vertices, normals, texture_coords, material = face
-            face_len = len(vertices)
-            glDrawArrays(GL_POLYGON, face_start, face_len)
-            face_start += face_len
-
-        # Disable client states
-        glDisableClientState(GL_VERTEX_ARRAY)
-        glDisableClientState(GL_NORMAL_ARRAY)
-        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
-
-        # Unbind VBOs
-        self.vbo_vertices.unbind()
-        self.vbo_normals.unbind()
-        self.vbo_texcoords.unbind()
-
-        glDisable(GL_TEXTURE_2D)
-        glEndList()
-
-    def render(self):
-        glCallList(self.gl_list)
+        glFrontFace(GL_CCW)
+        geometry_arena.bind()
+        # Um intervalo por material: o estado do material é aplicado uma vez por chamada de desenho
+        for first, count, material in self.draw_runs:
+            if materials:
+                self.apply_material(material, color)
+            geometry_arena.draw_range(self.allocation, GL_TRIANGLES, first, count)
+
+    def free_geometry(self):
+        # Devolve a faixa à arena; não chama o OpenGL, então também é seguro a partir de __del__
+        if self.allocation is not None:
+            geometry_arena.free(self.allocation)
+            self.allocation = None
+            self.uploaded = self.uploaded_indices = 0
+
+    def delete(self):
+        # As texturas sem outras referências são apagadas depois, por texture_manager.collect()
+        self.free_geometry()
+        for handle in self.textures:
+            handle.release()
+        self.textures = []
 
     def __del__(self):
-        if self.vbo_vertices:
-            self.vbo_vertices.delete()
-        if self.vbo_normals:
-            self.vbo_normals.delete()
-        if self.vbo_texcoords:
-            self.vbo_texcoords.delete()
-        if self.gl_list:
-            try:
-                glDeleteLists(self.gl_list, 1)
-            except OpenGL.error.GLError:
-                pass
+        if hasattr(self, 'textures'):
+            self.delete()
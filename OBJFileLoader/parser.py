@@ -0,0 +1,392 @@
+import multiprocessing
+import os
+import re
+import numpy as np
+
+SPACE = ord(' ')
+NEWLINE = ord('\n')
+SLASH = ord('/')
+WHITESPACE = bytes.maketrans(b'\t\r\x0b\x0c', b'    ')
+READ_CHUNK = 8 * 1024 * 1024
+LEADING_SPACES = re.compile(rb'^ +', re.MULTILINE)
+INLINE_COMMENT = re.compile(rb'[^\n]#')
+
+# Modo paralelo: só compensa em arquivos grandes; cada processo recebe várias
+# faixas para equilibrar a carga (blocos de faces custam mais que os de vértices)
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+PARALLEL_CHUNK_MIN = 16 * 1024 * 1024
+CHUNKS_PER_WORKER = 4
+
+# Tipos de linha e o prefixo removido de cada registro antes da conversão
+BLANK, OTHER, VERTEX, NORMAL, TEXCOORD, FACE = range(6)
+PREFIXES = {VERTEX: b'v ', NORMAL: b'vn ', TEXCOORD: b'vt ', FACE: b'f '}
+
+# Grupo de suavização das faces antes de qualquer 's'; 0 é 's off'
+NO_GROUP = -1
+
+
+class OBJData:
+    """Conteúdo de um arquivo .obj em arrays NumPy.
+
+    Os cantos das faces ficam em três arrays paralelos de índices (posição, UV
+    e normal) na convenção do arquivo: base 1 e 0 para componente ausente. Os
+    índices negativos já chegam resolvidos. face_sizes guarda o número de
+    cantos de cada face e material_ranges os pares (primeira face, material)
+    vindos dos usemtl. face_groups é o grupo de suavização ('s') de cada
+    face: 0 para 's off' e NO_GROUP antes da primeira declaração.
+    """
+
+    def __init__(self):
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+        self.normals = np.zeros((0, 3), dtype=np.float32)
+        self.texcoords = np.zeros((0, 2), dtype=np.float32)
+        self.corner_vertices = np.zeros(0, dtype=np.int64)
+        self.corner_texcoords = np.zeros(0, dtype=np.int64)
+        self.corner_normals = np.zeros(0, dtype=np.int64)
+        self.face_sizes = np.zeros(0, dtype=np.int64)
+        self.face_groups = np.zeros(0, dtype=np.int64)
+        self.material_ranges = []
+        self.material_libs = []
+        # Usados para costurar faixas lidas em paralelo: posições dos cantos cujos
+        # índices eram negativos (por componente) e o material e o grupo ativos no fim dos dados
+        self.relative_corners = (np.zeros(0, dtype=np.int64),) * 3
+        self.final_material = None
+        self.final_group = NO_GROUP
+
+    def face_materials(self):
+        # Material de cada face, expandido a partir dos intervalos
+        materials = [material for _, material in self.material_ranges]
+        firsts = [first for first, _ in self.material_ranges] + [len(self.face_sizes)]
+        return materials, np.repeat(np.arange(len(materials)), np.diff(firsts))
+
+    def corner_arrays(self):
+        """Posição, normal e UV de cada canto de face, na ordem das faces.
+
+        Componentes ausentes (índice 0) viram zeros, como no carregador antigo.
+        """
+        vertices = np.vstack([np.zeros((1, 3), dtype=np.float32), self.vertices])
+        normals = np.vstack([np.zeros((1, 3), dtype=np.float32), self.normals])
+        texcoords = np.vstack([np.zeros((1, 2), dtype=np.float32), self.texcoords])
+        return (vertices[self.corner_vertices], normals[self.corner_normals],
+                texcoords[self.corner_texcoords])
+
+    def weld(self):
+        """Junta os cantos com o mesmo trio (v, vt, vn) em uma tabela de vértices únicos.
+
+        Retorna (posições, normais, UVs) dos vértices únicos, na ordem em que
+        aparecem pela primeira vez nas faces, e o índice de cada canto nessa
+        tabela.
+        """
+        texcoord_span = len(self.texcoords) + 1
+        normal_span = len(self.normals) + 1
+        if (len(self.vertices) + 1) * texcoord_span * normal_span < 2 ** 63:
+            keys = (self.corner_vertices * texcoord_span + self.corner_texcoords) * normal_span + self.corner_normals
+            _, first_corner, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        else:
+            # O trio não cabe em um inteiro de 64 bits; compara as linhas inteiras
+            keys = np.stack([self.corner_vertices, self.corner_texcoords, self.corner_normals], axis=1)
+            _, first_corner, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+        # np.unique ordena pela chave; a ordem de primeira ocorrência mantém
+        # vizinhos nas faces perto também na tabela e no cache pós-transformação
+        order = np.argsort(first_corner)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        corners = first_corner[order]
+
+        vertices = np.vstack([np.zeros((1, 3), dtype=np.float32), self.vertices])
+        normals = np.vstack([np.zeros((1, 3), dtype=np.float32), self.normals])
+        texcoords = np.vstack([np.zeros((1, 2), dtype=np.float32), self.texcoords])
+        unique = (vertices[self.corner_vertices[corners]], normals[self.corner_normals[corners]],
+                  texcoords[self.corner_texcoords[corners]])
+        return unique, rank[inverse.ravel()]
+
+
+def parse_obj(filename, swapyz=False, material=None, progress=None, workers=1):
+    """Lê um arquivo .obj inteiro de uma vez e o converte em OBJData.
+
+    progress, se informado, recebe a fração concluída (0 a 1): a leitura do
+    arquivo em blocos ocupa a primeira metade e a conversão a segunda. Com
+    workers > 1, arquivos a partir de PARALLEL_MIN_BYTES são lidos por
+    parse_obj_parallel.
+    """
+    if workers > 1 and os.path.getsize(filename) >= PARALLEL_MIN_BYTES:
+        return parse_obj_parallel(filename, swapyz, material, workers, progress)
+    with open(filename, 'rb') as f:
+        if progress is None:
+            data = f.read()
+        else:
+            size = max(os.fstat(f.fileno()).st_size, 1)
+            chunks = []
+            for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                chunks.append(chunk)
+                progress(0.5 * min(f.tell() / size, 1.0))
+            data = b''.join(chunks)
+    report = (lambda fraction: progress(0.5 + 0.5 * fraction)) if progress else None
+    return parse_obj_bytes(data, swapyz, material, report)
+
+
+def parse_obj_parallel(filename, swapyz=False, material=None, workers=None, progress=None):
+    """Lê um .obj grande em um pool de processos e junta as partes em um único OBJData.
+
+    O arquivo é dividido em faixas de bytes que terminam em fim de linha;
+    cada processo lê a sua faixa do disco e a converte com parse_obj_bytes.
+    Na costura, os índices negativos ganham a contagem de registros das
+    faixas anteriores e as faces antes do primeiro usemtl de uma faixa
+    herdam o material ativo no fim da faixa anterior; o mesmo vale para o
+    grupo de suavização antes do primeiro 's'.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = _split_ranges(filename, workers * CHUNKS_PER_WORKER)
+    tasks = [(filename, start, end, swapyz) for start, end in ranges]
+    parts = []
+    # spawn, como no importador: o filho não herda o contexto OpenGL nem as threads do pygame
+    with multiprocessing.get_context('spawn').Pool(min(workers, len(tasks))) as pool:
+        for part in pool.imap(_parse_range, tasks):
+            parts.append(part)
+            if progress:
+                progress(len(parts) / len(tasks))
+    return _stitch(parts, material)
+
+
+def _split_ranges(filename, count):
+    size = os.path.getsize(filename)
+    count = max(1, min(count, -(-size // PARALLEL_CHUNK_MIN)))
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, count):
+            # Avança do ponto de corte até o fim da linha em que ele caiu
+            f.seek(max(size * i // count, boundaries[-1]))
+            f.readline()
+            if f.tell() < size:
+                boundaries.append(f.tell())
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+def _parse_range(task):
+    filename, start, end, swapyz = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Sem material inicial: faces antes do primeiro usemtl ficam com None e herdam na costura
+    return parse_obj_bytes(data, swapyz)
+
+
+def _stitch(parts, material):
+    parsed = OBJData()
+    if not parts:
+        return parsed
+    offsets = np.zeros(3, dtype=np.int64)  # registros v, vt e vn das faixas anteriores
+    face_offset = 0
+    group = NO_GROUP
+    corners = ([], [], [])
+    for part in parts:
+        part_corners = (part.corner_vertices, part.corner_texcoords, part.corner_normals)
+        for column, indices in enumerate(part_corners):
+            indices[part.relative_corners[column]] += offsets[column]
+            corners[column].append(indices)
+        offsets += (len(part.vertices), len(part.texcoords), len(part.normals))
+
+        for first, name in part.material_ranges:
+            name = material if name is None else name
+            if not parsed.material_ranges or parsed.material_ranges[-1][1] != name:
+                parsed.material_ranges.append((first + face_offset, name))
+        if part.final_material is not None:
+            material = part.final_material
+        part.face_groups[part.face_groups == NO_GROUP] = group
+        if part.final_group != NO_GROUP:
+            group = part.final_group
+        face_offset += len(part.face_sizes)
+        parsed.material_libs.extend(part.material_libs)
+
+    parsed.vertices = np.concatenate([part.vertices for part in parts])
+    parsed.normals = np.concatenate([part.normals for part in parts])
+    parsed.texcoords = np.concatenate([part.texcoords for part in parts])
+    parsed.face_sizes = np.concatenate([part.face_sizes for part in parts])
+    parsed.face_groups = np.concatenate([part.face_groups for part in parts])
+    parsed.corner_vertices, parsed.corner_texcoords, parsed.corner_normals = map(np.concatenate, corners)
+    parsed.final_material = material
+    parsed.final_group = group
+    return parsed
+
+
+def parse_obj_bytes(data, swapyz=False, material=None, progress=None):
+    # As linhas são classificadas pelo prefixo com NumPy; os blocos de linhas
+    # consecutivas do mesmo tipo são fatiados direto dos bytes e cada tipo de
+    # registro é convertido de uma vez com np.fromstring
+    data = data.translate(WHITESPACE)
+    if data.startswith(b' ') or b'\n ' in data:
+        data = LEADING_SPACES.sub(b'', data)
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    if INLINE_COMMENT.search(data):
+        data = _strip_inline_comments(data)
+    buf = np.frombuffer(data, dtype=np.uint8)
+
+    ends = np.flatnonzero(buf == NEWLINE)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    last = len(buf) - 1
+    first, second, third = buf[starts], buf[np.minimum(starts + 1, last)], buf[np.minimum(starts + 2, last)]
+
+    kinds = np.full(len(starts), OTHER, dtype=np.int8)
+    kinds[(first == ord('v')) & (second == SPACE)] = VERTEX
+    kinds[(first == ord('v')) & (second == ord('n')) & (third == SPACE)] = NORMAL
+    kinds[(first == ord('v')) & (second == ord('t')) & (third == SPACE)] = TEXCOORD
+    kinds[(first == ord('f')) & (second == SPACE)] = FACE
+    kinds[(first == NEWLINE) | (first == ord('#'))] = BLANK
+
+    block_starts = np.concatenate([[0], np.flatnonzero(kinds[1:] != kinds[:-1]) + 1])
+    block_ends = np.concatenate([block_starts[1:], [len(starts)]])
+    blocks = {}
+    for block_start, block_end in zip(block_starts, block_ends):
+        blocks.setdefault(int(kinds[block_start]), []).append(data[starts[block_start]:ends[block_end - 1] + 1])
+
+    if progress:
+        progress(0.2)
+
+    def body(kind):
+        # Linhas do tipo pedido, sem o prefixo do registro, cada uma terminando em '\n'
+        return b''.join(blocks.get(kind, [])).replace(PREFIXES[kind], b'')
+
+    parsed = OBJData()
+    parsed.vertices = _parse_floats(body(VERTEX), 3, 'v')
+    parsed.normals = _parse_floats(body(NORMAL), 3, 'vn')
+    parsed.texcoords = _parse_floats(body(TEXCOORD), 2, 'vt')
+    if swapyz:
+        parsed.vertices = parsed.vertices[:, [0, 2, 1]]
+        parsed.normals = parsed.normals[:, [0, 2, 1]]
+    if progress:
+        progress(0.5)
+
+    face_lines = np.flatnonzero(kinds == FACE)
+    corners, parsed.face_sizes = _parse_faces(body(FACE))
+
+    # Índices negativos são relativos aos registros lidos até a linha da face
+    relative_corners = []
+    for column, kind in enumerate((VERTEX, TEXCOORD, NORMAL)):
+        indices = corners[:, column]
+        negative = indices < 0
+        relative_corners.append(np.flatnonzero(negative))
+        if negative.any():
+            corner_lines = np.repeat(face_lines, parsed.face_sizes)[negative]
+            indices[negative] += np.searchsorted(np.flatnonzero(kinds == kind), corner_lines) + 1
+    parsed.corner_vertices, parsed.corner_texcoords, parsed.corner_normals = corners.T
+    parsed.relative_corners = tuple(relative_corners)
+    if progress:
+        progress(0.9)
+
+    # Os demais registros (usemtl, mtllib, o, g, s...) são poucos e ficam no Python
+    material_lines, material_names = [], []
+    group_lines, groups = [], []
+    for line in np.flatnonzero(kinds == OTHER):
+        values = data[starts[line]:ends[line]].decode('utf-8', 'replace').split()
+        if values[0] in ('usemtl', 'usemat') and len(values) > 1:
+            material_lines.append(line)
+            material_names.append(values[1])
+        elif values[0] == 'mtllib' and len(values) > 1:
+            parsed.material_libs.append(values[1])
+        elif values[0] == 's' and len(values) > 1:
+            group_lines.append(line)
+            groups.append(_smoothing_group(values[1]))
+    parsed.final_material = material_names[-1] if material_names else material
+    parsed.final_group = groups[-1] if groups else NO_GROUP
+    parsed.face_groups = np.asarray([NO_GROUP] + groups, dtype=np.int64)[
+        np.searchsorted(np.asarray(group_lines, dtype=np.int64), face_lines)]
+
+    if len(face_lines):
+        names = [material] + material_names
+        face_material = np.searchsorted(np.asarray(material_lines, dtype=np.int64), face_lines)
+        changes = np.concatenate([[0], np.flatnonzero(np.diff(face_material)) + 1])
+        parsed.material_ranges = [(int(face), names[face_material[face]]) for face in changes]
+    if progress:
+        progress(1.0)
+    return parsed
+
+
+def _strip_inline_comments(data):
+    # Comentários no fim de uma linha ('v 0 0 0 # nota') viram espaços, sem mudar as posições das linhas;
+    # as linhas que começam com '#' continuam inteiras e são classificadas como vazias
+    buf = np.frombuffer(data, dtype=np.uint8).copy()
+    newline = buf == NEWLINE
+    line = np.cumsum(newline) - newline  # linha de cada byte; o '\n' fica na linha que ele termina
+    line_start = np.concatenate([[True], newline[:-1]])
+    hashes = np.flatnonzero((buf == ord('#')) & ~line_start)
+    # Última linha com '#' até cada byte (por fora do comentário de linha inteira)
+    marked = np.full(len(buf), -1, dtype=np.int64)
+    marked[hashes] = line[hashes]
+    np.maximum.accumulate(marked, out=marked)
+    buf[(marked == line) & ~newline] = SPACE
+    return buf.tobytes()
+
+
+def _smoothing_group(value):
+    if value == 'off':
+        return 0
+    try:
+        return int(value)
+    except ValueError:
+        return 1  # Nome de grupo fora do padrão: trata como um grupo suavizado
+
+
+def _token_starts(text):
+    is_separator = (text == SPACE) | (text == NEWLINE)
+    starts = ~is_separator
+    starts[1:] &= is_separator[:-1]
+    return np.flatnonzero(starts)
+
+
+def _tokens_per_line(text, token_starts):
+    # Tokens de cada linha: quantos começam antes de cada '\n', menos os das linhas anteriores
+    return np.diff(np.searchsorted(token_starts, np.flatnonzero(text == NEWLINE)), prepend=0)
+
+
+def _read_numbers(text, dtype, expected, name):
+    if expected == 0:
+        return np.zeros(0, dtype=dtype)
+    try:
+        values = np.fromstring(text, dtype=dtype, sep=' ')
+    except ValueError:
+        values = None
+    if values is None or len(values) != expected:
+        raise ValueError(f"Registro '{name}' inválido no arquivo .obj")
+    return values
+
+
+def _parse_floats(text, columns, name):
+    array = np.frombuffer(text, dtype=np.uint8)
+    counts = _tokens_per_line(array, _token_starts(array))
+    values = _read_numbers(text, np.float64, int(counts.sum()), name)
+    if (counts == columns).all():
+        return values.reshape(-1, columns).astype(np.float32)
+
+    # Só as primeiras colunas importam (ex.: o w de 'v' e de 'vt' é descartado); as que faltam ficam em zero
+    offsets = np.cumsum(counts) - counts
+    wanted = np.arange(columns)
+    indices = offsets[:, None] + wanted
+    present = wanted < counts[:, None]
+    result = np.zeros((len(counts), columns), dtype=np.float32)
+    result[present] = values[indices[present]]
+    return result
+
+
+def _parse_faces(text):
+    # Componentes vazios ('v//vn', 'v/vt/', 'v/') recebem um 0 explícito para
+    # que todo canto tenha de um a três números separados por '/'
+    text = text.replace(b'//', b'/0/').replace(b'/ ', b'/0 ').replace(b'/\n', b'/0\n')
+    array = np.frombuffer(text, dtype=np.uint8)
+    token_starts = _token_starts(array)
+    face_sizes = _tokens_per_line(array, token_starts)
+
+    slashes = np.flatnonzero(array == SLASH)
+    token_of_slash = np.searchsorted(token_starts, slashes, side='right') - 1
+    numbers_per_corner = 1 + np.bincount(token_of_slash, minlength=len(token_starts))
+    numbers = _read_numbers(text.replace(b'/', b' '), np.int64, int(numbers_per_corner.sum()), 'f')
+
+    # Além do terceiro número de um canto, o restante é ignorado, como no carregador antigo
+    corners = np.zeros((len(token_starts), 3), dtype=np.int64)
+    offsets = np.cumsum(numbers_per_corner) - numbers_per_corner
+    for component in range(3):
+        present = numbers_per_corner > component
+        corners[present, component] = numbers[offsets[present] + component]
+    return corners, face_sizes
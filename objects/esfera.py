@@ -1,6 +1,6 @@
 from objects import Object
+from utils.geometry import Geometry
 from OpenGL.GL import *
-from PIL import Image
 import numpy as np
 
 class Sphere(Object):
@@ -9,18 +9,9 @@ class Sphere(Object):
         self.transform.rotation = rotation if rotation is not None else [0, 0, 0]
         self.transform.scale = scale if scale is not None else [1, 1, 1]
         self.selected = False
-        self.vertices, self.normals, self.uvs = self.generate_sphere(32, 32)
-        self.faces = self.generate_faces(32, 32)
         self.texture = texture
-        self.texture_id = None
         self.texture_loaded = False
 
-        # VBO IDs
-        self.vbo_vertices = glGenBuffers(1)
-        self.vbo_faces = glGenBuffers(1)
-        self.vbo_uvs = glGenBuffers(1)
-        self.vbo_normals = glGenBuffers(1)
-
         self.init_vbo()
 
         if self.texture:
@@ -72,21 +63,17 @@ class Sphere(Object):
         return np.array(faces, dtype=np.uint32)
 
     def init_vbo(self):
-        # Upload vertices to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vertices)
-        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
-
-        # Upload faces to VBO
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.vbo_faces)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.faces.nbytes, self.faces, GL_STATIC_DRAW)
-
-        # Upload UVs to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_uvs)
-        glBufferData(GL_ARRAY_BUFFER, self.uvs.nbytes, self.uvs, GL_STATIC_DRAW)
-
-        # Upload normals to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_normals)
-        glBufferData(GL_ARRAY_BUFFER, self.normals.nbytes, self.normals, GL_STATIC_DRAW)
+        # Todas as esferas com a mesma tesselação compartilham a geometria
+        geometry = self.acquire_geometry(('sphere', 32, 32), lambda: self.build_geometry(32, 32))
+        self.vertices = geometry.vertices
+        self.normals = geometry.normals
+        self.uvs = geometry.uvs
+        self.faces = geometry.faces
+
+    def build_geometry(self, slices, stacks):
+        self.vertices, self.normals, self.uvs = self.generate_sphere(slices, stacks)
+        self.faces = self.generate_faces(slices, stacks)
+        return Geometry(self.vertices, self.normals, self.uvs, self.faces, GL_QUADS)
 
     def draw(self, is_shadow=False):
         glPushMatrix()
@@ -98,46 +85,9 @@ class Sphere(Object):
 
         glScalef(*self.transform.scale)
 
-        previous_color = glGetFloatv(GL_CURRENT_COLOR)
-        if not is_shadow:
-            # Define a cor branca somente se não for sombra
-            glColor3f(1.0, 1.0, 1.0)
-        else:
-            # Para a sombra, você pode definir uma cor específica ou uma cor de sombra
-            glColor3f(0.0, 0.0, 0.0)  # Cor preta para a sombra
-        
-        if not is_shadow and self.selected:
-            glColor3f(1.0, 0.5, 0.0)  # Aplica a cor laranja somente se selecionado e não for sombra
-            
-        if self.texture_id:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-
-        glEnableClientState(GL_VERTEX_ARRAY)
-        glEnableClientState(GL_NORMAL_ARRAY)
-        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vertices)
-        glVertexPointer(3, GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_normals)
-        glNormalPointer(GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_uvs)
-        glTexCoordPointer(2, GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.vbo_faces)
-        glDrawElements(GL_QUADS, self.faces.size, GL_UNSIGNED_INT, None)
+        self.apply_material(is_shadow)
 
-        glDisableClientState(GL_VERTEX_ARRAY)
-        glDisableClientState(GL_NORMAL_ARRAY)
-        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
-
-        if self.texture_id:
-            glDisable(GL_TEXTURE_2D)
-
-        # Restaura a cor anterior
-        glColor3f(*previous_color[:3])
+        self.geometry.draw()
 
         glPopMatrix()
 
@@ -158,37 +108,6 @@ class Sphere(Object):
         texture = data.get('texture')
         return cls(position=position, rotation=rotation, scale=scale, texture=texture)
 
-    def load_texture(self, file_path):
-        try:
-            image = Image.open(file_path)
-            image = image.convert("RGBA")  # Garantir que a imagem tenha um canal alpha
-            image_data = np.array(image, dtype=np.uint8)
-
-            mode = GL_RGBA  # Usar GL_RGBA para texturas com canal alpha
-
-            if self.texture_id:
-                glDeleteTextures([self.texture_id])
-
-            self.texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-            glTexImage2D(GL_TEXTURE_2D, 0, mode, image.width, image.height, 0, mode, GL_UNSIGNED_BYTE, image_data)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-            self.texture_loaded = True
-            self.texture = file_path
-
-            # Configura o blending para suportar transparência
-            glEnable(GL_BLEND)
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        except FileNotFoundError:
-            print(f"Textura não encontrada: {file_path}")
-        except Exception as e:
-            print(f"Erro ao carregar textura: {e}")
-
     def rotate(self, angle, axis):
         if axis == (1, 0, 0):
             self.transform.rotation[0] += angle
@@ -196,6 +115,7 @@ class Sphere(Object):
             self.transform.rotation[1] += angle
         elif axis == (0, 0, 1):
             self.transform.rotation[2] += angle
+        self.update_bounds()
 
     def scale(self, factor, axis):
         min_scale = 0.05
@@ -208,6 +128,7 @@ class Sphere(Object):
         elif axis == (0, 0, 1):
             new_scale = max(min_scale, self.transform.scale[2] + factor)
             self.transform.scale[2] = new_scale
+        self.update_bounds()
 
     def translate(self, distance, axis):
         if axis == (1, 0, 0):
@@ -216,3 +137,4 @@ class Sphere(Object):
             self.position[1] += distance
         elif axis == (0, 0, 1):
             self.position[2] += distance
+        self.update_bounds()
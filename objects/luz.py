@@ -2,10 +2,14 @@ import json
 from objects import Object
 from utils.transform import Transform
 from OpenGL.GL import *
+from utils.gl_state import gl_state
+from utils.render_queue import LIGHT_PASS
 from OpenGL.GLU import *
 import numpy as np
 
 class LightSphere(Object):
+    render_pass = LIGHT_PASS
+
     available_light_ids = [GL_LIGHT0 + i for i in range(7)]
 
     def __init__(self, radius=0.2, intensity=10.0, color=(1.0, 1.0, 1.0), slices=16, stacks=16):
@@ -23,6 +27,7 @@ class LightSphere(Object):
         self.vbo_indices = glGenBuffers(1)
         self.vertices, self.indices = self.create_sphere(radius, slices, stacks)
         self.init_vbo()
+        self.update_bounds()
 
         # Check if there are available light IDs
         if not LightSphere.available_light_ids:
@@ -75,6 +80,7 @@ class LightSphere(Object):
     def set_position(self, position):
         self.position = position
         self.update_light()
+        self.update_bounds()
 
     def set_intensity(self, intensity):
         self.intensity = intensity
@@ -92,6 +98,10 @@ class LightSphere(Object):
         elif axis == (0, 0, 1):
             self.position[2] += distance
         self.update_light()
+        self.update_bounds()
+
+    def local_bounds(self):
+        return (0.0, 0.0, 0.0), self.radius
 
     def set_selected(self, selected):
         self.selected = selected
@@ -100,16 +110,7 @@ class LightSphere(Object):
         glPushMatrix()
         glTranslatef(*self.position)    
 
-        previous_color = glGetFloatv(GL_CURRENT_COLOR)
-        if not is_shadow:
-            # Define a cor branca somente se não for sombra
-            glColor3f(1.0, 1.0, 1.0)
-        else:
-            # Para a sombra, você pode definir uma cor específica ou uma cor de sombra
-            glColor3f(0.0, 0.0, 0.0)  # Cor preta para a sombra
-        
-        if not is_shadow and self.selected:
-            glColor3f(1.0, 0.5, 0.0)  # Aplica a cor laranja somente se selecionado e não for sombra
+        self.apply_material(is_shadow)
 
         # Draw the sphere using the GLU function
         quadric = gluNewQuadric()
@@ -120,14 +121,8 @@ class LightSphere(Object):
         gluSphere(quadric, self.radius, self.slices, self.stacks)
         gluDeleteQuadric(quadric)
 
-        # Restaura a cor anterior
-        glColor3f(*previous_color[:3])
-        
         glPopMatrix()
 
-        # Update the light after drawing the object
-        self.update_light()
-
     def to_dict(self):
         return {
             'type': 'light_sphere',
@@ -146,10 +141,12 @@ class LightSphere(Object):
         selected = data.get('selected', False)  # Add 'selected' to the loading
         light_sphere = cls(radius=radius, intensity=intensity, color=color)
         light_sphere.position = data['position']
+        light_sphere.update_bounds()
         light_sphere.selected = selected  # Set 'selected'
         return light_sphere
 
     def delete(self):
+        super().delete()
         if not hasattr(self, 'light_id'):
             return
 
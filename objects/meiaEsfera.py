@@ -1,6 +1,6 @@
 from objects import Object
+from utils.geometry import Geometry
 from OpenGL.GL import *
-from PIL import Image
 import numpy as np
 
 class HalfSphere(Object):
@@ -9,18 +9,9 @@ class HalfSphere(Object):
         self.transform.rotation = rotation if rotation is not None else [0, 0, 0]
         self.transform.scale = scale if scale is not None else [1, 1, 1]
         self.selected = False
-        self.vertices, self.normals, self.uvs = self.generate_hemisphere(32, 32)
-        self.faces = self.generate_faces(32, 32)
         self.texture = texture
-        self.texture_id = None
         self.texture_loaded = False
 
-        # VBO IDs
-        self.vbo_vertices = glGenBuffers(1)
-        self.vbo_faces = glGenBuffers(1)
-        self.vbo_uvs = glGenBuffers(1)
-        self.vbo_normals = glGenBuffers(1)
-
         self.init_vbo()
 
         if self.texture:
@@ -73,21 +64,17 @@ class HalfSphere(Object):
         return np.array(faces, dtype=np.uint32)
 
     def init_vbo(self):
-        # Upload vertices to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vertices)
-        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
-
-        # Upload faces to VBO
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.vbo_faces)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.faces.nbytes, self.faces, GL_STATIC_DRAW)
-
-        # Upload UVs to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_uvs)
-        glBufferData(GL_ARRAY_BUFFER, self.uvs.nbytes, self.uvs, GL_STATIC_DRAW)
-
-        # Upload normals to VBO
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_normals)
-        glBufferData(GL_ARRAY_BUFFER, self.normals.nbytes, self.normals, GL_STATIC_DRAW)
+        # Todas as meias esferas com a mesma tesselação compartilham a geometria
+        geometry = self.acquire_geometry(('halfsphere', 32, 32), lambda: self.build_geometry(32, 32))
+        self.vertices = geometry.vertices
+        self.normals = geometry.normals
+        self.uvs = geometry.uvs
+        self.faces = geometry.faces
+
+    def build_geometry(self, slices, stacks):
+        self.vertices, self.normals, self.uvs = self.generate_hemisphere(slices, stacks)
+        self.faces = self.generate_faces(slices, stacks)
+        return Geometry(self.vertices, self.normals, self.uvs, self.faces, GL_QUADS)
 
     def draw(self, is_shadow=False):
         glPushMatrix()
@@ -99,44 +86,9 @@ class HalfSphere(Object):
 
         glScalef(*self.transform.scale)
 
-        previous_color = glGetFloatv(GL_CURRENT_COLOR)
-        if not is_shadow:
-            glColor3f(1.0, 1.0, 1.0)
-        else:
-            glColor3f(0.0, 0.0, 0.0)  # Cor preta para a sombra
-        
-        if not is_shadow and self.selected:
-            glColor3f(1.0, 0.5, 0.0)  # Cor laranja para o objeto selecionado
-
-        if self.texture_id:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-
-        glEnableClientState(GL_VERTEX_ARRAY)
-        glEnableClientState(GL_NORMAL_ARRAY)
-        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_vertices)
-        glVertexPointer(3, GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_normals)
-        glNormalPointer(GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_uvs)
-        glTexCoordPointer(2, GL_FLOAT, 0, None)
-
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.vbo_faces)
-        glDrawElements(GL_QUADS, self.faces.size, GL_UNSIGNED_INT, None)
+        self.apply_material(is_shadow)
 
-        glDisableClientState(GL_VERTEX_ARRAY)
-        glDisableClientState(GL_NORMAL_ARRAY)
-        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
-
-        if self.texture_id:
-            glDisable(GL_TEXTURE_2D)
-
-        # Restaura a cor anterior
-        glColor3f(*previous_color[:3])
+        self.geometry.draw()
 
         glPopMatrix()
 
@@ -157,36 +109,6 @@ class HalfSphere(Object):
         texture = data.get('texture')
         return cls(position=position, rotation=rotation, scale=scale, texture=texture)
 
-    def load_texture(self, file_path):
-        try:
-            image = Image.open(file_path)
-            image = image.convert("RGBA")
-            image_data = np.array(image, dtype=np.uint8)
-
-            mode = GL_RGBA
-
-            if self.texture_id:
-                glDeleteTextures([self.texture_id])
-
-            self.texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-            glTexImage2D(GL_TEXTURE_2D, 0, mode, image.width, image.height, 0, mode, GL_UNSIGNED_BYTE, image_data)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-            self.texture_loaded = True
-            self.texture = file_path
-
-            glEnable(GL_BLEND)
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        except FileNotFoundError:
-            print(f"Textura não encontrada: {file_path}")
-        except Exception as e:
-            print(f"Erro ao carregar textura: {e}")
-
     def scale(self, factor, axis):
         min_scale = 0.05
         if axis == (1, 0, 0):
@@ -198,6 +120,7 @@ class HalfSphere(Object):
         elif axis == (0, 0, 1):
             new_scale = max(min_scale, self.transform.scale[2] + factor)
             self.transform.scale[2] = new_scale
+        self.update_bounds()
 
     def translate(self, distance, axis):
         if axis == (1, 0, 0):
@@ -206,3 +129,4 @@ class HalfSphere(Object):
             self.position[1] += distance
         elif axis == (0, 0, 1):
             self.position[2] += distance
+        self.update_bounds()
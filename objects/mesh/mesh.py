@@ -1,19 +1,25 @@
 from objects import Object
 from OBJFileLoader import OBJ
-from PIL import Image, UnidentifiedImageError
 import numpy as np
 from OpenGL.GL import *
+from utils.gl_state import gl_state
 from OpenGL.GL.ARB.vertex_buffer_object import *
 from OpenGL.GLUT import *
 from utils.transform import Transform
+from utils.render_queue import BLENDED_PASS, OVERLAY_PASS
+from OBJFileLoader.importer import WORKER_SHARE, mesh_importer
 import os
 
 class Mesh(Object):
-    def __init__(self, position, filename, rotation=None, scale=None, texture=None, swapyz=False, default_mtl=('objects/mesh/default.mtl', 'Material')):
+    # Texturas aplicadas pela barra lateral seguem a convenção de UVs do .obj,
+    # que podem repetir a imagem: ficam fora do atlas
+    texture_flip = True
+    texture_atlas = False
+
+    def __init__(self, position, filename, rotation=None, scale=None, texture=None, swapyz=False, default_mtl=('objects/mesh/default.mtl', 'Material'), asynchronous=False):
         super().__init__(position)
         self.transform = Transform(position, rotation, scale)
         self.texture = texture
-        self.texture_id = None
         self.texture_loaded = False
         self.filename = filename
         self.selected = False
@@ -21,55 +27,107 @@ class Mesh(Object):
         if not filename:
             raise ValueError("filename deve ser fornecido para carregar o objeto .obj")
         
-        self.model = OBJ(filename, swapyz, default_mtl=default_mtl)
-        
+        self.swapyz = swapyz
+        self.default_mtl = default_mtl
+        self.model = None
+        self.model_bounds = None
+        self.import_job = None
+        if asynchronous:
+            # A leitura roda num processo separado; até o modelo ficar pronto a cena mostra um marcador
+            material = default_mtl[1] if default_mtl is not None else None
+            self.import_job = mesh_importer.submit(filename, swapyz, material)
+            self.update_bounds()
+        else:
+            self.attach_model(OBJ(filename, swapyz, default_mtl=default_mtl))
+
         # if self.texture and self.is_image_file(self.texture):
         #     self.load_texture(self.texture)
         # else:
         #     self.load_texture(default_mtl[0])
 
+    def attach_model(self, model, bounds=None):
+        self.model = model
+        # Esfera envolvente local calculada uma única vez a partir dos vértices do modelo
+        self.model_bounds = bounds
+        if bounds is None and len(model.vertices):
+            vertices = model.vertices
+            lower, upper = vertices.min(axis=0), vertices.max(axis=0)
+            self.model_bounds = (lower + upper) / 2, float(np.linalg.norm(upper - lower) / 2)
+        self.update_bounds()
+
+    @property
+    def loading(self):
+        return self.model is None or not self.model.ready
+
+    @property
+    def render_pass(self):
+        return OVERLAY_PASS if self.loading else BLENDED_PASS
+
+    @property
+    def import_progress(self):
+        if self.import_job is None:
+            return 1.0
+        if self.model is None:
+            return self.import_job.progress
+        return WORKER_SHARE + (1.0 - WORKER_SHARE) * self.model.upload_progress
+
+    def update_import(self, budget):
+        """Avança a importação assíncrona na thread principal e retorna o orçamento de upload restante.
+
+        Quando o processo de importação termina, cria o OBJ (materiais e
+        texturas precisam do OpenGL) e envia até budget vértices e índices por
+        chamada.
+        Erros da importação são relançados aqui para a cena remover o objeto.
+        """
+        job = self.import_job
+        if self.model is None:
+            if not job.finished:
+                return budget
+            if job.error is not None:
+                mesh_importer.finish(job)
+                self.import_job = None
+                raise job.error
+            self.attach_model(OBJ(self.filename, self.swapyz, self.default_mtl, mesh=job.mesh), job.bounds)
+
+        budget -= self.model.upload(budget)
+        if self.model.ready:
+            mesh_importer.finish(job)
+            self.import_job = None
+        return budget
+
+    def draw_placeholder(self):
+        # Caixa envolvente em arame com uma barra de progresso na aresta inferior
+        if self.model_bounds is not None:
+            center, radius = self.model_bounds
+            half = np.full(3, radius / np.sqrt(3))
+        else:
+            center, half = np.zeros(3), np.full(3, 0.5)
+        lower, upper = center - half, center + half
+
+        gl_state.disable(GL_TEXTURE_2D)
+        glDisable(GL_LIGHTING)
+        glBegin(GL_LINES)
+        glColor3f(0.6, 0.6, 0.6)
+        for axis in range(3):
+            for corner in range(4):
+                start = lower.copy()
+                others = [i for i in range(3) if i != axis]
+                start[others[0]] = upper[others[0]] if corner & 1 else lower[others[0]]
+                start[others[1]] = upper[others[1]] if corner & 2 else lower[others[1]]
+                end = start.copy()
+                end[axis] = upper[axis]
+                glVertex3f(*start)
+                glVertex3f(*end)
+        glColor3f(0.0, 1.0, 0.0)
+        glVertex3f(*lower)
+        glVertex3f(lower[0] + (upper[0] - lower[0]) * self.import_progress, lower[1], lower[2])
+        glEnd()
+        glEnable(GL_LIGHTING)
+        gl_state.forget_color()
+
     def is_image_file(self, file_path):
         return file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif'))
 
-    def load_texture(self, file_path):
-    #     if not self.is_image_file(file_path):
-    #         print(f"Arquivo '{file_path}' não é uma imagem. Ignorando a textura.")
-    #         return
-
-        try:
-            image = Image.open(file_path)
-            image = image.convert("RGBA")  # Garantir que a imagem tem um canal alpha
-            image_data = np.array(image, dtype=np.uint8)
-            image = image.transpose(Image.FLIP_TOP_BOTTOM)
-            image_data = np.array(image, dtype=np.uint8)
-
-            mode = GL_RGBA
-
-            if self.texture_id:
-                glDeleteTextures([self.texture_id])
-
-            self.texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-            glTexImage2D(GL_TEXTURE_2D, 0, mode, image.width, image.height, 0, mode, GL_UNSIGNED_BYTE, image_data)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-            self.texture_loaded = True
-            self.texture = file_path
-
-            # Configura o blending para suportar transparência
-            glEnable(GL_BLEND)
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        except FileNotFoundError:
-            print(f"Textura não encontrada: {file_path}")
-        except UnidentifiedImageError:
-            print(f"Arquivo '{file_path}' não é uma imagem válida.")
-        except Exception as e:
-            print(f"Erro ao carregar textura: {e}")
-
     def draw(self, is_shadow=False):
         glPushMatrix()
         glTranslatef(*self.transform.position)
@@ -83,39 +141,36 @@ class Mesh(Object):
 
         glScalef(*self.transform.scale)
 
-        previous_color = glGetFloatv(GL_CURRENT_COLOR)
-        if not is_shadow:
-            # Define a cor branca somente se não for sombra
-            glColor3f(1.0, 1.0, 1.0)
+        if self.loading:
+            if not is_shadow:
+                self.draw_placeholder()
         else:
-            # Para a sombra, você pode definir uma cor específica ou uma cor de sombra
-            glColor3f(0.0, 0.0, 0.0)  # Cor preta para a sombra
-        
-        if not is_shadow and self.selected:
-            glColor3f(1.0, 0.5, 0.0)  # Aplica a cor laranja somente se selecionado e não for sombra
-        
-        if self.texture_id:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        else:
-            glDisable(GL_TEXTURE_2D)
+            # O blending é habilitado pela fila de desenho na passada BLENDED_PASS.
+            # Os materiais do .obj só valem sem uma textura própria do Mesh, e nunca na sombra;
+            # o Kd não substitui a cor de seleção
+            self.apply_material(is_shadow)
+            self.model.render(materials=not is_shadow and self.texture_handle is None, color=not self.selected)
 
-        # Habilita o blending antes de renderizar
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        self.model.render()
+        glPopMatrix()
 
-        if self.texture_id:
-            glDisable(GL_TEXTURE_2D)
+    def model_transform(self):
+        return self.transform.position, self.transform.rotation, self.transform.scale
 
-        # Desabilita o blending após renderizar
-        glDisable(GL_BLEND)
+    def local_bounds(self):
+        return self.model_bounds
 
-        # Restaura a cor anterior
-        glColor3f(*previous_color[:3])
+    def delete(self):
+        super().delete()
+        if self.import_job is not None:
+            self.import_job.cancel()
+            mesh_importer.finish(self.import_job)
+            self.import_job = None
+        if self.model is not None:
+            self.model.delete()
 
-        glPopMatrix()
+    def sort_key(self, program=0):
+        # Malhas .obj não usam o cache de geometrias; o modelo carregado identifica o VAO
+        return program, self.texture_id or 0, id(self.model)
 
     def rotate_mesh(self, angle, axis):
         if axis == (1, 0, 0):
@@ -124,6 +179,7 @@ class Mesh(Object):
             self.transform.rotation[1] += angle
         elif axis == (0, 0, 1):
             self.transform.rotation[2] += angle
+        self.update_bounds()
 
     def scale_mesh(self, factor, axis):
         min_scale = 0.01
@@ -136,6 +192,7 @@ class Mesh(Object):
         elif axis == (0, 0, 1):
             new_scale = max(min_scale, self.transform.scale[2] + factor)
             self.transform.scale[2] = new_scale
+        self.update_bounds()
 
     def translate_mesh(self, distance, axis):
         if axis == (1, 0, 0):
@@ -144,6 +201,7 @@ class Mesh(Object):
             self.transform.position[1] += distance
         elif axis == (0, 0, 1):
             self.transform.position[2] += distance
+        self.update_bounds()
 
     def to_dict(self):
         return {
@@ -162,4 +220,5 @@ class Mesh(Object):
         scale = data['scale']
         texture = data.get('texture')
         filename = data['filename']
-        return cls(position=position, filename=filename, rotation=rotation, scale=scale, texture=texture)
+        return cls(position=position, filename=filename, rotation=rotation, scale=scale, texture=texture,
+                   asynchronous=True)
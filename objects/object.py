@@ -1,11 +1,131 @@
 from utils.transform import Transform
+from utils.geometry import geometry_cache
+from utils.frustum import world_bounds
+from utils.gl_state import gl_state
+from utils.render_queue import BLENDED_PASS, OPAQUE_PASS
+from utils.textures import FULL_UV_RECT, texture_manager
+from OBJFileLoader.gltf import EmbeddedImage
 from OpenGL.GL import *
 
 
 class Object:
+    color = (1.0, 1.0, 1.0)
+    # Inverte as linhas da imagem ao enviar a textura (UVs com origem embaixo, como no .obj)
+    texture_flip = False
+    # Texturas pequenas podem dividir um atlas com as de outros objetos (ver texture_manager.atlas_threshold)
+    texture_atlas = True
+
     def __init__(self, position):
         self.transform = Transform()
         self.position = position
+        self.geometry = None
+        self.geometry_key = None
+        self.bounds = None  # (centro, raio) em coordenadas de mundo
+        self.selected = False
+        self.texture = None  # caminho da imagem da textura
+        self.texture_handle = None  # TextureHandle do texture_manager
+        self.texture_loaded = False
+
+    def acquire_geometry(self, key, builder):
+        # Reaproveita a geometria do cache global em vez de gerar novos VBOs por instância
+        if self.geometry is not None and self.geometry_key == key:
+            return self.geometry
+        self.release_geometry()
+        self.geometry = geometry_cache.acquire(key, builder)
+        self.geometry_key = key
+        self.update_bounds()
+        return self.geometry
+
+    def release_geometry(self):
+        if self.geometry is not None:
+            geometry_cache.release(self.geometry_key)
+            self.geometry = None
+            self.geometry_key = None
+
+    @property
+    def texture_id(self):
+        return self.texture_handle.texture_id if self.texture_handle is not None else None
+
+    @property
+    def render_pass(self):
+        # Texturas com transparência vão para a passada com blending, desenhada de trás para frente
+        return BLENDED_PASS if self.texture_handle is not None and self.texture_handle.has_alpha else OPAQUE_PASS
+
+    @property
+    def texture_rect(self):
+        # Célula da textura no atlas, aplicada às UVs no desenho, nos lotes e nas instâncias
+        return self.texture_handle.uv_rect if self.texture_handle is not None else FULL_UV_RECT
+
+    def fits_atlas(self):
+        # A célula do atlas não repete: só geometrias com todas as UVs entre 0 e 1
+        if not self.texture_atlas or self.geometry is None or not len(self.geometry.uvs):
+            return False
+        return bool(self.geometry.uvs.min() >= 0.0 and self.geometry.uvs.max() <= 1.0)
+
+    def load_texture(self, file_path):
+        # Objetos com a mesma imagem compartilham a textura (e o ID usado nos lotes e nas instâncias),
+        # com a cadeia de mipmaps completa: superfícies distantes leem níveis menores
+        # A imagem é decodificada em segundo plano; até chegar à GPU o objeto é desenhado sem textura
+        # e uma imagem inválida é informada pelo texture_manager
+        if isinstance(file_path, list):
+            # Imagem embutida de um .glb (ver read_glb_scene) salva numa cena .json: [arquivo, índice]
+            file_path = EmbeddedImage(*file_path)
+        try:
+            handle = texture_manager.acquire(file_path, flip=self.texture_flip, mipmaps=True, atlas=self.fits_atlas())
+        except FileNotFoundError:
+            print(f"Textura não encontrada: {file_path}")
+            return
+        except Exception as e:
+            print(f"Erro ao carregar textura: {e}")
+            return
+
+        self.release_texture()
+        self.texture_handle = handle
+        self.texture_loaded = True
+        self.texture = file_path
+        # O blending de uma textura com transparência vem da passada (ver render_pass)
+
+    def release_texture(self):
+        # A textura só é apagada quando nenhum outro objeto a usa (ver texture_manager.collect)
+        if self.texture_handle is not None:
+            self.texture_handle.release()
+            self.texture_handle = None
+            self.texture_loaded = False
+
+    def delete(self):
+        self.release_geometry()
+        self.release_texture()
+
+    def model_transform(self):
+        return self.position, self.transform.rotation, self.transform.scale
+
+    def local_bounds(self):
+        if self.geometry is None:
+            return None
+        return self.geometry.bounds_center, self.geometry.bounds_radius
+
+    def update_bounds(self):
+        # Chamado sempre que o objeto é transladado, rotacionado ou escalado
+        self.bounds = world_bounds(self)
+
+    def sort_key(self, program=0):
+        # Chave usada pela fila de desenho para agrupar objetos com o mesmo estado
+        geometry = id(self.geometry) if self.geometry is not None else 0
+        return program, self.texture_id or 0, geometry
+
+    def apply_material(self, is_shadow=False):
+        # Cor e textura passam pelo cache de estado, sem ler GL_CURRENT_COLOR para restaurá-la depois
+        if is_shadow:
+            gl_state.color(0.0, 0.0, 0.0)  # Cor preta para a sombra
+        elif self.selected:
+            gl_state.color(1.0, 0.5, 0.0)  # Cor laranja para o objeto selecionado
+        else:
+            gl_state.color(*self.color)
+
+        textured = bool(self.texture_id) and not is_shadow
+        gl_state.set_capability(GL_TEXTURE_2D, textured)
+        if textured:
+            texture_manager.bind(self.texture_id, self.texture_rect)
 
     def draw(self):
         pass
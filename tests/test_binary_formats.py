@@ -0,0 +1,90 @@
+import sys
+import numpy as np
+from OBJFileLoader import binary_formats
+from OBJFileLoader.binary_formats import parse_ply
+
+
+def write_ply(path, vertices, faces, byte_order='<', count_type='u1', before=0, after=0):
+    # faces: listas de índices; before/after: bytes de propriedades escalares antes e depois da lista
+    codes = {'u1': 'uchar', 'u2': 'ushort', 'i4': 'int'}
+    order = 'binary_little_endian' if byte_order == '<' else 'binary_big_endian'
+    header = ["ply", f"format {order} 1.0", f"element vertex {len(vertices)}",
+              "property float x", "property float y", "property float z", f"element face {len(faces)}"]
+    header += [f"property uchar flag{i}" for i in range(before)]
+    header.append(f"property list {codes[count_type]} int vertex_indices")
+    header += [f"property uchar tag{i}" for i in range(after)]
+    header.append("end_header")
+    parts = [("\n".join(header) + "\n").encode('ascii'),
+             np.asarray(vertices, dtype=byte_order + 'f4').tobytes()]
+    for face in faces:
+        parts.append(bytes(before) + np.asarray([len(face)], dtype=byte_order + count_type).tobytes()
+                     + np.asarray(face, dtype=byte_order + 'i4').tobytes() + bytes(after))
+    with open(path, 'wb') as f:
+        f.write(b"".join(parts))
+
+
+def reference(faces):
+    return np.array([len(face) for face in faces]), np.array([i for face in faces for i in face])
+
+
+def test_mixed_face_sizes(tmp_path):
+    rng = np.random.default_rng(0)
+    vertices = rng.random((50, 3))
+    faces = [list(rng.integers(0, 50, size)) for size in rng.choice([3, 4, 5, 7], 2000)]
+    for byte_order, count_type, before, after in (('<', 'u1', 0, 0), ('>', 'u2', 1, 2), ('<', 'i4', 2, 1)):
+        path = tmp_path / f"mixed{byte_order == '<'}{count_type}.ply"
+        write_ply(path, vertices, faces, byte_order, count_type, before, after)
+        parsed = parse_ply(str(path))
+        sizes, corners = reference(faces)
+        assert np.array_equal(parsed.face_sizes, sizes)
+        assert np.array_equal(parsed.corner_vertices, corners + 1)
+
+
+def test_mixed_faces_span_several_chunks(tmp_path, monkeypatch):
+    # Trechos pequenos: registros cortados na borda do trecho são retomados no seguinte
+    monkeypatch.setattr(binary_formats, 'PLY_FACE_CHUNK', 100)
+    faces = [[0, 1, 2], [0, 1, 2, 3], [3, 2, 1, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0]] * 50
+    path = tmp_path / "chunks.ply"
+    write_ply(path, np.zeros((4, 3)), faces)
+    parsed = parse_ply(str(path))
+    sizes, corners = reference(faces)
+    assert np.array_equal(parsed.face_sizes, sizes)
+    assert np.array_equal(parsed.corner_vertices, corners + 1)
+
+
+def traced_lines(function, *args):
+    # Linhas Python executadas em binary_formats durante a chamada: um laço por face cresce com as faces
+    lines = 0
+
+    def tracer(frame, event, arg):
+        nonlocal lines
+        if frame.f_code.co_filename != binary_formats.__file__:
+            return None
+        if event == 'line':
+            lines += 1
+        return tracer
+
+    sys.settrace(tracer)
+    try:
+        result = function(*args)
+    finally:
+        sys.settrace(None)
+    return result, lines
+
+
+def test_alternating_faces_are_vectorized(tmp_path):
+    # Triângulos e quadriláteros alternados: antes era uma iteração Python (e uma janela relida) por face
+    triangle = np.asarray([3], 'u1').tobytes() + np.arange(3, dtype='<i4').tobytes()
+    quad = np.asarray([4], 'u1').tobytes() + np.arange(4, dtype='<i4').tobytes()
+    lines = {}
+    for count in (2_000, 200_000):
+        header = (f"ply\nformat binary_little_endian 1.0\nelement vertex 4\nproperty float x\nproperty float y\n"
+                  f"property float z\nelement face {count}\nproperty list uchar int vertex_indices\nend_header\n")
+        path = tmp_path / f"alternating{count}.ply"
+        path.write_bytes(header.encode('ascii') + np.zeros(12, 'f4').tobytes() + (triangle + quad) * (count // 2))
+
+        parsed, lines[count] = traced_lines(parse_ply, str(path))
+        assert np.array_equal(parsed.face_sizes, np.tile([3, 4], count // 2))
+        assert np.array_equal(parsed.corner_vertices, np.tile([1, 2, 3, 1, 2, 3, 4], count // 2))
+    # 100 vezes mais faces só acrescentam os passos de log2(faces) dos saltos dobrados
+    assert lines[200_000] - lines[2_000] < 100
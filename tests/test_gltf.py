@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image
+from OBJFileLoader.gltf import EmbeddedImage, export_glb, read_glb_scene
+
+
+class Primitive:
+    # Só o que export_glb lê de uma primitiva (Cube, Plane...), sem OpenGL
+    color = (1.0, 1.0, 1.0)
+
+    def __init__(self, texture):
+        self.position = [1.0, 2.0, 3.0]
+        self.texture = texture
+        self.texture_handle = object()
+        self.geometry = SimpleNamespace(vertices=np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32),
+                                        normals=np.array([[0, 0, 1]] * 3, dtype=np.float32),
+                                        uvs=np.array([[0, 0], [1, 0], [0, 1]], dtype=np.float32),
+                                        indices=np.array([0, 1, 2], dtype=np.uint32))
+
+    def to_dict(self):
+        return {'type': 'cube', 'position': self.position, 'rotation': [0.0, 0.0, 0.0],
+                'scale': [1.0, 1.0, 1.0], 'texture': self.texture}
+
+    def model_transform(self):
+        return self.position, [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]
+
+
+def test_primitive_texture_survives_without_source(tmp_path):
+    pixels = np.arange(4 * 4 * 4, dtype=np.uint8).reshape(4, 4, 4)
+    source = tmp_path / "tijolo.png"
+    Image.fromarray(pixels, 'RGBA').save(source)
+    scene = tmp_path / "cena.glb"
+    export_glb([Primitive(str(source))], str(scene))
+    source.unlink()
+
+    [data] = read_glb_scene(str(scene))['objects']
+    assert data['type'] == 'cube'
+    assert isinstance(data['texture'], EmbeddedImage)
+    assert data['texture'].filename == str(scene)
+    assert np.array_equal(np.asarray(Image.open(data['texture'].open())), pixels)
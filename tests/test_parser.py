@@ -0,0 +1,33 @@
+import numpy as np
+from OBJFileLoader.parser import parse_obj_bytes
+
+
+def test_inline_comments():
+    data = (b"# cabe\xc3\xa7alho\n"
+            b"mtllib cena.mtl # biblioteca\n"
+            b"v 0 0 0 # a\n"
+            b"v 1 0 0#colado\n"
+            b"v 0 1 0\n"
+            b"vt 0.5 1 # uv\n"
+            b"vn 0 0 1 # normal\n"
+            b"usemtl vermelho # material\n"
+            b"s 1 # grupo\n"
+            b"f 1 2 3 # tri\n"
+            b"f 1/1/1 2/1/1 3/1/1 # com / e #\n")
+    parsed = parse_obj_bytes(data)
+    assert np.array_equal(parsed.vertices, [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+    assert np.array_equal(parsed.texcoords, [[0.5, 1]])
+    assert np.array_equal(parsed.normals, [[0, 0, 1]])
+    assert np.array_equal(parsed.face_sizes, [3, 3])
+    assert np.array_equal(parsed.corner_vertices, [1, 2, 3, 1, 2, 3])
+    assert np.array_equal(parsed.corner_texcoords, [0, 0, 0, 1, 1, 1])
+    assert np.array_equal(parsed.corner_normals, [0, 0, 0, 1, 1, 1])
+    assert parsed.material_ranges == [(0, 'vermelho')]
+    assert parsed.material_libs == ['cena.mtl']
+    assert np.array_equal(parsed.face_groups, [1, 1])
+
+
+def test_comment_lines_without_inline_comments():
+    parsed = parse_obj_bytes(b"# so comentarios\nv 0 0 0\nv 1 0 0\nv 0 1 0\n#f 9 9 9\nf 1 2 3\n")
+    assert np.array_equal(parsed.face_sizes, [3])
+    assert np.array_equal(parsed.corner_vertices, [1, 2, 3])
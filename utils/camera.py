@@ -1,3 +1,6 @@
+from utils.transform import model_matrices
+
+
 class Camera:
     def __init__(self):
         self.rotation = [0, 0]
@@ -11,6 +14,12 @@ class Camera:
             'position': self.position
         }
 
+    def view_matrix(self):
+        # Mesma sequência aplicada em Scene.run: translação seguida das rotações em X e Y
+        position = [self.position[0], self.position[1], self.zoom]
+        rotation = [self.rotation[0], self.rotation[1], 0]
+        return model_matrices([position], [rotation], [[1, 1, 1]])[0]
+
     def from_dict(self, data):
         self.rotation = data['rotation']
         self.zoom = data['zoom']
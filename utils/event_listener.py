@@ -1,7 +1,8 @@
 import pygame
-from pygame.locals import KMOD_CTRL, KMOD_SHIFT, KMOD_ALT, K_r, K_t, K_c, K_F1, K_F2, K_F3, K_F4, K_F5, K_F6, K_o, K_p, K_l, K_DELETE, K_ESCAPE, K_s
+from pygame.locals import KMOD_CTRL, KMOD_SHIFT, KMOD_ALT, K_r, K_t, K_c, K_F1, K_F2, K_F3, K_F4, K_F5, K_F6, K_o, K_p, K_l, K_i, K_u, K_b, K_g, K_a, K_DELETE, K_ESCAPE, K_s
 from OpenGL.GL import *
 from objects.mesh.mesh import Mesh
+from utils.textures import texture_manager
 
 
 class EventListener:
@@ -14,16 +15,22 @@ class EventListener:
         self.overview_active = False 
         self.render_shadows_mode = False 
     
-    def run(self):
+    def run(self, events=None):
         mods = pygame.key.get_mods()
         ctrl_pressed = mods & KMOD_CTRL
         shift_pressed = mods & KMOD_SHIFT
         alt_pressed = mods & KMOD_ALT
 
-        for event in pygame.event.get():
+        if events is None:
+            events = pygame.event.get()
+
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 quit()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED):
+                # O conteúdo da janela pode ter sido perdido pelo sistema de janelas
+                self.scene.mark_dirty()
             elif event.type == pygame.KEYDOWN:
                 self.handle_keydown(event)
             elif event.type == pygame.KEYUP:
@@ -44,15 +51,35 @@ class EventListener:
         #     self.shear_mode = True
         elif event.key in [K_F1, K_F2, K_F3, K_F4, K_F5, K_F6]:
             self.set_preset_position(event.key)
+            self.scene.mark_dirty()
         elif event.key == K_o:
             self.scene.show_overview = not self.scene.show_overview
             self.overview_active = self.scene.show_overview
+            self.scene.mark_dirty()
         elif event.key == K_p:  # Tecla 'P' para alternar a visibilidade da Sidebar
             self.scene.sidebar.toggle_visibility()
+            self.scene.mark_dirty()
         elif event.key == K_l:  # Tecla 'L' para alternar a iluminação solar
             self.scene.toggle_sunlight()
         elif event.key == K_s:  # Tecla 'S' para alternar a renderização das sombras
             self.scene.render_shadows_flag = not self.scene.render_shadows_flag
+            self.scene.mark_dirty()
+        elif event.key == K_i:  # Tecla 'I' para alternar a renderização instanciada
+            self.scene.instanced_rendering = not self.scene.instanced_rendering
+            self.scene.mark_dirty()
+        elif event.key == K_u:  # Tecla 'U' para alternar a renderização sob demanda
+            self.scene.on_demand_rendering = not self.scene.on_demand_rendering
+            self.scene.mark_dirty()
+        elif event.key == K_b:  # Tecla 'B' para alternar o batching estático
+            self.scene.static_batching = not self.scene.static_batching
+            self.scene.mark_dirty()
+        elif event.key == K_a:  # Tecla 'A' para alternar a filtragem anisotrópica das texturas
+            anisotropy = texture_manager.set_anisotropy(texture_manager.next_anisotropy())
+            print(f"Filtragem anisotrópica: {anisotropy:g}x")
+            self.scene.mark_dirty()
+        elif event.key == K_g:  # Tecla 'G' para exportar a cena em glTF binário
+            self.scene.save_scene('scene_export.glb')
+            print("Cena exportada para scene_export.glb")
         elif event.key == K_DELETE:
             self.delete_selected_object()
         elif event.key == K_ESCAPE:
@@ -90,7 +117,8 @@ class EventListener:
 
     def handle_mousemotion(self, event):
         x, y = pygame.mouse.get_pos()
-        self.scene.sidebar.update_hover(x, y)
+        if self.scene.sidebar.update_hover(x, y):
+            self.scene.mark_dirty()
         if self.last_pos:
             self.update_camera_position(event)
 
@@ -104,6 +132,7 @@ class EventListener:
     def select_object(self, event, shift_pressed):
         x, y = pygame.mouse.get_pos()
         selected_object_index = self.scene.select_object(x, y)
+        self.scene.mark_dirty()
         if selected_object_index is not None:
             selected_object = self.scene.objects[selected_object_index]
             selected_object.selected = not selected_object.selected
@@ -122,6 +151,7 @@ class EventListener:
 
         # Verificar se há objetos selecionados
         objects_selected = any(obj.selected for obj in self.scene.objects)
+        self.scene.mark_dirty()
         
         # Verificar se há alguma tecla de controle pressionada
         control_pressed = ctrl_pressed or shift_pressed or alt_pressed
@@ -134,6 +164,8 @@ class EventListener:
             self.scene.camera.zoom += 0.5 * direction
 
     def apply_transformations(self, obj, value_rotate, value_translate, value_scale, min_scale, ctrl_pressed, shift_pressed, alt_pressed):
+        # O objeto sai do seu lote estático; o lote é refeito no próximo quadro sem ele
+        self.scene.static_batcher.release(obj)
         if self.shear_mode and ctrl_pressed:
             obj.shear(value_scale, 'xy')
         elif ctrl_pressed:
@@ -205,3 +237,4 @@ class EventListener:
             self.scene.camera.rotation[0] += dy
             self.scene.camera.rotation[1] += dx
         self.last_pos = (x, y)
+        self.scene.mark_dirty()
@@ -0,0 +1,71 @@
+import numpy as np
+from utils.transform import model_matrices
+
+
+def perspective_matrix(fovy, aspect, near, far):
+    # Mesma matriz gerada por gluPerspective
+    f = 1.0 / np.tan(np.radians(fovy) / 2)
+    return np.array([
+        [f / aspect, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ], dtype=np.float32)
+
+
+def pick_matrix(x, y, width, height, viewport):
+    # Mesma matriz gerada por gluPickMatrix
+    vx, vy, vw, vh = viewport
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[0, 0] = vw / width
+    matrix[1, 1] = vh / height
+    matrix[0, 3] = (vw - 2 * (x - vx)) / width
+    matrix[1, 3] = (vh - 2 * (y - vy)) / height
+    return matrix
+
+
+def world_bounds(obj):
+    """Esfera envolvente do objeto em coordenadas de mundo, ou None se ele não tiver limites."""
+    local = obj.local_bounds()
+    position, rotation, scale = obj.model_transform()
+    if local is None or position is None:
+        return None
+    center, radius = local
+    matrix = model_matrices([position], [rotation], [scale])[0]
+    world_center = matrix[:3, :3] @ np.asarray(center, dtype=np.float32) + matrix[:3, 3]
+    return world_center, radius * float(np.max(np.abs(scale)))
+
+
+class Frustum:
+    """Planos do volume de visão extraídos de projeção * modelview (Gribb/Hartmann)."""
+
+    def __init__(self, matrix):
+        planes = np.array([
+            matrix[3] + matrix[0],  # esquerda
+            matrix[3] - matrix[0],  # direita
+            matrix[3] + matrix[1],  # baixo
+            matrix[3] - matrix[1],  # cima
+            matrix[3] + matrix[2],  # perto
+            matrix[3] - matrix[2],  # longe
+        ], dtype=np.float64)
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        self.planes = planes
+
+    @classmethod
+    def from_camera(cls, camera, aspect, fovy=45, near=0.1, far=10000.0, pick=None):
+        projection = perspective_matrix(fovy, aspect, near, far)
+        if pick is not None:
+            projection = pick @ projection
+        return cls(projection @ camera.view_matrix())
+
+    def visible_mask(self, objects):
+        """Retorna um array booleano indicando quais objetos tocam o volume de visão."""
+        centers = np.zeros((len(objects), 3))
+        radii = np.full(len(objects), np.inf)
+        for i, obj in enumerate(objects):
+            bounds = obj.bounds
+            if bounds is not None:
+                centers[i], radii[i] = bounds
+
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return np.all(distances >= -radii[:, None], axis=1)
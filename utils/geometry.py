@@ -0,0 +1,79 @@
+from OpenGL.GL import *
+from utils.geometry_arena import geometry_arena
+from utils.vertex_format import interleave
+import numpy as np
+
+
+class Geometry:
+    """Vértices, normais, UVs e índices de uma malha, guardados em uma faixa da arena de geometria."""
+
+    def __init__(self, vertices, normals, uvs, faces, mode=GL_TRIANGLES):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.normals = np.ascontiguousarray(normals, dtype=np.float32)
+        self.uvs = np.ascontiguousarray(uvs, dtype=np.float32)
+        self.faces = np.ascontiguousarray(faces, dtype=np.uint32)
+        self.ref_count = 0
+
+        # Quadriláteros viram pares de triângulos para que toda geometria use GL_TRIANGLES
+        self.indices = self.faces.ravel()
+        if mode == GL_QUADS:
+            self.indices = self.faces.reshape(-1, 4)[:, [0, 1, 2, 0, 2, 3]].ravel()
+        self.mode = GL_TRIANGLES
+
+        # Esfera envolvente em coordenadas locais, usada no frustum culling
+        lower, upper = self.vertices.min(axis=0), self.vertices.max(axis=0)
+        self.bounds_center = (lower + upper) / 2
+        self.bounds_radius = float(np.linalg.norm(upper - lower) / 2)
+
+        self.allocation = geometry_arena.allocate(interleave(self.vertices, self.normals, self.uvs), self.indices)
+
+    def bind(self):
+        geometry_arena.bind()
+
+    def draw(self):
+        # Todas as geometrias compartilham o VAO da arena; só muda o base-vertex e o offset dos índices
+        self.bind()
+        geometry_arena.draw(self.allocation, self.mode)
+
+    def draw_instanced(self, count):
+        # Espera que bind() já tenha sido chamado e os atributos por instância configurados
+        geometry_arena.draw_instanced(self.allocation, count, self.mode)
+
+    def delete(self):
+        geometry_arena.free(self.allocation)
+
+
+class GeometryCache:
+    """Cache global de geometrias compartilhadas, indexado por (tipo, parâmetros).
+
+    Objetos com os mesmos parâmetros de tesselação recebem a mesma instância de
+    Geometry; os buffers só são liberados quando o último objeto a devolve.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def acquire(self, key, builder):
+        geometry = self.entries.get(key)
+        if geometry is None:
+            geometry = builder()
+            self.entries[key] = geometry
+        geometry.ref_count += 1
+        return geometry
+
+    def release(self, key):
+        geometry = self.entries.get(key)
+        if geometry is None:
+            return
+        geometry.ref_count -= 1
+        if geometry.ref_count <= 0:
+            geometry.delete()
+            del self.entries[key]
+
+    def clear(self):
+        for geometry in self.entries.values():
+            geometry.delete()
+        self.entries.clear()
+
+
+geometry_cache = GeometryCache()
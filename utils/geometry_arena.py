@@ -0,0 +1,237 @@
+import bisect
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from utils.gl_state import gl_state
+from utils.vertex_format import VERTEX_STRIDE, record_vertex_pointers
+
+INDEX_SIZE = 4  # GL_UNSIGNED_INT; unidade das faixas do buffer de índices
+INDEX_TYPES = {2: GL_UNSIGNED_SHORT, 4: GL_UNSIGNED_INT}
+INDEX_DTYPES = {2: np.uint16, 4: np.uint32}
+
+
+class RangeAllocator:
+    """Lista livre de intervalos (início, tamanho) ordenada por início, com first-fit e fusão de vizinhos."""
+
+    def __init__(self, capacity, used=0):
+        self.capacity = capacity
+        self.free_ranges = [(used, capacity - used)] if capacity > used else []
+
+    def allocate(self, size):
+        if size == 0:
+            return 0
+        for i, (start, length) in enumerate(self.free_ranges):
+            if length >= size:
+                if length == size:
+                    del self.free_ranges[i]
+                else:
+                    self.free_ranges[i] = (start + size, length - size)
+                return start
+        return None
+
+    def free(self, start, size):
+        if size == 0:
+            return
+        i = bisect.bisect(self.free_ranges, (start, size))
+        self.free_ranges.insert(i, (start, size))
+
+        # Junta com o intervalo seguinte e depois com o anterior, se forem contíguos
+        if i + 1 < len(self.free_ranges) and start + size == self.free_ranges[i + 1][0]:
+            size += self.free_ranges[i + 1][1]
+            self.free_ranges[i] = (start, size)
+            del self.free_ranges[i + 1]
+        if i > 0 and sum(self.free_ranges[i - 1]) == start:
+            previous_start, previous_size = self.free_ranges[i - 1]
+            self.free_ranges[i - 1] = (previous_start, previous_size + size)
+            del self.free_ranges[i]
+
+    def free_total(self):
+        return sum(length for _, length in self.free_ranges)
+
+
+class ArenaAllocation:
+    """Faixa de vértices e índices de uma malha dentro da arena; os offsets mudam quando a arena é compactada.
+
+    Índices de 16 bits ocupam duas entradas por posição de 4 bytes da arena:
+    first_index e index_slots contam posições de 4 bytes, index_count conta
+    índices no tamanho index_size da malha.
+    """
+
+    def __init__(self, base_vertex, vertex_count, first_index, index_count, index_size=INDEX_SIZE):
+        self.base_vertex = base_vertex
+        self.vertex_count = vertex_count
+        self.first_index = first_index
+        self.index_count = index_count
+        self.index_size = index_size
+
+    @property
+    def index_slots(self):
+        return -(-self.index_count * self.index_size // INDEX_SIZE)
+
+    @property
+    def index_type(self):
+        return INDEX_TYPES[self.index_size]
+
+    def index_offset(self, first=0):
+        # Deslocamento em bytes do índice first da malha dentro do buffer de índices
+        return self.first_index * INDEX_SIZE + first * self.index_size
+
+    @property
+    def index_pointer(self):
+        return ctypes.c_void_p(self.index_offset())
+
+
+class GeometryArena:
+    """Poucos buffers grandes de vértices e índices dos quais todas as malhas sub-alocam faixas.
+
+    Todas as malhas usam o formato intercalado de utils.vertex_format, então um
+    único VAO atende a cena inteira e os desenhos usam base-vertex em vez de
+    trocar de buffer. Quando uma alocação não cabe, a arena é reconstruída:
+    as faixas vivas são copiadas de forma contígua (compactação) e a capacidade
+    dobra se ainda faltar espaço.
+    """
+
+    def __init__(self, vertex_capacity=1 << 16, index_capacity=1 << 18):
+        self.vertex_capacity = vertex_capacity
+        self.index_capacity = index_capacity
+        self.vao = None
+        self.vbo = None
+        self.ibo = None
+        self.vertices = RangeAllocator(vertex_capacity)
+        self.indices = RangeAllocator(index_capacity)
+        self.allocations = set()
+        self.compactions = 0
+
+    def setup(self):
+        self.vbo, self.ibo = self.create_buffers(self.vertex_capacity, self.index_capacity)
+        self.vao = glGenVertexArrays(1)
+        self.record()
+
+    @staticmethod
+    def create_buffers(vertex_capacity, index_capacity):
+        # Uploads e cópias usam os alvos GL_COPY_* para não mexer no buffer de índices do VAO ligado
+        vbo, ibo = glGenBuffers(2)
+        gl_state.bind_buffer(GL_COPY_WRITE_BUFFER, vbo)
+        glBufferData(GL_COPY_WRITE_BUFFER, vertex_capacity * VERTEX_STRIDE, None, GL_STATIC_DRAW)
+        gl_state.bind_buffer(GL_COPY_WRITE_BUFFER, ibo)
+        glBufferData(GL_COPY_WRITE_BUFFER, index_capacity * INDEX_SIZE, None, GL_STATIC_DRAW)
+        return vbo, ibo
+
+    def record(self):
+        gl_state.bind_vertex_array(self.vao)
+        gl_state.bind_buffer(GL_ARRAY_BUFFER, self.vbo)
+        record_vertex_pointers()
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        # Fora dos desenhos o VAO 0 fica ligado, para que um glBindBuffer(GL_ELEMENT_ARRAY_BUFFER)
+        # feito por outro código não substitua o buffer de índices da arena
+        gl_state.bind_vertex_array(0)
+
+    def allocate(self, vertex_data, indices=None):
+        # Índices em uint16 continuam em 16 bits na arena; qualquer outro tipo vira uint32
+        vertex_data = np.ascontiguousarray(vertex_data, dtype=np.float32)
+        index_size = 2 if indices is not None and np.asarray(indices).dtype == np.uint16 else INDEX_SIZE
+        indices = np.ascontiguousarray(indices if indices is not None else [], dtype=INDEX_DTYPES[index_size]).ravel()
+        allocation = self.reserve(len(vertex_data), indices.size, index_size)
+        self.write_vertices(allocation, vertex_data)
+        self.write_indices(allocation, indices)
+        return allocation
+
+    def reserve(self, vertex_count, index_count=0, index_size=INDEX_SIZE):
+        # Reserva as faixas sem enviar dados; o conteúdo chega depois por write_vertices/write_indices
+        if self.vao is None:
+            self.setup()
+
+        allocation = ArenaAllocation(None, vertex_count, None, index_count, index_size)
+        index_slots = allocation.index_slots
+        base_vertex = self.vertices.allocate(vertex_count)
+        first_index = self.indices.allocate(index_slots)
+        if base_vertex is None or first_index is None:
+            if base_vertex is not None:
+                self.vertices.free(base_vertex, vertex_count)
+            if first_index is not None:
+                self.indices.free(first_index, index_slots)
+            self.rebuild(vertex_count, index_slots)
+            base_vertex = self.vertices.allocate(vertex_count)
+            first_index = self.indices.allocate(index_slots)
+
+        allocation.base_vertex, allocation.first_index = base_vertex, first_index
+        self.allocations.add(allocation)
+        return allocation
+
+    def write_vertices(self, allocation, vertex_data, first=0):
+        # Escreve vertex_data a partir do vértice first da faixa; permite enviar uma malha em partes
+        vertex_data = np.ascontiguousarray(vertex_data, dtype=np.float32)
+        if len(vertex_data):
+            gl_state.bind_buffer(GL_COPY_WRITE_BUFFER, self.vbo)
+            glBufferSubData(GL_COPY_WRITE_BUFFER, (allocation.base_vertex + first) * VERTEX_STRIDE,
+                            vertex_data.nbytes, vertex_data)
+
+    def write_indices(self, allocation, indices, first=0):
+        indices = np.ascontiguousarray(indices, dtype=INDEX_DTYPES[allocation.index_size]).ravel()
+        if indices.size:
+            gl_state.bind_buffer(GL_COPY_WRITE_BUFFER, self.ibo)
+            glBufferSubData(GL_COPY_WRITE_BUFFER, allocation.index_offset(first), indices.nbytes, indices)
+
+    def free(self, allocation):
+        # Só atualiza as listas livres; não chama o OpenGL e pode rodar a partir de __del__
+        if allocation not in self.allocations:
+            return
+        self.allocations.remove(allocation)
+        self.vertices.free(allocation.base_vertex, allocation.vertex_count)
+        self.indices.free(allocation.first_index, allocation.index_slots)
+
+    def rebuild(self, extra_vertices=0, extra_indices=0):
+        used_vertices = sum(allocation.vertex_count for allocation in self.allocations)
+        used_indices = sum(allocation.index_slots for allocation in self.allocations)
+        while used_vertices + extra_vertices > self.vertex_capacity:
+            self.vertex_capacity *= 2
+        while used_indices + extra_indices > self.index_capacity:
+            self.index_capacity *= 2
+
+        vbo, ibo = self.create_buffers(self.vertex_capacity, self.index_capacity)
+
+        # Copia as faixas vivas lado a lado, na ordem em que já estavam
+        vertex_cursor = index_cursor = 0
+        for allocation in sorted(self.allocations, key=lambda allocation: allocation.base_vertex):
+            self.copy_range(self.vbo, vbo, allocation.base_vertex * VERTEX_STRIDE, vertex_cursor * VERTEX_STRIDE,
+                            allocation.vertex_count * VERTEX_STRIDE)
+            self.copy_range(self.ibo, ibo, allocation.first_index * INDEX_SIZE, index_cursor * INDEX_SIZE,
+                            allocation.index_slots * INDEX_SIZE)
+            allocation.base_vertex = vertex_cursor
+            allocation.first_index = index_cursor
+            vertex_cursor += allocation.vertex_count
+            index_cursor += allocation.index_slots
+
+        gl_state.delete_buffers([self.vbo, self.ibo])
+        self.vbo, self.ibo = vbo, ibo
+        self.vertices = RangeAllocator(self.vertex_capacity, vertex_cursor)
+        self.indices = RangeAllocator(self.index_capacity, index_cursor)
+        self.record()
+        self.compactions += 1
+
+    @staticmethod
+    def copy_range(source, destination, source_offset, destination_offset, size):
+        if size == 0:
+            return
+        gl_state.bind_buffer(GL_COPY_READ_BUFFER, source)
+        gl_state.bind_buffer(GL_COPY_WRITE_BUFFER, destination)
+        glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, source_offset, destination_offset, size)
+
+    def bind(self):
+        gl_state.bind_vertex_array(self.vao)
+
+    def draw(self, allocation, mode=GL_TRIANGLES):
+        glDrawElementsBaseVertex(mode, allocation.index_count, allocation.index_type, allocation.index_pointer,
+                                 allocation.base_vertex)
+
+    def draw_instanced(self, allocation, count, mode=GL_TRIANGLES):
+        glDrawElementsInstancedBaseVertex(mode, allocation.index_count, allocation.index_type,
+                                          allocation.index_pointer, count, allocation.base_vertex)
+
+    def draw_range(self, allocation, mode, first, count):
+        # Parte dos índices da malha (ex.: os de um material de um modelo .obj)
+        glDrawElementsBaseVertex(mode, count, allocation.index_type, ctypes.c_void_p(allocation.index_offset(first)),
+                                 allocation.base_vertex)
+
+
+geometry_arena = GeometryArena()
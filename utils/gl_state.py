@@ -0,0 +1,130 @@
+from OpenGL.GL import *
+
+
+class GLState:
+    """Espelho em Python do estado do OpenGL que os objetos alteram a cada desenho.
+
+    Cor atual, capacidades habilitadas, texturas, matriz de textura, buffers,
+    VAO e programa ficam guardados aqui e a chamada só chega ao driver quando
+    o valor realmente muda. Código que mexe no OpenGL por fora
+    (glPushAttrib/glPopAttrib, desenho em modo imediato) deve chamar
+    invalidate() depois para não deixar o cache desatualizado.
+    """
+
+    def __init__(self):
+        self.issued = 0
+        self.skipped = 0
+        self.invalidate()
+
+    def invalidate(self):
+        self.current_color = None
+        self.capabilities = {}
+        self.textures = {}
+        self.buffers = {}
+        self.vertex_array = None
+        self.program = None
+        self.texture_uniform = None
+        self.blend = None
+        self.uv_rect = None
+
+    def reset_counters(self):
+        self.issued = 0
+        self.skipped = 0
+
+    def _changed(self, changed):
+        if changed:
+            self.issued += 1
+        else:
+            self.skipped += 1
+        return changed
+
+    def color(self, r, g, b):
+        color = (r, g, b)
+        if self._changed(self.current_color != color):
+            glColor3f(r, g, b)
+            self.current_color = color
+
+    def forget_color(self):
+        # Para quem chama glColor diretamente (ex.: glColor com o Kd de um material)
+        self.current_color = None
+
+    def set_capability(self, capability, enabled):
+        if self._changed(self.capabilities.get(capability) != enabled):
+            if enabled:
+                glEnable(capability)
+            else:
+                glDisable(capability)
+            self.capabilities[capability] = enabled
+            # Com um shader ativo o GL_TEXTURE_2D não tem efeito; o programa lê um uniform booleano
+            if capability == GL_TEXTURE_2D and self.texture_uniform is not None:
+                glUniform1i(self.texture_uniform, 1 if enabled else 0)
+
+    def enable(self, capability):
+        self.set_capability(capability, True)
+
+    def disable(self, capability):
+        self.set_capability(capability, False)
+
+    def blend_func(self, source, destination):
+        blend = (source, destination)
+        if self._changed(self.blend != blend):
+            glBlendFunc(source, destination)
+            self.blend = blend
+
+    def bind_texture(self, target, texture):
+        if self._changed(self.textures.get(target) != texture):
+            glBindTexture(target, texture)
+            self.textures[target] = texture
+
+    def texture_rect(self, uv_rect):
+        # Matriz de textura da unidade 0: UV * (escala u, escala v) + (deslocamento u, deslocamento v)
+        if self._changed(self.uv_rect != uv_rect):
+            offset_u, offset_v, scale_u, scale_v = uv_rect
+            glMatrixMode(GL_TEXTURE)
+            glLoadIdentity()
+            glTranslatef(offset_u, offset_v, 0.0)
+            glScalef(scale_u, scale_v, 1.0)
+            glMatrixMode(GL_MODELVIEW)
+            self.uv_rect = uv_rect
+
+    def bind_buffer(self, target, buffer):
+        if self._changed(self.buffers.get(target) != buffer):
+            glBindBuffer(target, buffer)
+            self.buffers[target] = buffer
+
+    def bind_vertex_array(self, vertex_array):
+        if self._changed(self.vertex_array != vertex_array):
+            glBindVertexArray(vertex_array)
+            self.vertex_array = vertex_array
+            # O buffer de índices faz parte do estado do VAO
+            self.buffers.pop(GL_ELEMENT_ARRAY_BUFFER, None)
+
+    def use_program(self, program, texture_uniform=None):
+        if self._changed(self.program != program):
+            glUseProgram(program)
+            self.program = program
+            self.texture_uniform = texture_uniform if texture_uniform not in (None, -1) else None
+            # Força o próximo set_capability(GL_TEXTURE_2D) a atualizar o uniform do novo programa
+            if self.texture_uniform is not None:
+                self.capabilities.pop(GL_TEXTURE_2D, None)
+
+    def delete_textures(self, textures):
+        glDeleteTextures(textures)
+        # O OpenGL desfaz o bind de texturas apagadas e pode reutilizar os IDs
+        for target, texture in list(self.textures.items()):
+            if texture in textures:
+                del self.textures[target]
+
+    def delete_buffers(self, buffers):
+        glDeleteBuffers(len(buffers), buffers)
+        for target, buffer in list(self.buffers.items()):
+            if buffer in buffers:
+                del self.buffers[target]
+
+    def delete_vertex_arrays(self, vertex_arrays):
+        glDeleteVertexArrays(len(vertex_arrays), vertex_arrays)
+        if self.vertex_array in vertex_arrays:
+            self.vertex_array = None
+
+
+gl_state = GLState()
@@ -0,0 +1,187 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from utils.geometry_arena import geometry_arena
+from utils.gl_state import gl_state
+from utils.lighting import FRAGMENT_SHADER
+from utils.render_queue import OPAQUE_PASS
+from utils.shader import program_cache
+from utils.textures import texture_manager
+from utils.transform import model_matrices
+
+SELECTED_COLOR = (1.0, 0.5, 0.0)
+
+# Locais dos atributos por instância: a matriz de modelo ocupa quatro posições
+# consecutivas (uma por coluna). Ficam longe dos atributos convencionais
+# (gl_Vertex, gl_Normal, gl_MultiTexCoord0) usados pelos VBOs das geometrias.
+UV_RECT_LOCATION = 10
+COLOR_LOCATION = 11
+MODEL_LOCATION = 12
+
+INSTANCE_FLOATS = 24  # 16 da matriz + 4 da cor + 4 da célula do atlas
+INSTANCE_STRIDE = INSTANCE_FLOATS * 4
+COMMAND_SIZE = 5 * 4  # DrawElementsIndirectCommand
+
+VERTEX_SHADER = """
+#version 330 compatibility
+layout(location = 10) in vec4 instance_uv_rect;
+layout(location = 11) in vec4 instance_color;
+layout(location = 12) in mat4 instance_model;
+
+out vec3 v_position;
+out vec4 v_color;
+out vec3 v_normal;
+centroid out vec2 v_uv;
+
+void main() {
+    mat4 model_view = gl_ModelViewMatrix * instance_model;
+    vec4 eye_position = model_view * gl_Vertex;
+    gl_Position = gl_ProjectionMatrix * eye_position;
+
+    v_position = eye_position.xyz;
+    v_normal = transpose(inverse(mat3(model_view))) * gl_Normal;
+    v_color = instance_color;
+    v_uv = gl_MultiTexCoord0.xy * instance_uv_rect.zw + instance_uv_rect.xy;
+}
+"""
+
+
+class InstancedRenderer:
+    """Desenha objetos que compartilham geometria e textura com uma única chamada instanciada.
+
+    A matriz de modelo e a cor (incluindo o laranja de seleção) de cada objeto
+    vão para um buffer por instância, reenviado a cada quadro.
+    """
+
+    def __init__(self):
+        self.program = None
+        self.instance_vbo = None
+        self.indirect_buffer = None
+        self.multi_draw_indirect = False
+        self.draw_calls = 0
+
+    def setup(self):
+        # Mesmo fragment shader da iluminação por pixel; só a origem da matriz e da cor muda
+        self.program = program_cache.get(VERTEX_SHADER, FRAGMENT_SHADER)
+        self.instance_vbo = glGenBuffers(1)
+
+        # glMultiDrawElementsIndirect com baseInstance exige OpenGL 4.3
+        version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+        self.multi_draw_indirect = version >= (4, 3) and bool(glMultiDrawElementsIndirect)
+        if self.multi_draw_indirect:
+            self.indirect_buffer = glGenBuffers(1)
+
+    @staticmethod
+    def can_instance(obj):
+        # Os objetos com blending seguem no caminho por objeto, na ordem de trás para frente da fila
+        return getattr(obj, 'geometry', None) is not None and obj.render_pass == OPAQUE_PASS
+
+    def group(self, objects):
+        groups = {}
+        for obj in objects:
+            key = (obj.geometry_key, obj.texture_id)
+            groups.setdefault(key, []).append(obj)
+        return groups
+
+    def build_instance_data(self, objects):
+        positions, rotations, scales = zip(*(obj.model_transform() for obj in objects))
+        matrices = model_matrices(positions, rotations, scales)
+
+        data = np.empty((len(objects), INSTANCE_FLOATS), dtype=np.float32)
+        # Colunas contíguas, como o OpenGL espera para um atributo mat4
+        data[:, :16] = matrices.transpose(0, 2, 1).reshape(-1, 16)
+        data[:, 16:19] = [SELECTED_COLOR if obj.selected else obj.color for obj in objects]
+        data[:, 19] = 1.0
+        # Objetos com texturas diferentes do mesmo atlas ficam no mesmo grupo; cada um lê a sua célula
+        data[:, 20:24] = [obj.texture_rect for obj in objects]
+        return data
+
+    def draw(self, objects, lighting):
+        if self.program is None:
+            self.setup()
+
+        groups = self.group(objects)
+        if not groups:
+            return
+
+        # Um único upload com as instâncias de todos os grupos
+        batches = list(groups.values())
+        instance_data = np.concatenate([self.build_instance_data(batch) for batch in batches])
+        gl_state.bind_buffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, instance_data.nbytes, instance_data, GL_STREAM_DRAW)
+
+        gl_state.use_program(self.program)
+        lighting.apply(self.program)
+        use_texture = program_cache.uniform(self.program, 'use_texture')
+
+        self.draw_calls = 0
+        geometry_arena.bind()
+        if self.multi_draw_indirect:
+            self.draw_indirect(batches, use_texture)
+            return
+
+        first_instance = 0
+        for batch in batches:
+            geometry = batch[0].geometry
+            texture_id = batch[0].texture_id
+
+            if texture_id:
+                texture_manager.bind(texture_id)
+            glUniform1i(use_texture, 1 if texture_id else 0)
+
+            self.bind_instance_attributes(first_instance * INSTANCE_STRIDE)
+            geometry.draw_instanced(len(batch))
+            self.unbind_instance_attributes()
+
+            first_instance += len(batch)
+            self.draw_calls += 1
+
+    def draw_indirect(self, batches, use_texture):
+        # Como todas as geometrias vivem na arena, os grupos com a mesma textura saem
+        # em um único glMultiDrawElementsIndirect; o baseInstance de cada comando
+        # aponta para as instâncias do grupo no buffer por instância
+        by_texture = {}
+        first_instance = 0
+        for batch in batches:
+            allocation = batch[0].geometry.allocation
+            command = (allocation.index_count, len(batch), allocation.first_index, allocation.base_vertex, first_instance)
+            by_texture.setdefault(batch[0].texture_id, []).append(command)
+            first_instance += len(batch)
+
+        commands = np.array([command for group in by_texture.values() for command in group], dtype=np.uint32)
+        gl_state.bind_buffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+        glBufferData(GL_DRAW_INDIRECT_BUFFER, commands.nbytes, commands, GL_STREAM_DRAW)
+
+        self.bind_instance_attributes(0)
+        first_command = 0
+        for texture_id, group in by_texture.items():
+            if texture_id:
+                texture_manager.bind(texture_id)
+            glUniform1i(use_texture, 1 if texture_id else 0)
+
+            glMultiDrawElementsIndirect(GL_TRIANGLES, GL_UNSIGNED_INT, ctypes.c_void_p(first_command * COMMAND_SIZE), len(group), 0)
+            first_command += len(group)
+            self.draw_calls += 1
+        self.unbind_instance_attributes()
+
+    def bind_instance_attributes(self, offset):
+        gl_state.bind_buffer(GL_ARRAY_BUFFER, self.instance_vbo)
+
+        glEnableVertexAttribArray(COLOR_LOCATION)
+        glVertexAttribPointer(COLOR_LOCATION, 4, GL_FLOAT, GL_FALSE, INSTANCE_STRIDE, ctypes.c_void_p(offset + 64))
+        glVertexAttribDivisor(COLOR_LOCATION, 1)
+
+        glEnableVertexAttribArray(UV_RECT_LOCATION)
+        glVertexAttribPointer(UV_RECT_LOCATION, 4, GL_FLOAT, GL_FALSE, INSTANCE_STRIDE, ctypes.c_void_p(offset + 80))
+        glVertexAttribDivisor(UV_RECT_LOCATION, 1)
+
+        for column in range(4):
+            location = MODEL_LOCATION + column
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, INSTANCE_STRIDE, ctypes.c_void_p(offset + column * 16))
+            glVertexAttribDivisor(location, 1)
+
+    def unbind_instance_attributes(self):
+        for location in range(UV_RECT_LOCATION, MODEL_LOCATION + 4):
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
@@ -0,0 +1,121 @@
+import numpy as np
+from OpenGL.GL import *
+from utils.gl_state import gl_state
+from utils.shader import program_cache
+
+MAX_LIGHTS = 8
+SCENE_AMBIENT = (0.2, 0.2, 0.2)  # Mesmo valor padrão do GL_LIGHT_MODEL_AMBIENT
+
+VERTEX_SHADER = """
+#version 330 compatibility
+out vec3 v_position;
+out vec3 v_normal;
+out vec4 v_color;
+// centroid: com MSAA, amostras na borda do triângulo não extrapolam as UVs para fora da célula do atlas
+centroid out vec2 v_uv;
+
+void main() {
+    vec4 eye_position = gl_ModelViewMatrix * gl_Vertex;
+    gl_Position = gl_ProjectionMatrix * eye_position;
+
+    v_position = eye_position.xyz;
+    v_normal = gl_NormalMatrix * gl_Normal;
+    v_color = gl_Color;
+    // A matriz de textura leva as UVs à célula de uma textura no atlas
+    v_uv = (gl_TextureMatrix[0] * gl_MultiTexCoord0).xy;
+}
+"""
+
+# Compartilhado com o caminho instanciado, que só troca o vertex shader
+FRAGMENT_SHADER = """
+#version 330 compatibility
+const int MAX_LIGHTS = 8;
+
+in vec3 v_position;
+in vec3 v_normal;
+in vec4 v_color;
+centroid in vec2 v_uv;
+
+uniform int light_count;
+uniform vec4 light_position[MAX_LIGHTS];  // Espaço do olho; w = 0 para luz direcional
+uniform vec3 light_ambient[MAX_LIGHTS];
+uniform vec3 light_diffuse[MAX_LIGHTS];
+uniform vec3 scene_ambient;
+
+uniform bool use_texture;
+uniform sampler2D texture0;
+
+out vec4 frag_color;
+
+void main() {
+    vec3 normal = normalize(v_normal);
+
+    // Iluminação por pixel com a cor do objeto como material ambiente e difuso
+    vec3 color = scene_ambient * v_color.rgb;
+    for (int i = 0; i < light_count; i++) {
+        vec3 direction = light_position[i].w == 0.0
+            ? normalize(light_position[i].xyz)
+            : normalize(light_position[i].xyz - v_position);
+        float diffuse = max(dot(normal, direction), 0.0);
+        color += (light_ambient[i] + diffuse * light_diffuse[i]) * v_color.rgb;
+    }
+
+    vec4 result = vec4(color, v_color.a);
+    if (use_texture) {
+        result *= texture(texture0, v_uv);
+    }
+    frag_color = result;
+}
+"""
+
+
+class LightingPipeline:
+    """Iluminação em GLSL: o sol e as LightSphere chegam ao shader como arrays de uniforms.
+
+    begin() converte as luzes do quadro para o espaço do olho da câmera ativa;
+    apply() envia os arrays uma única vez para cada programa usado na passada.
+    """
+
+    def __init__(self):
+        self.program = None
+        self.light_count = 0
+        self.positions = np.zeros((MAX_LIGHTS, 4), dtype=np.float32)
+        self.ambients = np.zeros((MAX_LIGHTS, 3), dtype=np.float32)
+        self.diffuses = np.zeros((MAX_LIGHTS, 3), dtype=np.float32)
+        self.uploaded = set()
+
+    def setup(self):
+        self.program = program_cache.get(VERTEX_SHADER, FRAGMENT_SHADER)
+
+    def begin(self, lights, view):
+        # lights: lista de (posição homogênea no mundo, cor ambiente, cor difusa)
+        lights = lights[:MAX_LIGHTS]
+        self.light_count = len(lights)
+        self.positions[:] = 0.0
+        self.ambients[:] = 0.0
+        self.diffuses[:] = 0.0
+        if lights:
+            positions, ambients, diffuses = zip(*lights)
+            self.positions[:self.light_count] = np.asarray(positions, dtype=np.float32) @ view.T
+            self.ambients[:self.light_count] = ambients
+            self.diffuses[:self.light_count] = diffuses
+        self.uploaded = set()
+
+        if self.program is None:
+            self.setup()
+        self.bind()
+
+    def bind(self):
+        gl_state.use_program(self.program, program_cache.uniform(self.program, 'use_texture'))
+        self.apply(self.program)
+
+    def apply(self, program):
+        if program in self.uploaded:
+            return
+        glUniform1i(program_cache.uniform(program, 'light_count'), self.light_count)
+        glUniform4fv(program_cache.uniform(program, 'light_position'), MAX_LIGHTS, self.positions)
+        glUniform3fv(program_cache.uniform(program, 'light_ambient'), MAX_LIGHTS, self.ambients)
+        glUniform3fv(program_cache.uniform(program, 'light_diffuse'), MAX_LIGHTS, self.diffuses)
+        glUniform3f(program_cache.uniform(program, 'scene_ambient'), *SCENE_AMBIENT)
+        glUniform1i(program_cache.uniform(program, 'texture0'), 0)
+        self.uploaded.add(program)
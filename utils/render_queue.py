@@ -0,0 +1,58 @@
+import numpy as np
+from OpenGL.GL import *
+from utils.gl_state import gl_state
+
+# Passadas na ordem em que são desenhadas. As luzes vêm antes de tudo para que
+# as posições já estejam atualizadas quando os objetos iluminados forem desenhados.
+LIGHT_PASS = 0
+OPAQUE_PASS = 1
+BLENDED_PASS = 2
+OVERLAY_PASS = 3  # Desenhos auxiliares sem iluminação (ex.: marcadores de importação em andamento)
+
+
+class RenderQueue:
+    """Fila de desenho reconstruída a cada quadro e ordenada para minimizar trocas de estado.
+
+    Dentro de cada passada os itens opacos são ordenados por programa, textura e
+    geometria, de modo que objetos que compartilham estado fiquem adjacentes.
+    Os itens com blending são desenhados de trás para frente em relação à câmera,
+    já que a ordem importa para a composição.
+    """
+
+    def __init__(self):
+        self.passes = {}
+
+    def build(self, objects, eye=None, program_for=None):
+        self.passes = {}
+        for obj in objects:
+            program = program_for(obj) if program_for else 0
+            self.passes.setdefault(obj.render_pass, []).append((obj.sort_key(program), obj))
+
+        for render_pass, items in self.passes.items():
+            if render_pass == BLENDED_PASS and eye is not None:
+                items.sort(key=lambda item: -self.distance(item[1], eye))
+            else:
+                items.sort(key=lambda item: item[0])
+            self.passes[render_pass] = [obj for _, obj in items]
+
+    @staticmethod
+    def distance(obj, eye):
+        if obj.bounds is None:
+            return 0.0
+        return float(np.linalg.norm(np.asarray(obj.bounds[0]) - eye))
+
+    @staticmethod
+    def begin_pass(render_pass):
+        # Estado de blending explícito por passada, em vez de depender de quem desenhou por último
+        if render_pass == BLENDED_PASS:
+            gl_state.enable(GL_BLEND)
+            gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        else:
+            gl_state.disable(GL_BLEND)
+
+    def __iter__(self):
+        for render_pass in sorted(self.passes):
+            yield render_pass, self.passes[render_pass]
+
+    def __len__(self):
+        return sum(len(items) for items in self.passes.values())
@@ -1,10 +1,20 @@
 import json
 import os
 import pygame
+import numpy as np
 from objects import Mesh, Cube, Sphere, Cone, Cylinder, HalfSphere, Pyramid, LightSphere, Plane
 from utils.camera import Camera
 from utils.event_listener import EventListener
 from utils.sidebar import Sidebar
+from utils.instancing import InstancedRenderer
+from utils.static_batch import StaticBatch, StaticBatcher
+from utils.frustum import Frustum, pick_matrix
+from utils.gl_state import gl_state
+from utils.render_queue import OVERLAY_PASS, RenderQueue
+from utils.lighting import LightingPipeline
+from OBJFileLoader.importer import mesh_importer
+from OBJFileLoader.gltf import export_glb, read_glb_scene
+from utils.textures import texture_manager
 from objects.eixos import draw_axes
 from pygame.locals import DOUBLEBUF, OPENGL
 from OpenGL.GL import *
@@ -24,7 +34,7 @@ class Scene:
         pygame.display.gl_set_attribute(pygame.GL_ALPHA_SIZE, 8)  # Set alpha buffer size to 8 bits
         pygame.display.gl_set_attribute(pygame.GL_STENCIL_SIZE, 8)  # Set stencil buffer size to 8 bits
         pygame.display.gl_set_attribute(pygame.GL_FRAMEBUFFER_SRGB_CAPABLE, 1)  # Enable sRGB color space
-        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)  # Use core profile
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_COMPATIBILITY)  # Shaders GLSL convivem com o desenho em modo imediato da interface
         pygame.display.set_mode(self.display, DOUBLEBUF | OPENGL)
         glEnable(GL_MULTISAMPLE)
         glEnable(GL_POLYGON_SMOOTH)
@@ -67,7 +77,34 @@ class Scene:
         #toggle sombras
         self.render_shadows_flag = False
 
+        #renderização instanciada dos primitivos (tecla I)
+        self.instanced_rendering = False
+        self.instanced_renderer = InstancedRenderer()
+        self.render_queue = RenderQueue()
+
+        #batching estático: objetos parados e não selecionados são desenhados em lotes por textura (tecla B)
+        self.static_batching = True
+        self.static_batcher = StaticBatcher()
+
+        #renderização sob demanda: só redesenha quando algo muda na cena
+        self.on_demand_rendering = True
+        self.dirty = True
+        self.idle_timeout = 250  # ms de espera por eventos antes de olhar a fila de mensagens de novo
+
+        #iluminação por pixel em GLSL; o pipeline fixo só é usado se o shader não compilar
+        self.lighting = LightingPipeline()
+        self.shader_lighting = True
+
+        #frustum culling e contadores do último quadro da vista principal
+        self.frustum_culling = True
+        self.visible_count = 0
+        self.culled_count = 0
+
     def save_scene(self, file_path):
+        if file_path.lower().endswith('.glb'):
+            # Cena inteira em um único binário, com as malhas e texturas embutidas
+            export_glb(self.objects, file_path, self.camera.to_dict())
+            return
         scene_data = {
             'objects': [obj.to_dict() for obj in self.objects],
             'camera': self.camera.to_dict()  # Save camera position
@@ -80,8 +117,16 @@ class Scene:
             print(f"File not found: {file_path}")
             return
 
-        with open(file_path, 'r') as f:
-            scene_data = json.load(f)
+        if file_path.lower().endswith('.glb'):
+            scene_data = read_glb_scene(file_path)
+        else:
+            with open(file_path, 'r') as f:
+                scene_data = json.load(f)
+
+        # Devolve as geometrias compartilhadas dos objetos da cena anterior
+        for obj in self.objects:
+            obj.delete()
+        self.static_batcher.clear()
 
         self.objects = []
         for obj_data in scene_data['objects']:
@@ -111,6 +156,7 @@ class Scene:
 
         if 'camera' in scene_data:
             self.camera.from_dict(scene_data['camera'])  # Load camera position
+        self.mark_dirty()
 
     def add_object(self, object_type):
         if object_type == 'plane':
@@ -134,8 +180,9 @@ class Scene:
             return
         
         obj.position = [0, 0, 0]
-        obj.init_vbo()
+        obj.update_bounds()
         self.objects.append(obj)
+        self.mark_dirty()
 
     def start_main_loop(self):
         saved_scene_file = 'saved_scene.json'
@@ -161,12 +208,14 @@ class Scene:
             glLightfv(GL_LIGHT1, GL_DIFFUSE, self.sunlight_diffuse)
             glLightfv(GL_LIGHT1, GL_SPECULAR, self.sunlight_specular)
         self.sunlight_enabled = not self.sunlight_enabled
+        self.mark_dirty()
 
     def render_shadows(self):
         if not any(isinstance(obj, LightSphere) for obj in self.objects) and not self.sunlight_enabled:
             return  # Não renderiza sombras se não houver nenhuma luz na cena
 
         glPushAttrib(GL_LIGHTING_BIT | GL_TEXTURE_BIT)  # Salva o estado das configurações de iluminação e texturas
+        gl_state.use_program(0)  # As sombras usam o pipeline fixo, sem iluminação
         glDisable(GL_LIGHTING)  # Desativa a iluminação
         glDisable(GL_TEXTURE_2D)  # Desativa texturas
 
@@ -226,9 +275,47 @@ class Scene:
                 glPopMatrix()
 
         glPopAttrib()  # Restaura o estado das configurações de iluminação e texturas
+        gl_state.invalidate()
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def wait_events(self):
+        # Sem nada pendente, bloqueia em pygame.event.wait em vez de redesenhar a cena parada
+        if not self.on_demand_rendering or self.dirty or not self.message_queue.empty():
+            return pygame.event.get()
+        event = pygame.event.wait(self.idle_timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        return events + pygame.event.get()
+
+    def update_imports(self):
+        # Importações assíncronas: a cada quadro as malhas já lidas pelas threads enviam parte dos vértices
+        if not mesh_importer.busy:
+            return
+        mesh_importer.poll()
+        budget = mesh_importer.upload_budget
+        for obj in list(self.objects):
+            if budget <= 0:
+                break
+            if not isinstance(obj, Mesh) or obj.import_job is None:
+                continue
+            try:
+                budget = obj.update_import(budget)
+            except Exception as e:
+                print(f"Erro ao importar {obj.filename}: {e}")
+                obj.delete()
+                self.objects.remove(obj)
+        # Enquanto houver importações a cena continua sendo redesenhada para mostrar o progresso
+        self.mark_dirty()
 
     def run(self):
-        self.eventListener.run()
+        self.update_imports()
+        if texture_manager.collect():
+            self.mark_dirty()  # texturas despejadas voltaram à GPU: troca as cópias reduzidas na tela
+        self.eventListener.run(self.wait_events())
+        if self.on_demand_rendering and not self.dirty and self.message_queue.empty():
+            return
+        self.dirty = False
         
         # Limpa o buffer de cor e de profundidade
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -246,20 +333,20 @@ class Scene:
         glRotatef(self.camera.rotation[1], 0, 1, 0)
         
         # Desenha o cenário principal
+        gl_state.reset_counters()
         draw_axes()
+        gl_state.invalidate()  # Os eixos alteram a cor diretamente
 
         while not self.message_queue.empty():
             object_type = self.message_queue.get()
             self.add_object(object_type)
 
-        # Atualiza e aplica a iluminação do sol
-        if self.sunlight_enabled:
-            glEnable(GL_LIGHT1)
-            glLightfv(GL_LIGHT1, GL_POSITION, self.sunlight_position)
-
-        # Desenha todos os objetos da cena principal
-        for obj in self.objects:
-            obj.draw()
+        # Desenha os objetos da cena principal que estão dentro do campo de visão
+        aspect_ratio = self.display[0] / self.display[1]
+        visible = self.cull_objects(Frustum.from_camera(self.camera, aspect_ratio), self.draw_items())
+        self.visible_count = sum(len(item.members) if isinstance(item, StaticBatch) else 1 for item in visible)
+        self.culled_count = len(self.objects) - self.visible_count
+        self.draw_objects(visible, self.camera)
 
         # Renderiza as sombras se o flag estiver ativado
         if self.render_shadows_flag:
@@ -278,6 +365,7 @@ class Scene:
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
         self.sidebar.draw()
+        gl_state.invalidate()
         glPopMatrix()
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
@@ -295,6 +383,91 @@ class Scene:
         pygame.display.flip()
         self.clock.tick(999)
 
+    def draw_items(self):
+        # Com o batching ligado, os objetos estáticos chegam à fila como lotes já em coordenadas de mundo
+        if not self.static_batching:
+            return self.objects
+        return self.static_batcher.update(self.objects)
+
+    def cull_objects(self, frustum, objects=None):
+        objects = self.objects if objects is None else objects
+        if not self.frustum_culling:
+            return list(objects)
+        mask = frustum.visible_mask(objects)
+        return [obj for obj, visible in zip(objects, mask) if visible]
+
+    def light_sources(self):
+        # Luzes do quadro em coordenadas de mundo: (posição homogênea, cor ambiente, cor difusa)
+        lights = []
+        if self.sunlight_enabled:
+            lights.append((self.sunlight_position, self.sunlight_ambient[:3], self.sunlight_diffuse[:3]))
+        for obj in self.objects:
+            if isinstance(obj, LightSphere) and hasattr(obj, 'light_id'):
+                lights.append(([*obj.position, 1.0], (0.0, 0.0, 0.0), obj.color[:3]))
+        return lights
+
+    def begin_lighting(self, camera):
+        if self.shader_lighting:
+            try:
+                self.lighting.begin(self.light_sources(), camera.view_matrix())
+                return
+            except RuntimeError as e:
+                print(f"Iluminação por shader indisponível: {e}")
+                self.shader_lighting = False
+
+        # Pipeline fixo: as posições das luzes dependem da modelview da câmera ativa
+        gl_state.use_program(0)
+        if self.sunlight_enabled:
+            glEnable(GL_LIGHT1)
+            glLightfv(GL_LIGHT1, GL_POSITION, self.sunlight_position)
+        for obj in self.objects:
+            if isinstance(obj, LightSphere):
+                obj.update_light()
+
+    def draw_objects(self, objects, camera):
+        # Monta a fila do quadro: luzes, opacos agrupados por estado e, por fim, os objetos com blending
+        eye = np.linalg.inv(camera.view_matrix())[:3, 3]
+        program_for = None
+        if self.instanced_rendering:
+            program_for = lambda obj: 1 if self.instanced_renderer.can_instance(obj) else 0
+        self.render_queue.build(objects, eye, program_for)
+        self.begin_lighting(camera)
+
+        for render_pass, items in self.render_queue:
+            self.render_queue.begin_pass(render_pass)
+            if self.shader_lighting and render_pass != OVERLAY_PASS:
+                self.lighting.bind()
+            else:
+                gl_state.use_program(0)
+            if not self.instanced_rendering:
+                for obj in items:
+                    obj.draw()
+                continue
+
+            # Malhas .obj continuam no caminho por objeto; a fila já as deixa antes do grupo instanciado
+            instanced = []
+            for obj in items:
+                if self.instanced_renderer.can_instance(obj):
+                    instanced.append(obj)
+                else:
+                    obj.draw()
+
+            try:
+                self.instanced_renderer.draw(instanced, self.lighting)
+            except RuntimeError as e:
+                print(f"Renderização instanciada indisponível: {e}")
+                self.instanced_rendering = False
+                for obj in instanced:
+                    obj.draw()
+        self.finish_objects()
+
+    def finish_objects(self):
+        # Textura e VAO ficam ligados entre objetos; desliga ao fim da passada
+        # para não afetar o texto e a barra lateral, desenhados em modo imediato
+        gl_state.use_program(0)
+        gl_state.disable(GL_TEXTURE_2D)
+        gl_state.bind_vertex_array(0)
+
     def draw_overview(self):
         # Salva o estado atual do OpenGL, incluindo viewport e outros atributos
         glPushAttrib(GL_VIEWPORT_BIT | GL_TRANSFORM_BIT | GL_ENABLE_BIT | GL_LIGHTING_BIT)
@@ -324,6 +497,7 @@ class Scene:
         glVertex2f(overview_x + overview_width + 5, overview_y + overview_height + 5)
         glVertex2f(overview_x - 5, overview_y + overview_height + 5)
         glEnd()
+        gl_state.forget_color()
 
         glPopMatrix()
         glMatrixMode(GL_PROJECTION)
@@ -354,13 +528,9 @@ class Scene:
         glRotatef(self.overview_camera.rotation[0], 1, 0, 0)
         glRotatef(self.overview_camera.rotation[1], 0, 1, 0)
 
-        if self.sunlight_enabled:
-            glEnable(GL_LIGHT1)
-            glLightfv(GL_LIGHT1, GL_POSITION, self.sunlight_position)
-
         # Desenha os objetos no overview
-        for obj in self.objects:
-            obj.draw()
+        self.draw_objects(self.cull_objects(Frustum.from_camera(self.overview_camera, aspect_ratio), self.draw_items()),
+                          self.overview_camera)
 
         # Restaura as matrizes de projeção e modelview
         glPopMatrix()
@@ -369,6 +539,7 @@ class Scene:
 
         # Restaura o estado salvo do OpenGL
         glPopAttrib()
+        gl_state.invalidate()
 
     def select_object(self, x, y):
         buffer_size = len(self.objects) * 4 * 4
@@ -391,9 +562,17 @@ class Scene:
         glRotatef(self.camera.rotation[0], 1, 0, 0)
         glRotatef(self.camera.rotation[1], 0, 1, 0)
 
+        # Só objetos que tocam a pequena região de seleção em volta do cursor precisam ser desenhados
+        pick = pick_matrix(x, viewport[3] - y, 1, 1, viewport)
+        frustum = Frustum.from_camera(self.camera, self.display[0] / self.display[1], pick=pick)
+        mask = frustum.visible_mask(self.objects) if self.frustum_culling else [True] * len(self.objects)
+
         for i, obj in enumerate(self.objects):
+            if not mask[i]:
+                continue
             glLoadName(i + 1)
             obj.draw()
+        self.finish_objects()
 
         glPopMatrix()  # Pop do MODELVIEW
         glMatrixMode(GL_PROJECTION)
@@ -425,12 +604,13 @@ class Scene:
         return closest_index
 
     def delete_selected_object(self):
-        # se o objeto for do tipo light_sphere, chame o método delete
+        # libera os recursos do objeto (luz, geometria compartilhada) antes de removê-lo
         for obj in self.objects:
             if obj.selected:
-                if isinstance(obj, LightSphere):
-                    obj.delete()
+                self.static_batcher.release(obj)
+                obj.delete()
                 self.objects.remove(obj)
+                self.mark_dirty()
                 break
         print(f"Deleted selected object")
         print(f"Total objects: {len(self.objects)}")
@@ -453,6 +633,14 @@ class Scene:
         glPushMatrix()
         glLoadIdentity()
         self.render_text(f"FPS: {self.fps:.2f}", 10, self.display[1] - 30)
+        self.render_text(f"Visíveis: {self.visible_count}  Descartados: {self.culled_count}", 10, self.display[1] - 55)
+        self.render_text(f"Estado GL: {gl_state.issued} enviados  {gl_state.skipped} evitados", 10, self.display[1] - 80)
+        self.render_text(texture_manager.stats(), 10, self.display[1] - 105)
+        y = self.display[1] - 130
+        for obj in self.objects:
+            if isinstance(obj, Mesh) and obj.import_job is not None:
+                self.render_text(f"Importando {obj.import_job.name}: {obj.import_progress:.0%}", 10, y)
+                y -= 25
         glPopMatrix()
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
@@ -0,0 +1,69 @@
+from OpenGL.GL import *
+
+
+def compile_shader(source, shader_type):
+    shader = glCreateShader(shader_type)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        log = glGetShaderInfoLog(shader).decode(errors='replace')
+        glDeleteShader(shader)
+        raise RuntimeError(f"Erro ao compilar shader: {log}")
+    return shader
+
+
+def compile_program(vertex_source, fragment_source):
+    vertex_shader = compile_shader(vertex_source, GL_VERTEX_SHADER)
+    fragment_shader = compile_shader(fragment_source, GL_FRAGMENT_SHADER)
+
+    program = glCreateProgram()
+    glAttachShader(program, vertex_shader)
+    glAttachShader(program, fragment_shader)
+    glLinkProgram(program)
+
+    # Depois do link os shaders individuais não são mais necessários
+    glDeleteShader(vertex_shader)
+    glDeleteShader(fragment_shader)
+
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        log = glGetProgramInfoLog(program).decode(errors='replace')
+        glDeleteProgram(program)
+        raise RuntimeError(f"Erro ao linkar programa: {log}")
+    return program
+
+
+class ProgramCache:
+    """Programas compilados uma única vez por par de fontes GLSL.
+
+    As localizações dos uniforms também ficam guardadas, evitando um
+    glGetUniformLocation a cada quadro.
+    """
+
+    def __init__(self):
+        self.programs = {}
+        self.locations = {}
+
+    def get(self, vertex_source, fragment_source):
+        key = (vertex_source, fragment_source)
+        program = self.programs.get(key)
+        if program is None:
+            program = compile_program(vertex_source, fragment_source)
+            self.programs[key] = program
+        return program
+
+    def uniform(self, program, name):
+        key = (program, name)
+        location = self.locations.get(key)
+        if location is None:
+            location = glGetUniformLocation(program, name)
+            self.locations[key] = location
+        return location
+
+    def clear(self):
+        for program in self.programs.values():
+            glDeleteProgram(program)
+        self.programs.clear()
+        self.locations.clear()
+
+
+program_cache = ProgramCache()
@@ -141,28 +141,32 @@ class Sidebar:
         )
         if file_path:
             selected_object.load_texture(file_path)
+            scene.mark_dirty()
 
     def add_obj(self, scene):
         root = tk.Tk()
         root.withdraw()
         file_path = filedialog.askopenfilename(
-            filetypes=[("OBJ files", "*.obj"), ("All files", "*.*")]
+            filetypes=[("3D models", "*.obj *.stl *.ply *.glb"), ("OBJ files", "*.obj"), ("STL files", "*.stl"),
+                       ("PLY files", "*.ply"), ("glTF binary", "*.glb"), ("All files", "*.*")]
         )
         if file_path:
-            new_obj = Mesh(position=[0, 0, 0], filename=file_path, rotation=[0, 0, 0], scale=[1, 1, 1])
+            # A leitura roda em segundo plano; a cena mostra um marcador com o progresso até o modelo ficar pronto
+            new_obj = Mesh(position=[0, 0, 0], filename=file_path, rotation=[0, 0, 0], scale=[1, 1, 1], asynchronous=True)
             scene.objects.append(new_obj)
+            scene.mark_dirty()
 
     def update_hover(self, mouse_x, mouse_y):
-        if not self.visible:
-            self.hovered_button = None
-            return
-
-        for i, button in enumerate(self.buttons):
-            button_y = self.start_y + i * (self.height + self.spacing)
-            if self.start_x <= mouse_x <= self.start_x + self.width and button_y <= mouse_y <= button_y + self.height:
-                self.hovered_button = i
-                return
+        # Retorna True quando o botão destacado muda e a barra precisa ser redesenhada
+        previous = self.hovered_button
         self.hovered_button = None
+        if self.visible:
+            for i, button in enumerate(self.buttons):
+                button_y = self.start_y + i * (self.height + self.spacing)
+                if self.start_x <= mouse_x <= self.start_x + self.width and button_y <= mouse_y <= button_y + self.height:
+                    self.hovered_button = i
+                    break
+        return self.hovered_button != previous
 
     def toggle_visibility(self):
         self.visible = not self.visible
@@ -0,0 +1,152 @@
+import numpy as np
+from OpenGL.GL import *
+from utils.geometry_arena import geometry_arena
+from utils.gl_state import gl_state
+from utils.render_queue import OPAQUE_PASS
+from utils.textures import texture_manager
+from utils.transform import model_matrices
+from utils.vertex_format import interleave
+
+
+class StaticBatch:
+    """Geometria em coordenadas de mundo de vários objetos parados com a mesma textura (ou atlas) e cor.
+
+    Entra na fila de desenho como um objeto comum: tem render_pass, sort_key,
+    bounds e draw(), e é desenhado com uma única chamada sobre a arena.
+    """
+
+    render_pass = OPAQUE_PASS
+    selected = False
+
+    def __init__(self, key):
+        self.texture_id, self.color = key
+        self.members = []
+        self.allocation = None
+        self.bounds = None
+        self.stale = True
+
+    def sort_key(self, program=0):
+        return program, self.texture_id or 0, 0
+
+    def rebuild(self):
+        self.release()
+        self.stale = False
+        if not self.members:
+            return
+
+        vertices, normals, uvs, indices = [], [], [], []
+        vertex_offset = 0
+        for obj in self.members:
+            geometry = obj.geometry
+            position, rotation, scale = obj.model_transform()
+            matrix = model_matrices([position], [rotation], [scale])[0]
+            linear = matrix[:3, :3]
+
+            vertices.append(geometry.vertices @ linear.T + matrix[:3, 3])
+            # Normais pela inversa transposta, como o GL_NORMALIZE faria com escala não uniforme
+            world_normals = geometry.normals @ np.linalg.inv(linear)
+            lengths = np.linalg.norm(world_normals, axis=1, keepdims=True)
+            normals.append(world_normals / np.where(lengths == 0, 1, lengths))
+            # Cada membro pode ter a sua célula no mesmo atlas: as UVs já saem remapeadas
+            offset_u, offset_v, scale_u, scale_v = obj.texture_rect
+            uvs.append(geometry.uvs * (scale_u, scale_v) + (offset_u, offset_v))
+            indices.append(geometry.indices + vertex_offset)
+            vertex_offset += len(geometry.vertices)
+
+        vertices = np.concatenate(vertices)
+        self.allocation = geometry_arena.allocate(interleave(vertices, np.concatenate(normals), np.concatenate(uvs)),
+                                                  np.concatenate(indices))
+
+        lower, upper = vertices.min(axis=0), vertices.max(axis=0)
+        self.bounds = (lower + upper) / 2, float(np.linalg.norm(upper - lower) / 2)
+
+    def release(self):
+        if self.allocation is not None:
+            geometry_arena.free(self.allocation)
+            self.allocation = None
+        self.bounds = None
+
+    def draw(self, is_shadow=False):
+        if self.allocation is None:
+            return
+        gl_state.color(*self.color)
+        gl_state.set_capability(GL_TEXTURE_2D, bool(self.texture_id))
+        if self.texture_id:
+            texture_manager.bind(self.texture_id)
+        # Os vértices já estão em coordenadas de mundo; basta a modelview da câmera
+        geometry_arena.bind()
+        geometry_arena.draw(self.allocation)
+
+
+class StaticBatcher:
+    """Agrupa objetos não selecionados e não transformados em lotes estáticos, por textura e cor.
+
+    Um objeto sai do seu lote quando é selecionado, transformado (release) ou
+    muda de textura ou cor; o lote afetado só é refeito na próxima chamada a
+    update(), antes do desenho.
+    """
+
+    def __init__(self):
+        self.batches = {}
+        self.membership = {}  # objeto -> (chave do lote em que está, célula do atlas usada nas UVs)
+        self.released = set()  # objetos transformados desde o último update
+
+    @staticmethod
+    def batch_key(obj):
+        return obj.texture_id, tuple(obj.color)
+
+    @staticmethod
+    def membership_key(obj):
+        # Trocar de textura dentro do mesmo atlas mantém a chave, mas muda as UVs do lote
+        return StaticBatcher.batch_key(obj), obj.texture_rect
+
+    @staticmethod
+    def can_batch(obj):
+        return getattr(obj, 'geometry', None) is not None and obj.render_pass == OPAQUE_PASS and not obj.selected
+
+    def release(self, obj):
+        self.released.add(obj)
+        key, _ = self.membership.pop(obj, (None, None))
+        if key is not None:
+            batch = self.batches[key]
+            batch.members.remove(obj)
+            batch.stale = True
+
+    def update(self, objects):
+        """Atualiza os lotes e retorna os itens a desenhar: lotes mais objetos dinâmicos."""
+        current = set(objects)
+        for obj in list(self.membership):
+            if obj not in current or not self.can_batch(obj) or self.membership[obj] != self.membership_key(obj):
+                self.release(obj)
+
+        dynamic = []
+        for obj in objects:
+            if obj in self.membership:
+                continue
+            # Objetos transformados ficam fora de qualquer lote até o próximo update
+            if obj in self.released or not self.can_batch(obj):
+                dynamic.append(obj)
+                continue
+            key = self.batch_key(obj)
+            batch = self.batches.get(key)
+            if batch is None:
+                batch = self.batches[key] = StaticBatch(key)
+            batch.members.append(obj)
+            batch.stale = True
+            self.membership[obj] = key, obj.texture_rect
+        self.released.clear()
+
+        for key, batch in list(self.batches.items()):
+            if batch.stale:
+                batch.rebuild()
+            if not batch.members:
+                del self.batches[key]
+
+        return list(self.batches.values()) + dynamic
+
+    def clear(self):
+        for batch in self.batches.values():
+            batch.release()
+        self.batches.clear()
+        self.membership.clear()
+        self.released.clear()
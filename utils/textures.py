@@ -0,0 +1,527 @@
+import atexit
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from OpenGL.GL import *
+from OpenGL.GL.EXT.texture_filter_anisotropic import (GL_MAX_TEXTURE_MAX_ANISOTROPY_EXT, GL_TEXTURE_MAX_ANISOTROPY_EXT,
+                                                      glInitTextureFilterAnisotropicEXT)
+from utils.gl_state import gl_state
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+# Maior lado, em pixels, da cópia reduzida que fica na GPU no lugar de uma textura despejada
+PROXY_SIZE = 8
+# Amostras da filtragem anisotrópica (1 desliga); limitado pelo máximo do driver
+DEFAULT_ANISOTROPY = 8.0
+ANISOTROPY_LEVELS = (1.0, 2.0, 4.0, 8.0, 16.0)
+# Texturas com até DEFAULT_ATLAS_THRESHOLD pixels no maior lado podem dividir páginas de ATLAS_SIZE pixels
+DEFAULT_ATLAS_THRESHOLD = 256
+ATLAS_SIZE = 1024
+ATLAS_MIN_CELL = 64
+# Borda de cada célula, em pixels do nível 0, com cópias dos texels da beirada da imagem
+ATLAS_GUTTER = 8
+# Sem filtragem anisotrópica nas páginas: depois do último nível as amostras extras se espalham pela área
+# da tela, não pelo nível, e chegariam às células vizinhas
+ATLAS_MAX_ANISOTROPY = 1.0
+# Níveis de mipmap das páginas: só enquanto a borda reduzida (ATLAS_GUTTER / 2^k texels) ainda cobre o
+# meio texel lido pela filtragem bilinear; nos níveis seguintes a leitura chegaria à célula vizinha
+ATLAS_MIP_LEVELS = int(math.log2(2 * ATLAS_GUTTER)) + 1
+# (deslocamento u, deslocamento v, escala u, escala v) aplicado às UVs; a textura inteira
+FULL_UV_RECT = (0.0, 0.0, 1.0, 1.0)
+
+
+def file_key(filename):
+    # Caminho absoluto mais o carimbo do arquivo: editar o arquivo gera uma chave nova
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def image_key(image):
+    # image é um caminho ou uma imagem embutida com key() e open() (ver gltf.EmbeddedImage)
+    return file_key(image) if isinstance(image, str) else image.key()
+
+
+def image_name(image):
+    return image if isinstance(image, str) else f"{image.filename}#{image.index}"
+
+
+def mip_levels(image, mipmaps):
+    """Níveis RGBA (altura, largura, 4) a enviar: só a imagem ou a cadeia de mipmaps até 1x1.
+
+    Cada nível tem metade do anterior (arredondada para baixo, como no
+    OpenGL) e é a média de blocos do nível de cima.
+    """
+    levels = [np.asarray(image, dtype=np.uint8)]
+    while mipmaps and max(image.size) > 1:
+        image = image.resize((max(1, image.width // 2), max(1, image.height // 2)), Image.BOX)
+        levels.append(np.asarray(image, dtype=np.uint8))
+    return levels
+
+
+def atlas_cell_size(size):
+    # Menor potência de 2 que contém o maior lado, a partir de ATLAS_MIN_CELL
+    return max(ATLAS_MIN_CELL, 1 << (max(size) - 1).bit_length())
+
+
+def prepare_image(image, flip, mipmaps, atlas_threshold=0):
+    """Roda no pool de decodificação: (níveis da imagem, níveis da cópia reduzida, tem transparência).
+
+    Leitura, conversão para RGBA, inversão das linhas e mipmaps ficam
+    todos aqui, fora da thread do OpenGL. Uma imagem que não passa de
+    atlas_threshold pixels no maior lado é redimensionada para o interior da
+    sua célula do atlas, cercada por ATLAS_GUTTER pixels que repetem a
+    beirada, sempre com mipmaps, e volta sem cópia reduzida (None).
+    """
+    with Image.open(image if isinstance(image, str) else image.open()) as decoded:
+        decoded = decoded.convert('RGBA')
+    # Algum pixel com alfa abaixo de 255: o objeto precisa ser desenhado com blending
+    has_alpha = decoded.getchannel('A').getextrema()[0] < 255
+    if flip:
+        decoded = decoded.transpose(Image.FLIP_TOP_BOTTOM)
+    if atlas_threshold and max(decoded.size) <= atlas_threshold:
+        inner = atlas_cell_size(decoded.size) - 2 * ATLAS_GUTTER
+        pixels = np.asarray(decoded.resize((inner, inner), Image.BICUBIC), dtype=np.uint8)
+        padded = np.pad(pixels, ((ATLAS_GUTTER, ATLAS_GUTTER), (ATLAS_GUTTER, ATLAS_GUTTER), (0, 0)), mode='edge')
+        return mip_levels(Image.fromarray(padded), True)[:ATLAS_MIP_LEVELS], None, has_alpha
+    # Cópia com no máximo PROXY_SIZE pixels no maior lado, média de cada bloco da imagem
+    scale = min(1.0, PROXY_SIZE / max(decoded.size))
+    proxy = decoded.resize((max(1, round(decoded.width * scale)), max(1, round(decoded.height * scale))), Image.BOX)
+    return mip_levels(decoded, mipmaps), mip_levels(proxy, mipmaps), has_alpha
+
+
+def texture_bytes(levels):
+    # Memória ocupada na GPU: RGBA de 8 bits em todos os níveis
+    return sum(level.nbytes for level in levels)
+
+
+class TextureAtlas:
+    """Página de ATLAS_SIZE pixels dividida em células quadradas com lado potência de 2.
+
+    Uma célula livre do tamanho pedido é reaproveitada; senão, uma célula
+    livre maior é dividida em quatro. Como cada célula fica alinhada ao
+    próprio tamanho, o nível k dos mipmaps dela é a mesma célula reduzida
+    2^k vezes, feita só com os texels dela. Células liberadas não são juntadas de volta; a página é
+    apagada quando fica vazia.
+    """
+
+    def __init__(self, texture_id):
+        self.texture_id = texture_id
+        self.cells = {ATLAS_SIZE: [(0, 0)]}  # lado -> posições livres
+        self.used = 0
+        self.nbytes = sum((ATLAS_SIZE >> level) ** 2 * 4 for level in range(ATLAS_MIP_LEVELS))
+
+    def take(self, size):
+        cells = self.cells.get(size)
+        if cells:
+            return cells.pop()
+        if size >= ATLAS_SIZE:
+            return None
+        parent = self.take(size * 2)
+        if parent is not None:
+            x, y = parent
+            self.cells.setdefault(size, []).extend([(x + size, y), (x, y + size), (x + size, y + size)])
+        return parent
+
+    def allocate(self, size):
+        cell = self.take(size)
+        if cell is not None:
+            self.used += 1
+        return cell
+
+    def free(self, cell, size):
+        self.cells.setdefault(size, []).append(cell)
+        self.used -= 1
+
+
+class Texture:
+    """Uma textura do OpenGL compartilhada, com a contagem de handles que a usam.
+
+    texture_id fica None até o primeiro upload. Quando despejada, o mesmo
+    ID passa a guardar só a cópia reduzida (proxy); image e flip permitem
+    ler a imagem de novo quando ela voltar a ser desenhada. Uma textura no
+    atlas usa o ID da página e uv_rect aponta a sua célula.
+    """
+
+    def __init__(self, key, image, flip, mipmaps, atlas=False):
+        self.key = key
+        self.image = image  # None quando a imagem não pôde ser lida: fica sem textura ou só com a cópia reduzida
+        self.flip = flip
+        self.mipmaps = mipmaps
+        self.atlas = atlas  # pode ir para um atlas se for pequena
+        self.page = None  # TextureAtlas em que ficou, com a posição da célula
+        self.cell = None
+        self.uv_rect = FULL_UV_RECT
+        self.has_alpha = False  # conhecido só depois da decodificação
+        self.texture_id = None
+        self.width = self.height = 0
+        self.nbytes = 0  # memória ocupada agora na GPU (a imagem inteira ou só a cópia reduzida)
+        self.proxy = None
+        self.resident = False
+        self.future = None  # decodificação em andamento no pool
+        self.last_used = 0  # último quadro em que foi desenhada
+        self.refs = 0
+
+
+class TextureHandle:
+    """Referência de um objeto a uma textura do texture_manager; devolvida com release()."""
+
+    def __init__(self, manager, texture):
+        self.manager = manager
+        self.texture = texture
+
+    @property
+    def texture_id(self):
+        # None enquanto a imagem é decodificada: o objeto é desenhado sem textura
+        return self.texture.texture_id if self.texture is not None else None
+
+    @property
+    def uv_rect(self):
+        return self.texture.uv_rect if self.texture is not None else FULL_UV_RECT
+
+    @property
+    def has_alpha(self):
+        return self.texture is not None and self.texture.has_alpha
+
+    def release(self):
+        # Idempotente: cada handle devolve a sua referência uma única vez
+        if self.texture is not None:
+            self.manager.release(self.texture)
+            self.texture = None
+
+
+class TextureManager:
+    """Texturas de todo o processo, usadas pelas primitivas, pelos Mesh e pelos materiais dos modelos.
+
+    As texturas são indexadas pelo caminho absoluto e pelo carimbo do
+    arquivo (tamanho, mtime), mais as opções de envio (linhas invertidas,
+    mipmaps): a mesma imagem é decodificada e enviada uma única vez, por
+    mais objetos que a usem. Cada acquire() entrega um handle com contagem
+    de referências; quando o último é liberado, a textura entra na fila de
+    collect(), que a apaga na thread do OpenGL (release pode ser chamado a
+    partir de __del__).
+
+    A leitura, a conversão, a inversão e os mipmaps rodam em um pool de
+    threads; collect() só envia para a GPU as imagens prontas, até
+    upload_budget bytes por quadro. Até lá o handle não tem ID e o objeto é
+    desenhado sem textura.
+
+    A memória das texturas na GPU é limitada a budget bytes: collect()
+    despeja as texturas desenhadas há mais tempo, trocando o conteúdo do ID
+    por uma cópia de até PROXY_SIZE pixels. Uma textura despejada que volta
+    a ser desenhada (bind) aparece reduzida até ser lida de novo pelo pool
+    e reenviada. As texturas do último quadro desenhado nunca são
+    despejadas, então o limite pode ser ultrapassado quando elas sozinhas
+    não cabem nele.
+
+    Texturas pedidas com atlas=True e com até atlas_threshold pixels no
+    maior lado (0 desliga) dividem páginas de atlas: o handle entrega o ID
+    da página e o uv_rect da célula, e objetos com texturas pequenas
+    diferentes passam a ser desenhados com o mesmo bind, nos mesmos lotes e
+    grupos instanciados. As páginas contam em used_bytes, mas não são
+    despejadas.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, max_workers=None, upload_budget=64 * 1024 * 1024,
+                 anisotropy=DEFAULT_ANISOTROPY, atlas_threshold=DEFAULT_ATLAS_THRESHOLD):
+        self.budget = budget
+        self.anisotropy = anisotropy
+        self.atlas_threshold = min(atlas_threshold, ATLAS_SIZE)
+        self.max_anisotropy = None  # consultado no primeiro upload, com o contexto já criado; 1.0 sem a extensão
+        self.upload_budget = upload_budget
+        # Um núcleo fica para a thread de desenho
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 1) - 1))
+        self.executor = None
+        self.textures = {}  # chave -> Texture
+        self.by_id = {}  # ID do OpenGL -> Texture, para bind(); as texturas dos atlas ficam de fora
+        self.atlases = []  # páginas TextureAtlas
+        self.pending = []  # IDs de texturas sem referências, aguardando collect()
+        self.loading = []  # texturas com decodificação em andamento no pool
+        self.wanted = []  # texturas despejadas desenhadas desde o último collect()
+        self.used_bytes = 0
+        self.frame = 1
+        self.drawn_frame = 0  # último quadro em que alguma textura foi desenhada
+        self.drawing = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.restores = 0
+        atexit.register(self.shutdown)
+
+    def acquire(self, image, flip=False, mipmaps=False, atlas=False):
+        """Handle da textura de image (caminho ou imagem embutida); na primeira vez a imagem vai para o pool.
+
+        Com atlas=True a imagem vai para um atlas se for pequena; só pode ser
+        pedido por quem tem todas as UVs entre 0 e 1, já que a célula não
+        repete. Um arquivo ausente é informado aqui (FileNotFoundError); uma
+        imagem inválida só é detectada na decodificação e informada por
+        collect().
+        """
+        atlas = atlas and self.atlas_threshold > 0
+        key = image_key(image) + (flip, mipmaps, atlas)
+        texture = self.textures.get(key)
+        if texture is None:
+            texture = self.textures[key] = Texture(key, image, flip, mipmaps, atlas)
+            texture.last_used = self.frame
+            self.load(texture)
+            self.misses += 1
+        else:
+            self.hits += 1
+        texture.refs += 1
+        return TextureHandle(self, texture)
+
+    def load(self, texture):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='texture-decode')
+        texture.future = self.executor.submit(prepare_image, texture.image, texture.flip, texture.mipmaps,
+                                              self.atlas_threshold if texture.atlas else 0)
+        self.loading.append(texture)
+
+    @property
+    def busy(self):
+        return bool(self.loading)
+
+    def store(self, texture, levels, proxy):
+        # Envia a imagem inteira para o ID da textura e guarda a cópia reduzida usada no despejo
+        if proxy is None:
+            self.store_in_atlas(texture, levels)
+            return
+        if texture.texture_id is None:
+            texture.texture_id = glGenTextures(1)
+            self.by_id[texture.texture_id] = texture
+        texture.height, texture.width = levels[0].shape[:2]
+        texture.proxy = proxy
+        self.upload(texture.texture_id, levels)
+        self.used_bytes += texture_bytes(levels) - texture.nbytes
+        texture.nbytes = texture_bytes(levels)
+        texture.resident = True
+        # Recém-enviada conta como usada: não é despejada antes de ter a chance de ser desenhada
+        texture.last_used = self.frame
+
+    def store_in_atlas(self, texture, levels):
+        # A imagem já vem do tamanho da célula; a primeira página com espaço a recebe
+        size = levels[0].shape[0]
+        for page in self.atlases:
+            cell = page.allocate(size)
+            if cell is not None:
+                break
+        else:
+            page = self.create_atlas()
+            cell = page.allocate(size)
+        texture.page, texture.cell = page, cell
+        texture.texture_id = page.texture_id
+        texture.height = texture.width = size
+        texture.resident = True
+
+        x, y = cell
+        gl_state.bind_texture(GL_TEXTURE_2D, page.texture_id)
+        for level, pixels in enumerate(levels):
+            side = pixels.shape[0]
+            glTexSubImage2D(GL_TEXTURE_2D, level, x >> level, y >> level, side, side, GL_RGBA, GL_UNSIGNED_BYTE,
+                            pixels)
+        # As UVs cobrem só o interior; a leitura além da beirada cai na borda de texels repetidos,
+        # que nos níveis usados (ATLAS_MIP_LEVELS) ainda é larga o bastante para não chegar à célula vizinha
+        inner = size - 2 * ATLAS_GUTTER
+        texture.uv_rect = ((x + ATLAS_GUTTER) / ATLAS_SIZE, (y + ATLAS_GUTTER) / ATLAS_SIZE,
+                           inner / ATLAS_SIZE, inner / ATLAS_SIZE)
+
+    def create_atlas(self):
+        page = TextureAtlas(glGenTextures(1))
+        gl_state.bind_texture(GL_TEXTURE_2D, page.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        self.apply_anisotropy(ATLAS_MAX_ANISOTROPY)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, ATLAS_MIP_LEVELS - 1)
+        for level in range(ATLAS_MIP_LEVELS):
+            side = ATLAS_SIZE >> level
+            glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA, side, side, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        self.atlases.append(page)
+        self.used_bytes += page.nbytes
+        return page
+
+    def upload(self, texture_id, levels):
+        gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+        mipmaps = len(levels) > 1
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR if mipmaps else GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        self.apply_anisotropy()
+        # Níveis maiores que os enviados (de um conteúdo anterior maior) ficam fora da textura
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+        for level, pixels in enumerate(levels):
+            height, width = pixels.shape[:2]
+            glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+
+    def effective_anisotropy(self):
+        if self.max_anisotropy is None:
+            self.max_anisotropy = (float(glGetFloatv(GL_MAX_TEXTURE_MAX_ANISOTROPY_EXT))
+                                   if glInitTextureFilterAnisotropicEXT() else 1.0)
+        return max(1.0, min(float(self.anisotropy), self.max_anisotropy))
+
+    def apply_anisotropy(self, limit=None):
+        # Na textura ligada: superfícies vistas de lado amostram mais texels ao longo da direção esticada
+        anisotropy = self.effective_anisotropy()
+        if limit is not None:
+            anisotropy = min(anisotropy, limit)
+        if self.max_anisotropy > 1.0:  # sem a extensão não há o que ajustar
+            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAX_ANISOTROPY_EXT, anisotropy)
+
+    def set_anisotropy(self, anisotropy):
+        """Troca a filtragem anisotrópica de todas as texturas; retorna o valor usado, já limitado pelo driver."""
+        self.anisotropy = anisotropy
+        for texture_id in self.by_id:
+            gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+            self.apply_anisotropy()
+        for page in self.atlases:
+            gl_state.bind_texture(GL_TEXTURE_2D, page.texture_id)
+            self.apply_anisotropy(ATLAS_MAX_ANISOTROPY)
+        return self.effective_anisotropy()
+
+    def next_anisotropy(self):
+        # Próximo valor de ANISOTROPY_LEVELS aceito pelo driver, voltando a 1 depois do maior
+        self.effective_anisotropy()
+        levels = [level for level in ANISOTROPY_LEVELS if level <= self.max_anisotropy]
+        return next((level for level in levels if level > self.anisotropy), levels[0])
+
+    def bind(self, texture_id, uv_rect=FULL_UV_RECT):
+        """Liga a textura para desenho e a marca como usada neste quadro; use no lugar de gl_state.bind_texture.
+
+        uv_rect vai para a matriz de textura: a célula de uma textura no
+        atlas, ou a textura inteira.
+        """
+        texture = self.by_id.get(texture_id)
+        if texture is not None:
+            texture.last_used = self.frame
+            self.drawing = True
+            if not texture.resident and texture.image is not None and texture not in self.wanted:
+                self.wanted.append(texture)
+        gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+        gl_state.texture_rect(uv_rect)
+
+    def evict(self, texture):
+        # O ID continua válido (lotes e instâncias o guardam); só o conteúdo vira a cópia reduzida
+        self.upload(texture.texture_id, texture.proxy)
+        self.used_bytes += texture_bytes(texture.proxy) - texture.nbytes
+        texture.nbytes = texture_bytes(texture.proxy)
+        texture.resident = False
+        self.evictions += 1
+
+    def finish_loading(self):
+        # Envia as imagens já decodificadas, na ordem em que foram pedidas, até upload_budget bytes
+        uploaded, budget = False, self.upload_budget
+        for texture in list(self.loading):
+            if budget <= 0:
+                break
+            if not texture.future.done():
+                continue
+            self.loading.remove(texture)
+            future, texture.future = texture.future, None
+            if texture.refs <= 0:
+                continue
+            try:
+                levels, proxy, texture.has_alpha = future.result()
+            except FileNotFoundError:
+                self.fail(texture, f"Textura não encontrada: {image_name(texture.image)}")
+                continue
+            except UnidentifiedImageError:
+                self.fail(texture, f"Arquivo '{image_name(texture.image)}' não é uma imagem válida.")
+                continue
+            except Exception as e:
+                self.fail(texture, f"Erro ao carregar textura {image_name(texture.image)}: {e}")
+                continue
+            if texture.texture_id is not None:
+                self.restores += 1
+            self.store(texture, levels, proxy)
+            budget -= texture_bytes(levels)
+            uploaded = True
+        return uploaded
+
+    def fail(self, texture, message):
+        # A imagem não pôde ser lida: os handles atuais ficam sem textura (ou com a cópia reduzida) e a
+        # entrada sai do índice, então o próximo acquire do mesmo arquivo tenta decodificá-lo de novo
+        print(message)
+        texture.image = None
+        if self.textures.get(texture.key) is texture:
+            del self.textures[texture.key]
+
+    def release(self, texture):
+        # Só atualiza as contagens; não chama o OpenGL
+        texture.refs -= 1
+        if texture.refs <= 0:
+            # Uma textura que falhou já saiu do índice, mas o ID e a célula ainda precisam ser devolvidos
+            if self.textures.get(texture.key) is texture:
+                del self.textures[texture.key]
+            if texture.future is not None:
+                texture.future.cancel()
+            if texture.page is not None:
+                # A célula volta para a página; uma página vazia é apagada por collect()
+                texture.page.free(texture.cell, texture.width)
+                texture.page = None
+            elif texture.texture_id is not None:
+                self.pending.append(texture.texture_id)
+
+    def collect(self):
+        """Envia as texturas decodificadas, apaga as sem referências e aplica o limite de memória.
+
+        Chamado pela cena a cada quadro. Retorna True quando alguma textura
+        chegou à GPU, isto é, a cena precisa ser redesenhada.
+        """
+        if self.drawing:
+            self.drawn_frame = self.frame
+            self.frame += 1
+            self.drawing = False
+        for page in [page for page in self.atlases if not page.used]:
+            self.atlases.remove(page)
+            self.used_bytes -= page.nbytes
+            self.pending.append(page.texture_id)
+        if self.pending:
+            for texture_id in self.pending:
+                texture = self.by_id.pop(texture_id, None)
+                if texture is not None:
+                    self.used_bytes -= texture.nbytes
+                    if texture in self.wanted:
+                        self.wanted.remove(texture)
+            gl_state.delete_textures(self.pending)
+            self.pending = []
+
+        # Despejadas que voltaram a ser desenhadas: lidas de novo pelo pool, a cópia reduzida fica até lá
+        for texture in self.wanted:
+            if texture.refs > 0 and not texture.resident and texture.future is None:
+                self.load(texture)
+        self.wanted = []
+        uploaded = self.finish_loading()
+
+        if self.used_bytes > self.budget:
+            # Do desenho mais antigo para o mais recente; as do último quadro ficam
+            candidates = sorted((texture for texture in self.by_id.values()
+                                 if texture.resident and texture.last_used < self.drawn_frame),
+                                key=lambda texture: texture.last_used)
+            for texture in candidates:
+                if self.used_bytes <= self.budget:
+                    break
+                self.evict(texture)
+        return uploaded
+
+    def shutdown(self):
+        # Na saída, as decodificações que ainda não começaram são descartadas em vez de aguardadas
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def evicted_count(self):
+        return sum(1 for texture in self.by_id.values() if not texture.resident)
+
+    def stats(self):
+        # Linha de uso para a tela: memória na GPU / limite, texturas despejadas agora e no total
+        loading = f"  decodificando {len(self.loading)}" if self.loading else ""
+        atlas = (f"  atlas {len(self.atlases)} ({sum(page.used for page in self.atlases)} texturas)"
+                 if self.atlases else "")
+        return (f"Texturas: {len(self.by_id)}  {self.used_bytes / 2 ** 20:.1f} / {self.budget / 2 ** 20:.0f} MB  "
+                f"despejadas {self.evicted_count} (total {self.evictions}, recarregadas {self.restores}){atlas}{loading}")
+
+
+texture_manager = TextureManager()
@@ -1,5 +1,36 @@
+import numpy as np
+
+
 class Transform:
     def __init__(self, position=None, rotation=None, scale=None):
         self.position = position if position is not None else [0.0, 0.0, 0.0]
         self.rotation = rotation if rotation is not None else [0.0, 0.0, 0.0]
         self.scale = scale if scale is not None else [1.0, 1.0, 1.0]
+
+
+def model_matrices(positions, rotations, scales):
+    """Monta de uma vez as matrizes de modelo de N objetos.
+
+    Reproduz a sequência usada nos métodos draw (glTranslatef, glRotatef em X,
+    Y e Z e glScalef), ou seja, M = T * Rx * Ry * Rz * S. Retorna um array
+    (N, 4, 4) em float32 na convenção linha-coluna do numpy.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    angles = np.radians(np.asarray(rotations, dtype=np.float32).reshape(-1, 3))
+    scales = np.asarray(scales, dtype=np.float32).reshape(-1, 3)
+    count = len(positions)
+
+    cx, cy, cz = np.cos(angles).T
+    sx, sy, sz = np.sin(angles).T
+    zeros = np.zeros(count, dtype=np.float32)
+    ones = np.ones(count, dtype=np.float32)
+
+    rx = np.stack([ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx], axis=1).reshape(-1, 3, 3)
+    ry = np.stack([cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy], axis=1).reshape(-1, 3, 3)
+    rz = np.stack([cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones], axis=1).reshape(-1, 3, 3)
+
+    matrices = np.zeros((count, 4, 4), dtype=np.float32)
+    matrices[:, :3, :3] = rx @ ry @ rz * scales[:, None, :]
+    matrices[:, :3, 3] = positions
+    matrices[:, 3, 3] = 1.0
+    return matrices
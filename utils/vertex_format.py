@@ -0,0 +1,29 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+
+# Formato único de vértice usado por todas as malhas: posição, normal e UV intercalados
+VERTEX_FLOATS = 8
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+POSITION_OFFSET = 0
+NORMAL_OFFSET = 3 * 4
+UV_OFFSET = 6 * 4
+
+
+def interleave(vertices, normals, uvs):
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    data = np.empty((len(vertices), VERTEX_FLOATS), dtype=np.float32)
+    data[:, 0:3] = vertices
+    data[:, 3:6] = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+    data[:, 6:8] = np.asarray(uvs, dtype=np.float32).reshape(-1, 2)
+    return data
+
+
+def record_vertex_pointers():
+    # Grava no VAO ligado os ponteiros do formato intercalado para o GL_ARRAY_BUFFER atual
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(POSITION_OFFSET))
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(NORMAL_OFFSET))
+    glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glTexCoordPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(UV_OFFSET))